@@ -0,0 +1,198 @@
+"""
+Bot throughput: simulated conversations through the real handlers.
+
+Each simulated user sends /start, a location, a fuel type button press and a
+radius, waiting for each update to be handled before sending the next one,
+like a person would. The Bot API is a fake transport that answers every call
+after `--api-latency` seconds, so no network or token is needed:
+
+    python benchmarks/bench_bot.py --users 1000 --concurrency 1,32
+    python benchmarks/bench_bot.py --persistence sqlite
+
+Reports updates per second and the latency of each conversation step, from
+the moment the update is queued until its handler has finished.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from telegram import Update
+from telegram.ext import TypeHandler
+from telegram.request import BaseRequest
+
+from synthetic import generate_stations, random_query
+from src.bot.main import build_application
+from src.bot.persistence import build_persistence
+from src.models import FuelType
+from src.services import snapshot as snapshot_module
+from src.services.snapshot import StationSnapshot
+
+STEPS = ("start", "location", "fuel", "radius")
+
+class FakeTelegram(BaseRequest):
+    """Bot API stand-in: every method succeeds after a fixed latency"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = Counter()
+        self._message_ids = itertools.count(1000)
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def do_request(self, url, method, request_data=None, **timeouts):
+        api_method = url.rsplit("/", 1)[-1]
+        params = request_data.parameters if request_data is not None else {}
+        self.calls[api_method] += 1
+        await asyncio.sleep(self.latency)
+
+        if api_method == "getMe":
+            result = {"id": 1, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+        elif api_method in ("sendMessage", "editMessageText"):
+            result = {
+                "message_id": next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": int(params.get("chat_id", 1)), "type": "private"},
+                "text": params.get("text", ""),
+            }
+        else:
+            result = True
+        return 200, json.dumps({"ok": True, "result": result}).encode()
+
+class PreloadedStore:
+    def __init__(self, snapshot: StationSnapshot):
+        self.snapshot = snapshot
+
+    async def get(self) -> StationSnapshot:
+        return self.snapshot
+
+def _message(user_id: int, **content) -> dict:
+    return {
+        "message_id": 1,
+        "date": int(time.time()),
+        "chat": {"id": user_id, "type": "private"},
+        "from": {"id": user_id, "is_bot": False, "first_name": f"User {user_id}"},
+        **content,
+    }
+
+def conversation_updates(user_id: int, rng: random.Random) -> list:
+    """The four updates of one search, as Telegram would send them"""
+    lat, lon = random_query(rng)
+    fuel_type = rng.choice([FuelType.GASOLEO_A, FuelType.GASOLINA_95_E5, FuelType.GASOLINA_98_E5])
+    return [
+        {"message": _message(
+            user_id, text="/start", entities=[{"type": "bot_command", "offset": 0, "length": 6}]
+        )},
+        {"message": _message(user_id, location={"latitude": lat, "longitude": lon})},
+        {"callback_query": {
+            "id": f"cb{user_id}",
+            "from": {"id": user_id, "is_bot": False, "first_name": f"User {user_id}"},
+            "chat_instance": str(user_id),
+            "data": f"fuel_{fuel_type.value}",
+            "message": _message(user_id, text="⛽ ¿Qué tipo de combustible buscas?"),
+        }},
+        {"message": _message(user_id, text=rng.choice(["5", "10", "20"]))},
+    ]
+
+async def run(args, concurrency: int, persistence_path: str | None) -> dict:
+    fake = FakeTelegram(args.api_latency)
+    persistence = None
+    if persistence_path is not None:
+        persistence = build_persistence(args.persistence, persistence_path, update_interval=1)
+    application = build_application(
+        "123456:BENCH", concurrent_updates=concurrency, persistence=persistence, request=fake
+    )
+
+    pending: dict[int, asyncio.Future] = {}
+
+    async def handled(update: Update, context) -> None:
+        pending.pop(update.update_id).set_result(time.perf_counter())
+
+    # Runs after the conversation handler (group 0) has finished with the update
+    application.add_handler(TypeHandler(Update, handled), group=1)
+
+    update_ids = itertools.count(1)
+    latencies = defaultdict(list)
+    rng = random.Random(11)
+
+    async def user(user_id: int) -> None:
+        for step, data in zip(STEPS, conversation_updates(user_id, rng)):
+            update = Update.de_json({"update_id": next(update_ids), **data}, application.bot)
+            future = asyncio.get_running_loop().create_future()
+            pending[update.update_id] = future
+            queued = time.perf_counter()
+            await application.update_queue.put(update)
+            latencies[step].append(await future - queued)
+
+    async with application:
+        await application.start()
+        start = time.perf_counter()
+        await asyncio.gather(*(user(user_id) for user_id in range(1, args.users + 1)))
+        elapsed = time.perf_counter() - start
+        await application.stop()
+
+    return {
+        "elapsed": elapsed,
+        "updates": args.users * len(STEPS),
+        "api_calls": sum(fake.calls.values()),
+        "latencies": latencies,
+    }
+
+def _percentile(values: list, share: float) -> float:
+    return statistics.quantiles(values, n=100)[int(share * 100) - 1] if len(values) > 1 else values[0]
+
+async def bench(args) -> None:
+    snapshot_module._snapshot_store = PreloadedStore(StationSnapshot.build(generate_stations(args.stations)))
+    print(
+        f"{args.users} conversations ({args.users * len(STEPS)} updates), {args.stations} stations, "
+        f"Bot API latency {args.api_latency * 1000:.0f} ms, persistence {args.persistence or 'memory'}"
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for concurrency in args.concurrency:
+            path = os.path.join(tmp, f"state-{concurrency}.db") if args.persistence else None
+            result = await run(args, concurrency, path)
+            print(
+                f"  concurrency {concurrency:>4}: {result['updates'] / result['elapsed']:8.1f} updates/s  "
+                f"({result['elapsed']:.2f} s, {result['api_calls']} Bot API calls)"
+            )
+            for step in STEPS:
+                values = result["latencies"][step]
+                print(
+                    f"    {step:<9} p50 {_percentile(values, 0.5) * 1000:8.1f} ms  "
+                    f"p95 {_percentile(values, 0.95) * 1000:8.1f} ms  "
+                    f"p99 {_percentile(values, 0.99) * 1000:8.1f} ms"
+                )
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Simulated bot conversations")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--stations", type=int, default=12000)
+    parser.add_argument("--api-latency", type=float, default=0.005)
+    parser.add_argument(
+        "--concurrency", type=lambda text: [int(n) for n in text.split(",")], default=[1, 32],
+        help="comma-separated limits to compare, e.g. 1,8,32"
+    )
+    parser.add_argument("--persistence", choices=["", "sqlite", "pickle"], default="")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+    asyncio.run(bench(args))
+
+if __name__ == "__main__":
+    main()
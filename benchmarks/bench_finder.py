@@ -0,0 +1,79 @@
+"""
+Query benchmark for FuelStationFinder on a synthetic national snapshot.
+
+    python benchmarks/bench_finder.py --stations 12000 --queries 200
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import generate_stations, random_query
+from src.models import FuelType
+from src.services.finder import FuelStationFinder
+from src.services.snapshot import StationSnapshot
+
+async def bench(stations: int, queries: int, radius: float) -> None:
+    all_stations = generate_stations(stations)
+
+    start = time.perf_counter()
+    snapshot = StationSnapshot.build(all_stations)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    rng = random.Random(7)
+    points = [random_query(rng) for _ in range(queries)]
+    finder = FuelStationFinder()
+
+    async def run(label, search):
+        start = time.perf_counter()
+        for lat, lon in points:
+            await search(lat, lon)
+        per_query = (time.perf_counter() - start) / queries * 1000
+        print(f"  {label:<28} {per_query:8.3f} ms/query")
+
+    print(f"{stations} stations, {queries} queries, radius {radius} km")
+    print(f"  {'snapshot build':<28} {build_ms:8.1f} ms")
+    await run("find_cheapest (list)", lambda lat, lon: finder.find_cheapest(
+        all_stations, lat, lon, radius, FuelType.GASOLEO_A))
+    await run("find_cheapest_in_snapshot", lambda lat, lon: finder.find_cheapest_in_snapshot(
+        snapshot, lat, lon, radius, FuelType.GASOLEO_A))
+    await run("  + also Gasoleo Premium", lambda lat, lon: finder.find_cheapest_in_snapshot(
+        snapshot, lat, lon, radius, FuelType.GASOLEO_A, also_selling=[FuelType.GASOLEO_PREMIUM]))
+
+    night = datetime(2026, 10, 19, 23, 30)
+    snapshot.opening_hours  # Parsed once per snapshot, not per query
+    await run("  + open at 23:30", lambda lat, lon: finder.find_cheapest_in_snapshot(
+        snapshot, lat, lon, radius, FuelType.GASOLEO_A, open_at=night))
+
+    ladder = [radius / 2, radius, radius * 2.5]
+
+    async def separate(lat, lon):
+        for r in ladder:
+            await finder.find_cheapest_in_snapshot(snapshot, lat, lon, r, FuelType.GASOLEO_A)
+
+    await run("3 radii, separate searches", separate)
+    await run("3 radii, one ladder scan", lambda lat, lon: finder.find_cheapest_by_radius(
+        snapshot, lat, lon, ladder, FuelType.GASOLEO_A))
+
+    snapshot.spatial_index(FuelType.GASOLEO_A)  # Built once per snapshot and fuel
+    snapshot.spatial_index(FuelType.HIDROGENO)
+    await run("5 nearest (grid index)", lambda lat, lon: finder.find_nearest_in_snapshot(
+        snapshot, lat, lon, FuelType.GASOLEO_A))
+    await run("5 nearest, rare fuel", lambda lat, lon: finder.find_nearest_in_snapshot(
+        snapshot, lat, lon, FuelType.HIDROGENO))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="FuelStationFinder query benchmark")
+    parser.add_argument("--stations", type=int, default=12000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--radius", type=float, default=10.0)
+    args = parser.parse_args()
+    asyncio.run(bench(args.stations, args.queries, args.radius))
+
+if __name__ == "__main__":
+    main()
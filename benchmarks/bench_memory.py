@@ -0,0 +1,71 @@
+"""
+Memory held by parsed stations, with and without interned text fields.
+
+    python benchmarks/bench_memory.py --stations 12000
+
+The payload is round-tripped through JSON so every station gets its own
+string objects, as with a real HTTP response. "with interning" is what
+`_parse_stations` produces; "without" is the same parse with
+rotulo/municipio/provincia replaced by per-station copies, as before the
+model interned them.
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import generate_payload
+from src.services.ministry_api import MinistryAPIClient
+
+INTERNED_FIELDS = ("rotulo", "municipio", "provincia")
+
+def _without_interning(stations):
+    """Give every station its own copy of the interned fields"""
+    for station in stations:
+        for field in INTERNED_FIELDS:
+            station.__dict__[field] = "".join(list(getattr(station, field)))
+    return stations
+
+def _retained_bytes(build) -> tuple[object, int]:
+    """Bytes still allocated after `build()` returns, while its result is alive"""
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    return result, retained
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Station memory with and without interning")
+    parser.add_argument("--stations", type=int, default=12000)
+    args = parser.parse_args()
+
+    raw = json.dumps(generate_payload(args.stations))
+    client = MinistryAPIClient(url="http://synthetic.invalid/")
+
+    interned, interned_bytes = _retained_bytes(lambda: client._parse_stations(json.loads(raw)))
+    copies, copies_bytes = _retained_bytes(
+        lambda: _without_interning(client._parse_stations(json.loads(raw)))
+    )
+
+    print(f"{args.stations} stations")
+    for field in INTERNED_FIELDS:
+        values = [getattr(station, field) for station in interned]
+        print(
+            f"  {field:<10} {len(set(values)):6d} distinct values, "
+            f"{len({id(v) for v in values}):6d} objects interned, "
+            f"{len({id(getattr(s, field)) for s in copies}):6d} objects without"
+        )
+    print(f"  {'without interning':<20} {copies_bytes / 1024:10.1f} KiB")
+    print(f"  {'with interning':<20} {interned_bytes / 1024:10.1f} KiB")
+    print(f"  {'saved':<20} {(copies_bytes - interned_bytes) / 1024:10.1f} KiB "
+          f"({(copies_bytes - interned_bytes) / copies_bytes:.0%})")
+
+if __name__ == "__main__":
+    main()
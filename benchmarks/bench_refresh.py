@@ -0,0 +1,96 @@
+"""
+Snapshot refresh: one national document vs concurrent per-province slices.
+
+Runs the Ministry stand-in in-process (no sockets) and times
+SnapshotStore.refresh() in both refresh modes:
+
+    python benchmarks/bench_refresh.py --latency 0.2 --per-station-latency 0.0002
+    python benchmarks/bench_refresh.py --failure-rate 0.1
+    python benchmarks/bench_refresh.py --etag
+
+With failures, a national refresh fails as a whole, while the province mode
+only retries the failed slices. Each mode then refreshes again with the
+upstream unchanged: with `--etag` the stand-in answers 304, otherwise the
+client recognises the same Fecha and skips parsing.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import httpx
+
+from ministry_standin import MinistryStandIn, load_payload
+from src.services.ministry_api import MinistryAPIClient
+from src.services.resilience import CircuitBreaker
+from src.services.snapshot import SnapshotStore
+
+async def time_refresh(app: MinistryStandIn, mode: str, concurrency: int) -> list:
+    """A first refresh, then one against the same upstream data"""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://standin") as http_client:
+        store = SnapshotStore(
+            client_factory=lambda: MinistryAPIClient(http_client=http_client, url="http://standin/"),
+            breaker=CircuitBreaker(failure_threshold=1000),
+            refresh_mode=mode,
+            concurrency=concurrency
+        )
+        results = []
+        for _ in range(2):
+            requests_before = app.requests
+            skipped_before = store.refreshes_skipped
+            start = time.perf_counter()
+            try:
+                snapshot = await store.refresh()
+                outcome = f"{len(snapshot)} stations, generation {snapshot.generation}"
+                if store.refreshes_skipped > skipped_before:
+                    outcome += " (unchanged, skipped)"
+            except Exception as e:
+                outcome = f"failed ({type(e).__name__})"
+            results.append({
+                "wall_s": time.perf_counter() - start,
+                "requests": app.requests - requests_before,
+                "outcome": outcome,
+            })
+        return results
+
+async def bench(args) -> None:
+    app = MinistryStandIn(
+        load_payload(None, args.stations, seed=42),
+        latency=args.latency,
+        per_station_latency=args.per_station_latency,
+        failure_rate=args.failure_rate,
+        seed=1,
+        etag_enabled=args.etag
+    )
+    print(
+        f"{args.stations} stations, latency {args.latency} s + {args.per_station_latency * 1000:.2f} ms/station, "
+        f"failure rate {args.failure_rate:.0%}, ETags {'on' if args.etag else 'off'}"
+    )
+    for mode, concurrency in [("national", 1), ("province", args.concurrency)]:
+        for run, result in zip(("first", "again"), await time_refresh(app, mode, concurrency)):
+            print(
+                f"  {mode:<9} {run:<6} {result['wall_s'] * 1000:9.1f} ms  "
+                f"{result['requests']:3d} requests  {result['outcome']}"
+            )
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="National vs per-province refresh")
+    parser.add_argument("--stations", type=int, default=12000)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--per-station-latency", type=float, default=0.0002)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--etag", action="store_true", help="Stand-in sends ETags and answers 304")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+    asyncio.run(bench(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Cold-start benchmark for the API and bot entry points.
+
+Each run starts a fresh interpreter, so the numbers include every import the
+entry point triggers. Run from the project root:
+
+    python benchmarks/bench_startup.py --runs 5
+"""
+import argparse
+import os
+import statistics
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.profiling import ENTRY_POINTS, profile_startup
+
+def bench_cold_start(target: str, runs: int) -> dict:
+    samples = [profile_startup(target) for _ in range(runs)]
+    return {
+        key: statistics.median(sample[key] for sample in samples)
+        for key in ("import_ms", "init_ms", "total_ms", "process_ms")
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"cold start (median of {args.runs} runs)")
+    for target in sorted(ENTRY_POINTS):
+        result = bench_cold_start(target, args.runs)
+        print(
+            f"  {target:<4} import={result['import_ms']:7.1f} ms "
+            f"init={result['init_ms']:7.1f} ms "
+            f"total={result['total_ms']:7.1f} ms "
+            f"process={result['process_ms']:7.1f} ms"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Cheapest-price map tiles: precomputed grid vs one radius query per cell.
+
+    python benchmarks/bench_tiles.py --stations 12000 --zoom 8
+
+Times the price grid build for each fuel, then rendering the tiles over
+mainland Spain at `--zoom` as PNG and JSON. The baseline is what a map client
+did before: one /api/fuel-stations-style radius query per grid cell,
+extrapolated from a sample of cells.
+"""
+import argparse
+import asyncio
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import LAT_RANGE, LON_RANGE, generate_stations
+from src.models import FuelType
+from src.services.extracts import tile_for
+from src.services.finder import FuelStationFinder
+from src.services.price_grid import GRID_SIZE, PriceTileCache
+from src.services.snapshot import StationSnapshot
+
+def tile_centre(zoom: int, x: int, y: int, col: float, row: float) -> tuple[float, float]:
+    n = 2 ** zoom
+    lon = (x + col / GRID_SIZE) / n * 360.0 - 180.0
+    lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + row / GRID_SIZE) / n))))
+    return lat, lon
+
+async def bench(stations: int, zoom: int, samples: int) -> None:
+    snapshot = StationSnapshot.build(generate_stations(stations))
+    snapshot.price_ranking
+
+    print(f"{stations} stations")
+    for fuel_type in (FuelType.GASOLEO_A, FuelType.GASOLINA_95_E5, FuelType.HIDROGENO):
+        start = time.perf_counter()
+        grid = snapshot.price_grid(fuel_type)
+        cells = sum(len(keys) for keys, _, _ in grid.levels.values())
+        print(f"  grid build {fuel_type.value:<16} {(time.perf_counter() - start) * 1000:8.1f} ms  {cells} cells")
+
+    min_x, max_y = tile_for(LAT_RANGE[0], LON_RANGE[0], zoom)
+    max_x, min_y = tile_for(LAT_RANGE[1], LON_RANGE[1], zoom)
+    tiles = [(x, y) for x in range(min_x, max_x + 1) for y in range(min_y, max_y + 1)]
+
+    cache = PriceTileCache()
+    for format in ("png", "json"):
+        start = time.perf_counter()
+        size = 0
+        for x, y in tiles:
+            data, _ = cache.tile(snapshot, FuelType.GASOLEO_A, zoom, x, y, format)
+            size += len(data)
+        per_tile = (time.perf_counter() - start) / len(tiles) * 1000
+        print(f"  zoom {zoom} {format:<4} {len(tiles)} tiles  {per_tile:8.2f} ms/tile  {size / len(tiles) / 1024:6.1f} KiB/tile")
+
+    start = time.perf_counter()
+    for x, y in tiles:
+        cache.tile(snapshot, FuelType.GASOLEO_A, zoom, x, y, "png")
+    print(f"  cached png        {(time.perf_counter() - start) / len(tiles) * 1000:8.3f} ms/tile")
+
+    # Baseline: a radius query per cell, radius = half the cell diagonal
+    x, y = tiles[len(tiles) // 2]
+    lat, lon = tile_centre(zoom, x, y, GRID_SIZE / 2, GRID_SIZE / 2)
+    cell_km = 40075 * math.cos(math.radians(lat)) / (2 ** zoom * GRID_SIZE)
+    finder = FuelStationFinder()
+    start = time.perf_counter()
+    for i in range(samples):
+        col, row = i % GRID_SIZE + 0.5, (i * 7) % GRID_SIZE + 0.5
+        lat, lon = tile_centre(zoom, x, y, col, row)
+        await finder.find_cheapest_in_snapshot(
+            snapshot, lat, lon, cell_km * math.sqrt(2) / 2, FuelType.GASOLEO_A, limit=1
+        )
+    per_query = (time.perf_counter() - start) / samples * 1000
+    print(
+        f"  radius queries    {per_query:8.2f} ms/query x {GRID_SIZE * GRID_SIZE} cells "
+        f"= {per_query * GRID_SIZE * GRID_SIZE / 1000:6.1f} s/tile (extrapolated)"
+    )
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Price grid tile benchmark")
+    parser.add_argument("--stations", type=int, default=12000)
+    parser.add_argument("--zoom", type=int, default=8)
+    parser.add_argument("--samples", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(bench(args.stations, args.zoom, args.samples))
+
+if __name__ == "__main__":
+    main()
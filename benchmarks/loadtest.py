@@ -0,0 +1,181 @@
+"""
+Open-loop load test for `/api/fuel-stations`.
+
+Requests are fired on a fixed schedule (target RPS) regardless of how fast
+earlier ones complete, so queueing shows up in the latency percentiles.
+
+Against a running API:
+
+    python benchmarks/loadtest.py --url http://127.0.0.1:8000 --rps 50 --duration 30
+
+Fully offline, spawning the Ministry stand-in and the API on this machine:
+
+    python benchmarks/loadtest.py --spawn --rps 50 --duration 30 --upstream-latency 0.5
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import random
+import subprocess
+import sys
+import time
+from typing import List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, PROJECT_ROOT)
+
+import httpx
+
+from synthetic import random_query
+from src.models import FuelType
+
+QUERY_FUELS = [FuelType.GASOLINA_95_E5, FuelType.GASOLEO_A, FuelType.GASOLINA_98_E5]
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return float("nan")
+    rank = max(0, min(len(sorted_values) - 1, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+async def run_load(
+    url: str,
+    rps: float,
+    duration: float,
+    radius: float = 10.0,
+    timeout: float = 30.0,
+    seed: int = 1
+) -> dict:
+    rng = random.Random(seed)
+    latencies: List[float] = []
+    errors: dict = {}
+
+    async def one_request(client: httpx.AsyncClient) -> None:
+        lat, lon = random_query(rng)
+        params = {"lat": lat, "lon": lon, "radius": radius, "fuel_type": rng.choice(QUERY_FUELS).value}
+        start = time.perf_counter()
+        try:
+            response = await client.get("/api/fuel-stations", params=params)
+            outcome = response.status_code
+        except httpx.HTTPError as e:
+            outcome = type(e).__name__
+        elapsed = time.perf_counter() - start
+        if outcome == 200:
+            latencies.append(elapsed)
+        else:
+            errors[outcome] = errors.get(outcome, 0) + 1
+
+    total = int(rps * duration)
+    limits = httpx.Limits(max_connections=1000, max_keepalive_connections=1000)
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+        start = time.perf_counter()
+        tasks = []
+        for i in range(total):
+            delay = start + i / rps - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(one_request(client)))
+        await asyncio.gather(*tasks)
+        wall = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "ok": len(latencies),
+        "errors": errors,
+        "wall_s": wall,
+        "throughput_rps": len(latencies) / wall if wall else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": (latencies[-1] if latencies else float("nan")) * 1000,
+    }
+
+def format_report(result: dict, rps: float) -> str:
+    errors = ", ".join(f"{k}={v}" for k, v in result["errors"].items()) or "none"
+    return (
+        f"target {rps:.1f} rps, {result['requests']} requests in {result['wall_s']:.1f} s\n"
+        f"  ok          {result['ok']}\n"
+        f"  errors      {errors}\n"
+        f"  throughput  {result['throughput_rps']:.1f} rps\n"
+        f"  p50         {result['p50_ms']:.1f} ms\n"
+        f"  p95         {result['p95_ms']:.1f} ms\n"
+        f"  p99         {result['p99_ms']:.1f} ms\n"
+        f"  max         {result['max_ms']:.1f} ms"
+    )
+
+async def wait_until_healthy(url: str, path: str = "/health", timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=url) as client:
+        while True:
+            with contextlib.suppress(httpx.HTTPError):
+                if (await client.get(path)).status_code == 200:
+                    return
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{url} did not become healthy")
+            await asyncio.sleep(0.1)
+
+@contextlib.contextmanager
+def spawn_stack(args):
+    """Start the Ministry stand-in and the API as subprocesses"""
+    upstream = f"http://127.0.0.1:{args.upstream_port}/"
+    standin_cmd = [
+        sys.executable, os.path.join(BENCH_DIR, "ministry_standin.py"),
+        "--port", str(args.upstream_port),
+        "--stations", str(args.stations),
+        "--latency", str(args.upstream_latency),
+        "--failure-rate", str(args.upstream_failure_rate),
+    ]
+    api_cmd = [
+        sys.executable, "-m", "uvicorn", "src.api.main:app",
+        "--port", str(args.api_port), "--workers", str(args.workers), "--log-level", "warning",
+    ]
+    env = dict(os.environ, MINISTRY_API_URL=upstream)
+    processes = [
+        subprocess.Popen(standin_cmd, cwd=PROJECT_ROOT, env=env),
+        subprocess.Popen(api_cmd, cwd=PROJECT_ROOT, env=env),
+    ]
+    try:
+        yield f"http://127.0.0.1:{args.api_port}", upstream
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+async def main_async(args) -> None:
+    if args.spawn:
+        with spawn_stack(args) as (url, upstream):
+            await wait_until_healthy(upstream, path="/")
+            await wait_until_healthy(url)
+            # First request pays for the upstream download; keep it out of the numbers
+            async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+                await client.get("/api/fuel-stations", params={
+                    "lat": 40.4, "lon": -3.7, "radius": 5, "fuel_type": FuelType.GASOLEO_A.value
+                })
+            result = await run_load(url, args.rps, args.duration, args.radius)
+    else:
+        result = await run_load(args.url, args.rps, args.duration, args.radius)
+    print(format_report(result, args.rps))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test /api/fuel-stations")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--rps", type=float, default=20.0)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--radius", type=float, default=10.0)
+    parser.add_argument("--spawn", action="store_true", help="Start stand-in and API locally")
+    parser.add_argument("--api-port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--upstream-port", type=int, default=8100)
+    parser.add_argument("--stations", type=int, default=12000)
+    parser.add_argument("--upstream-latency", type=float, default=0.0)
+    parser.add_argument("--upstream-failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Local stand-in for the Ministry REST service.
+
+Serves a synthetic (or recorded) `EstacionesTerrestres` document on any path,
+with configurable latency, gzip, ETag and failure injection, so the API can
+be load-tested offline. Paths ending in `/FiltroProvincia/<id>` get only that
+province's stations, as the real service does:
+
+    python benchmarks/ministry_standin.py --port 8100 --stations 12000 --latency 0.5
+    MINISTRY_API_URL=http://127.0.0.1:8100/ uvicorn src.api.main:app
+
+Record a live payload once with `curl -o payload.json <ministry url>` and
+replay it with `--payload payload.json`.
+"""
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import generate_payload
+
+FAILURE_MODES = ("500", "timeout", "truncated")
+
+_PROVINCE_PATH = re.compile(r"/FiltroProvincia/(\d+)/?$")
+
+# Answer for province ids the service does not know
+_NO_STATIONS = (b'{"ListaEESSPrecio": [], "ResultadoConsulta": "OK"}', None, 0)
+
+class MinistryStandIn:
+    """Minimal ASGI app that answers every GET with the configured payload"""
+
+    def __init__(
+        self,
+        payload: bytes,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        gzip_enabled: bool = True,
+        failure_rate: float = 0.0,
+        failure_mode: str = "500",
+        seed: int | None = None,
+        per_station_latency: float = 0.0,
+        etag_enabled: bool = False
+    ):
+        if failure_mode not in FAILURE_MODES:
+            raise ValueError(f"Unknown failure mode: {failure_mode}")
+        self.payload = payload
+        self.gzipped = gzip.compress(payload) if gzip_enabled else None
+        self.latency = latency
+        self.jitter = jitter
+        # Server time that grows with the document, like generating and sending it
+        self.per_station_latency = per_station_latency
+        self.failure_rate = failure_rate
+        self.failure_mode = failure_mode
+        # Send ETags and answer a matching If-None-Match with 304
+        self.etag_enabled = etag_enabled
+        self.not_modified = 0
+        self._etags: dict = {}
+        self.requests = 0
+        self._rng = random.Random(seed)
+        self._province_bodies = self._split_by_province()
+        self._station_count = sum(count for _, _, count in self._province_bodies.values())
+
+    def _split_by_province(self) -> dict:
+        """Per-province documents: IDProvincia -> (body, gzipped body, station count)"""
+        document = json.loads(self.payload)
+        items_by_province: dict = {f"{code:02d}": [] for code in range(1, 53)}
+        for item in document.get("ListaEESSPrecio", []):
+            items_by_province.setdefault(item.get("IDProvincia"), []).append(item)
+
+        bodies = {}
+        for code, items in items_by_province.items():
+            body = json.dumps(dict(document, ListaEESSPrecio=items), ensure_ascii=False).encode("utf-8")
+            bodies[code] = (body, gzip.compress(body) if self.gzipped is not None else None, len(items))
+        return bodies
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] != "http":
+            return
+
+        self.requests += 1
+        body, gzipped, stations = self.payload, self.gzipped, self._station_count
+        province = _PROVINCE_PATH.search(scope["path"])
+        if province:
+            body, gzipped, stations = self._province_bodies.get(province.group(1), _NO_STATIONS)
+
+        headers = [(b"content-type", b"application/json;charset=utf-8")]
+        if self.etag_enabled:
+            key = province.group(1) if province else None
+            if key not in self._etags:
+                self._etags[key] = b'"' + hashlib.sha1(body).hexdigest()[:16].encode() + b'"'
+            etag = self._etags[key]
+            headers.append((b"etag", etag))
+            if any(name == b"if-none-match" and value == etag for name, value in scope["headers"]):
+                # Nothing to generate or send
+                self.not_modified += 1
+                await asyncio.sleep(self.latency + self._rng.uniform(0, self.jitter))
+                await send({"type": "http.response.start", "status": 304, "headers": headers[1:]})
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+        delay = self.latency + self._rng.uniform(0, self.jitter) + self.per_station_latency * stations
+        if delay:
+            await asyncio.sleep(delay)
+
+        accepts_gzip = any(
+            name == b"accept-encoding" and b"gzip" in value
+            for name, value in scope["headers"]
+        )
+        if gzipped is not None and accepts_gzip:
+            body = gzipped
+            headers.append((b"content-encoding", b"gzip"))
+
+        status = 200
+        if self._rng.random() < self.failure_rate:
+            if self.failure_mode == "500":
+                status, body, headers = 500, b"Internal Server Error", [(b"content-type", b"text/plain")]
+            elif self.failure_mode == "timeout":
+                await asyncio.sleep(3600)
+            elif self.failure_mode == "truncated":
+                # Declare the full length but close the connection half way
+                headers.append((b"content-length", str(len(body)).encode()))
+                await send({"type": "http.response.start", "status": 200, "headers": headers})
+                await send({"type": "http.response.body", "body": body[:len(body) // 2]})
+                return
+
+        headers.append((b"content-length", str(len(body)).encode()))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+def load_payload(path: str | None, stations: int, seed: int) -> bytes:
+    if path is None:
+        return json.dumps(generate_payload(stations, seed), ensure_ascii=False).encode("utf-8")
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        return f.read()
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Local Ministry API stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--payload", help="Recorded Ministry JSON (optionally .gz) to serve")
+    parser.add_argument("--stations", type=int, default=12000, help="Synthetic station count")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--latency", type=float, default=0.0, help="Fixed delay per response (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random delay up to this (s)")
+    parser.add_argument("--per-station-latency", type=float, default=0.0,
+                        help="Extra delay per station in the response (s)")
+    parser.add_argument("--no-gzip", action="store_true", help="Never gzip responses")
+    parser.add_argument("--etag", action="store_true", help="Send ETags and answer 304 when unchanged")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of failed responses")
+    parser.add_argument("--failure-mode", choices=FAILURE_MODES, default="500")
+    return parser
+
+def main() -> None:
+    import uvicorn
+
+    args = build_parser().parse_args()
+    app = MinistryStandIn(
+        load_payload(args.payload, args.stations, args.seed),
+        latency=args.latency,
+        jitter=args.jitter,
+        gzip_enabled=not args.no_gzip,
+        failure_rate=args.failure_rate,
+        failure_mode=args.failure_mode,
+        seed=args.seed,
+        per_station_latency=args.per_station_latency,
+        etag_enabled=args.etag
+    )
+    print(f"Serving {len(app.payload) / 1e6:.1f} MB payload on http://{args.host}:{args.port}/")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Synthetic Ministry payloads for benchmarks and the local stand-in server.
+
+The documents mimic the shape of the live `EstacionesTerrestres` response
+(Spanish field names, comma decimal separators) with stations spread over
+mainland Spain.
+"""
+import os
+import random
+import sys
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import FuelStation, FuelType
+from src.services.ministry_api import MinistryAPIClient
+
+# Rough bounding box of mainland Spain
+LAT_RANGE = (36.0, 43.5)
+LON_RANGE = (-9.2, 3.2)
+
+BRANDS = ["REPSOL", "CEPSA", "GALP", "BP", "SHELL", "PLENOIL", "BALLENOIL", "PETROPRIX", "AVIA", "CARREFOUR"]
+PROVINCES = [
+    "MADRID", "BARCELONA", "VALENCIA / VALÈNCIA", "SEVILLA", "MÁLAGA", "ZARAGOZA",
+    "MURCIA", "ASTURIAS", "A CORUÑA", "VIZCAYA", "ALICANTE", "CÁDIZ", "TOLEDO",
+    "BADAJOZ", "LEÓN", "NAVARRA", "GRANADA", "CÓRDOBA", "BURGOS", "LLEIDA",
+]
+
+# INE codes used by the Ministry's IDProvincia field and FiltroProvincia endpoint
+PROVINCE_CODES = {
+    "MADRID": "28", "BARCELONA": "08", "VALENCIA / VALÈNCIA": "46", "SEVILLA": "41",
+    "MÁLAGA": "29", "ZARAGOZA": "50", "MURCIA": "30", "ASTURIAS": "33", "A CORUÑA": "15",
+    "VIZCAYA": "48", "ALICANTE": "03", "CÁDIZ": "11", "TOLEDO": "45", "BADAJOZ": "06",
+    "LEÓN": "24", "NAVARRA": "31", "GRANADA": "18", "CÓRDOBA": "14", "BURGOS": "09",
+    "LLEIDA": "25",
+}
+
+# Share of stations selling each fuel, roughly as in the real data
+FUEL_AVAILABILITY = {
+    FuelType.GASOLINA_95_E5: 0.95,
+    FuelType.GASOLINA_98_E5: 0.55,
+    FuelType.GASOLEO_A: 0.97,
+    FuelType.GASOLEO_B: 0.25,
+    FuelType.GASOLEO_PREMIUM: 0.6,
+    FuelType.BIOETANOL: 0.01,
+    FuelType.BIODIESEL: 0.02,
+    FuelType.GASES_LICUADOS: 0.08,
+    FuelType.GAS_NATURAL: 0.01,
+    FuelType.GAS_NATURAL_LICUADO: 0.005,
+    FuelType.HIDROGENO: 0.001,
+}
+
+def _decimal(value: float, digits: int) -> str:
+    return f"{value:.{digits}f}".replace(".", ",")
+
+def generate_payload(count: int = 12000, seed: int = 42) -> dict:
+    """Ministry-shaped document with `count` synthetic stations"""
+    rng = random.Random(seed)
+    items = []
+    for i in range(count):
+        province = rng.choice(PROVINCES)
+        item = {
+            "IDEESS": str(1000 + i),
+            "Rótulo": rng.choice(BRANDS),
+            "Dirección": f"CALLE {rng.randint(1, 500)}, {rng.randint(1, 200)}",
+            "Municipio": f"MUNICIPIO {rng.randint(1, 400)}",
+            "Provincia": province,
+            "IDProvincia": PROVINCE_CODES[province],
+            "Horario": "L-D: 24H" if rng.random() < 0.3 else "L-V: 06:00-22:00; S-D: 08:00-21:00",
+            "Latitud": _decimal(rng.uniform(*LAT_RANGE), 6),
+            "Longitud (WGS84)": _decimal(rng.uniform(*LON_RANGE), 6),
+        }
+        for fuel_type, share in FUEL_AVAILABILITY.items():
+            price = ""
+            if rng.random() < share:
+                price = _decimal(rng.uniform(1.3, 1.9), 3)
+            item[f"Precio {fuel_type.value}"] = price
+        items.append(item)
+
+    return {
+        "Fecha": "19/10/2026 10:00:00",
+        "ListaEESSPrecio": items,
+        "Nota": "Datos sintéticos para pruebas de carga",
+        "ResultadoConsulta": "OK",
+    }
+
+def generate_stations(count: int = 12000, seed: int = 42) -> List[FuelStation]:
+    """Parsed FuelStation objects for a synthetic payload"""
+    return MinistryAPIClient(url="http://synthetic.invalid/")._parse_stations(
+        generate_payload(count, seed)
+    )
+
+def random_query(rng: random.Random) -> tuple[float, float]:
+    """A random point inside the synthetic data's bounding box"""
+    return rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE)
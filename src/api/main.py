@@ -1,9 +1,20 @@
-from fastapi import FastAPI, Query, HTTPException
+import base64
+import json
+from datetime import datetime, timezone
+from fastapi import FastAPI, Path, Query, HTTPException, Request, Header
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel, Field, field_validator
-from typing import List
+from typing import List, Literal
+from urllib.parse import quote
 from src.models import FuelStation, FuelType
-from src.services.ministry_api import MinistryAPIClient
+from src.services import export
+from src.services.extracts import ExtractCache
 from src.services.finder import FuelStationFinder
+from src.services.price_grid import TILE_ZOOMS, PriceTileCache
+from src.services.ranking import PriceRanking
+from src.services.snapshot import SnapshotStore, SnapshotUnavailableError, get_snapshot_store
+from src.request_profiling import get_recorder, stage
 
 app = FastAPI(
     title="Bot Precios Gasolineras API",
@@ -21,6 +32,28 @@ class FuelStationResponse(BaseModel):
     longitud: float
     precio: float
     distancia_km: float
+    horario: str = ""
+    # Share (%) of stations selling this fuel at a higher price, in Spain and in the station's provincia
+    mas_barata_que_pct_nacional: float | None = None
+    mas_barata_que_pct_provincia: float | None = None
+
+class FuelStationPage(BaseModel):
+    items: List[FuelStationResponse]
+    next_cursor: str | None
+    generation: int
+
+class RadiusResults(BaseModel):
+    radius_km: float
+    items: List[FuelStationResponse]
+
+class PlaceResponse(BaseModel):
+    name: str
+    provincia: str
+    kind: str
+    label: str
+    latitud: float
+    longitud: float
+    stations: int
 
 class FuelStationsRequest(BaseModel):
     lat: float = Field(ge=-90, le=90)
@@ -44,47 +77,424 @@ async def root():
 async def health():
     return {"status": "healthy"}
 
+def require_admin(token: str | None) -> None:
+    """Admin endpoints only exist when ADMIN_TOKEN is configured"""
+    from src.config import config
+
+    if not config.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if token != config.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@app.get("/admin/slow-queries")
+async def slow_queries(x_admin_token: str | None = Header(default=None)):
+    """Last captured request traces (slow, sampled or requested), newest first"""
+    require_admin(x_admin_token)
+    return get_recorder().recent()
+
+@app.get("/admin/refreshes")
+async def refreshes(x_admin_token: str | None = Header(default=None)):
+    """Snapshot refreshes that rebuilt the data vs skipped as unchanged upstream"""
+    require_admin(x_admin_token)
+    store = get_snapshot_store()
+    if not isinstance(store, SnapshotStore):
+        # With SNAPSHOT_PATH the refresher process downloads, and logs these counts
+        raise HTTPException(status_code=404, detail="Refreshes run in the snapshot refresher")
+    return store.refresh_stats()
+
+def _parse_fuel_types(values: List[str]) -> List[FuelType]:
+    fuel_types = []
+    for value in values:
+        try:
+            fuel_types.append(FuelType(value))
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid fuel type: {value}")
+    return fuel_types
+
+async def _current_snapshot():
+    try:
+        with stage("snapshot"):
+            return await get_snapshot_store().get()
+    except SnapshotUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+def _set_data_headers(response: Response, snapshot) -> None:
+    """Tell clients how old the data is; it may be stale while a refresh runs"""
+    response.headers["X-Snapshot-Generation"] = str(snapshot.generation)
+    response.headers["X-Data-Age"] = str(int(snapshot.age))
+
+def _opening_time(open_now: bool, open_at: datetime | None) -> datetime | None:
+    """Time stations must be open at, if any; a naive open_at is local time"""
+    if open_at is not None:
+        return open_at
+    if open_now:
+        return datetime.now(timezone.utc)
+    return None
+
+def _round_pct(value: float | None) -> float | None:
+    return None if value is None else round(value, 1)
+
+def _station_response(
+    station: FuelStation,
+    fuel_type: FuelType,
+    ranking: PriceRanking | None = None
+) -> FuelStationResponse:
+    distance = getattr(station, '_distance', 0.0)
+    price = station.precios[fuel_type]
+    national = provincial = None
+    if ranking is not None:
+        national = ranking.cheaper_than(fuel_type, price)
+        provincial = ranking.cheaper_than(fuel_type, price, station.provincia)
+    return FuelStationResponse(
+        id=station.id,
+        rotulo=station.rotulo,
+        direccion=station.direccion,
+        municipio=station.municipio,
+        provincia=station.provincia,
+        latitud=station.latitud,
+        longitud=station.longitud,
+        precio=price,
+        distancia_km=round(distance, 2),
+        horario=station.horario,
+        mas_barata_que_pct_nacional=_round_pct(national),
+        mas_barata_que_pct_provincia=_round_pct(provincial)
+    )
+
+def _profile_requested(request: Request) -> bool:
+    if request.headers.get("x-profile") != "1":
+        return False
+    from src.config import config
+
+    return config.PROFILE_ALLOW_HEADER
+
 @app.get("/api/fuel-stations", response_model=List[FuelStationResponse])
 async def find_fuel_stations(
+    request: Request,
+    response: Response,
     lat: float = Query(ge=-90, le=90, description="Latitud del usuario"),
     lon: float = Query(ge=-180, le=180, description="Longitud del usuario"),
     radius: float = Query(gt=0, le=100, description="Radio de búsqueda en km"),
-    fuel_type: str = Query(description="Tipo de combustible")
+    fuel_type: str = Query(description="Tipo de combustible"),
+    also_fuel_type: List[str] = Query(
+        default=[],
+        description="Otros combustibles que la gasolinera también debe vender"
+    ),
+    open_now: bool = Query(default=False, description="Solo gasolineras abiertas ahora"),
+    open_at: datetime | None = Query(default=None, description="Solo gasolineras abiertas a esta hora (ISO 8601)"),
+    brand: List[str] = Query(default=[], description="Solo estas marcas (rótulo), p. ej. brand=repsol&brand=cepsa"),
+    exclude_brand: List[str] = Query(default=[], description="Excluir estas marcas (rótulo)")
 ):
     """Find the cheapest fuel stations within a given radius"""
+    fuel_enum, *also_selling = _parse_fuel_types([fuel_type, *also_fuel_type])
+
+    params = {"lat": lat, "lon": lon, "radius": radius, "fuel_type": fuel_type}
+    with get_recorder().capture("find_fuel_stations", params, force=_profile_requested(request)):
+        # Current snapshot of all stations (downloaded or attached from shared memory)
+        snapshot = await _current_snapshot()
+        _set_data_headers(response, snapshot)
+
+        # Find cheapest stations
+        finder = FuelStationFinder()
+        stations = await finder.find_cheapest_in_snapshot(
+            snapshot=snapshot,
+            user_lat=lat,
+            user_lon=lon,
+            radius_km=radius,
+            fuel_type=fuel_enum,
+            also_selling=also_selling,
+            open_at=_opening_time(open_now, open_at),
+            brands=brand,
+            exclude_brands=exclude_brand
+        )
+
+        # Convert to response format
+        with stage("serialize"):
+            ranking = snapshot.price_ranking
+            results = [_station_response(station, fuel_enum, ranking) for station in stations]
+
+    return results
+
+MAX_LADDER_RADII = 10
+
+@app.get("/api/fuel-stations/ladder", response_model=List[RadiusResults])
+async def find_fuel_stations_ladder(
+    response: Response,
+    lat: float = Query(ge=-90, le=90, description="Latitud del usuario"),
+    lon: float = Query(ge=-180, le=180, description="Longitud del usuario"),
+    radius: List[float] = Query(description="Radios de búsqueda en km, p. ej. radius=5&radius=10&radius=25"),
+    fuel_type: str = Query(description="Tipo de combustible"),
+    limit: int = Query(default=3, ge=1, le=20, description="Gasolineras por radio"),
+    open_now: bool = Query(default=False, description="Solo gasolineras abiertas ahora"),
+    open_at: datetime | None = Query(default=None, description="Solo gasolineras abiertas a esta hora (ISO 8601)"),
+    brand: List[str] = Query(default=[], description="Solo estas marcas (rótulo), p. ej. brand=repsol&brand=cepsa"),
+    exclude_brand: List[str] = Query(default=[], description="Excluir estas marcas (rótulo)")
+):
+    """The cheapest stations for several radii at once, from a single scan"""
+    fuel_enum, = _parse_fuel_types([fuel_type])
+    if not 0 < len(radius) <= MAX_LADDER_RADII:
+        raise HTTPException(status_code=400, detail=f"Between 1 and {MAX_LADDER_RADII} radii are allowed")
+    if any(not 0 < r <= 100 for r in radius):
+        raise HTTPException(status_code=400, detail="Each radius must be greater than 0 and at most 100 km")
+
+    snapshot = await _current_snapshot()
+    _set_data_headers(response, snapshot)
+
+    finder = FuelStationFinder()
+    by_radius = await finder.find_cheapest_by_radius(
+        snapshot=snapshot,
+        user_lat=lat,
+        user_lon=lon,
+        radii_km=radius,
+        fuel_type=fuel_enum,
+        limit=limit,
+        open_at=_opening_time(open_now, open_at),
+        brands=brand,
+        exclude_brands=exclude_brand
+    )
+
+    return [
+        RadiusResults(
+            radius_km=radius_km,
+            items=[_station_response(station, fuel_enum, snapshot.price_ranking) for station in stations]
+        )
+        for radius_km, stations in by_radius.items()
+    ]
+
+@app.get("/api/fuel-stations/nearest", response_model=List[FuelStationResponse])
+async def find_nearest_fuel_stations(
+    response: Response,
+    lat: float = Query(ge=-90, le=90, description="Latitud del usuario"),
+    lon: float = Query(ge=-180, le=180, description="Longitud del usuario"),
+    fuel_type: str = Query(description="Tipo de combustible"),
+    limit: int = Query(default=5, ge=1, le=50, description="Número de gasolineras"),
+    max_distance: float | None = Query(default=None, gt=0, description="Distancia máxima en km (sin límite por defecto)"),
+    also_fuel_type: List[str] = Query(
+        default=[],
+        description="Otros combustibles que la gasolinera también debe vender"
+    ),
+    open_now: bool = Query(default=False, description="Solo gasolineras abiertas ahora"),
+    open_at: datetime | None = Query(default=None, description="Solo gasolineras abiertas a esta hora (ISO 8601)"),
+    brand: List[str] = Query(default=[], description="Solo estas marcas (rótulo), p. ej. brand=repsol&brand=cepsa"),
+    exclude_brand: List[str] = Query(default=[], description="Excluir estas marcas (rótulo)")
+):
+    """The closest stations selling a fuel, nearest first, whatever the distance"""
+    fuel_enum, *also_selling = _parse_fuel_types([fuel_type, *also_fuel_type])
+
+    snapshot = await _current_snapshot()
+    _set_data_headers(response, snapshot)
+
+    finder = FuelStationFinder()
+    stations = await finder.find_nearest_in_snapshot(
+        snapshot=snapshot,
+        user_lat=lat,
+        user_lon=lon,
+        fuel_type=fuel_enum,
+        limit=limit,
+        also_selling=also_selling,
+        open_at=_opening_time(open_now, open_at),
+        brands=brand,
+        exclude_brands=exclude_brand,
+        max_distance_km=max_distance
+    )
+
+    return [_station_response(station, fuel_enum, snapshot.price_ranking) for station in stations]
+
+@app.get("/api/places", response_model=List[PlaceResponse])
+async def find_places(
+    q: str = Query(min_length=1, max_length=100, description="Inicio del nombre del municipio o provincia"),
+    limit: int = Query(default=10, ge=1, le=50)
+):
+    """Autocomplete municipio and provincia names, with the centroid of their stations"""
+    snapshot = await _current_snapshot()
+    return [
+        PlaceResponse(
+            name=place.name,
+            provincia=place.provincia,
+            kind=place.kind,
+            label=place.label,
+            latitud=round(place.latitude, 6),
+            longitud=round(place.longitude, 6),
+            stations=place.stations
+        )
+        for place in snapshot.places.search(q, limit=limit)
+    ]
+
+def _encode_cursor(generation: int, key: tuple) -> str:
+    raw = json.dumps([generation, *key]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> tuple[int, tuple]:
     try:
-        fuel_enum = FuelType(fuel_type)
-    except ValueError:
-        raise HTTPException(status_code=400, detail=f"Invalid fuel type: {fuel_type}")
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        generation, price, index = json.loads(raw)
+        return int(generation), (float(price), int(index))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
-    # Fetch all stations from Ministry API
-    api_client = MinistryAPIClient()
-    all_stations = await api_client.get_all_stations()
+@app.get("/api/fuel-stations/page", response_model=FuelStationPage)
+async def find_fuel_stations_page(
+    response: Response,
+    lat: float = Query(ge=-90, le=90, description="Latitud del usuario"),
+    lon: float = Query(ge=-180, le=180, description="Longitud del usuario"),
+    radius: float = Query(gt=0, le=1500, description="Radio de búsqueda en km"),
+    fuel_type: str = Query(description="Tipo de combustible"),
+    limit: int = Query(default=100, ge=1, le=1000, description="Gasolineras por página"),
+    cursor: str | None = Query(default=None, description="next_cursor de la página anterior"),
+    open_now: bool = Query(default=False, description="Solo gasolineras abiertas ahora (se evalúa en cada página)"),
+    open_at: datetime | None = Query(default=None, description="Solo gasolineras abiertas a esta hora (ISO 8601)"),
+    brand: List[str] = Query(default=[], description="Solo estas marcas (rótulo), p. ej. brand=repsol&brand=cepsa"),
+    exclude_brand: List[str] = Query(default=[], description="Excluir estas marcas (rótulo)")
+):
+    """Every station within the radius, cheapest first, with cursor pagination"""
+    fuel_enum, = _parse_fuel_types([fuel_type])
+
+    after = None
+    snapshot = await _current_snapshot()
+    _set_data_headers(response, snapshot)
+    if cursor is not None:
+        generation, after = _decode_cursor(cursor)
+        if generation != snapshot.generation:
+            raise HTTPException(
+                status_code=410,
+                detail="Station data was refreshed since this cursor was issued; start again"
+            )
 
-    # Find cheapest stations
     finder = FuelStationFinder()
-    stations = await finder.find_cheapest(
-        stations=all_stations,
+    stations, next_key = await finder.find_page_in_snapshot(
+        snapshot=snapshot,
         user_lat=lat,
         user_lon=lon,
         radius_km=radius,
-        fuel_type=fuel_enum
+        fuel_type=fuel_enum,
+        limit=limit,
+        after=after,
+        open_at=_opening_time(open_now, open_at),
+        brands=brand,
+        exclude_brands=exclude_brand
+    )
+
+    return FuelStationPage(
+        items=[_station_response(station, fuel_enum, snapshot.price_ranking) for station in stations],
+        next_cursor=_encode_cursor(snapshot.generation, next_key) if next_key else None,
+        generation=snapshot.generation
+    )
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+@app.get("/api/export")
+async def export_stations(
+    format: Literal["ndjson", "csv"] = Query(default="ndjson", description="ndjson o csv"),
+    provincia: str | None = Query(default=None, description="Filtrar por provincia"),
+    fuel_type: List[str] = Query(default=[], description="Solo gasolineras que venden estos combustibles"),
+    bbox: str | None = Query(default=None, description="min_lon,min_lat,max_lon,max_lat")
+):
+    """Stream the current snapshot (or a filtered subset) without building it in memory"""
+    fuel_types = _parse_fuel_types(fuel_type)
+    try:
+        box = export.parse_bbox(bbox) if bbox else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid bbox: {e}")
+
+    snapshot = await _current_snapshot()
+    indices = export.filter_stations(snapshot, provincia=provincia, fuel_types=fuel_types, bbox=box)
+    chunks = export.csv_chunks if format == "csv" else export.ndjson_chunks
+
+    return StreamingResponse(
+        chunks(snapshot, indices),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="gasolineras-{snapshot.generation}.{format}"',
+            "X-Snapshot-Generation": str(snapshot.generation),
+        }
     )
 
-    # Convert to response format
-    response = []
-    for station in stations:
-        distance = getattr(station, '_distance', 0.0)
-        response.append(FuelStationResponse(
-            id=station.id,
-            rotulo=station.rotulo,
-            direccion=station.direccion,
-            municipio=station.municipio,
-            provincia=station.provincia,
-            latitud=station.latitud,
-            longitud=station.longitud,
-            precio=station.precios[fuel_enum],
-            distancia_km=round(distance, 2)
-        ))
-
-    return response
+_extract_cache = ExtractCache()
+
+def _cached_response(data: bytes, etag: str, media_type: str, if_none_match: str | None) -> Response:
+    """`data` with its ETag, or 304 Not Modified when the client already has it"""
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=300"}
+    if if_none_match == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=data, media_type=media_type, headers=headers)
+
+def _extract_response(extract: tuple[bytes, str] | None, if_none_match: str | None) -> Response:
+    if extract is None:
+        raise HTTPException(status_code=404, detail="No stations in this extract")
+    data, etag = extract
+    return _cached_response(data, etag, "application/octet-stream", if_none_match)
+
+def _extract_listing(snapshot) -> list:
+    extracts = []
+    for key, indices in sorted(snapshot.indices_by_provincia.items()):
+        _, etag = _extract_cache.provincia(snapshot, key)
+        extracts.append({
+            "provincia": snapshot.text(indices[0], "provincia"),
+            # Names like "valencia / valencia" or "araba/alava" contain slashes
+            "url": f"/api/extracts/provincia/{quote(key, safe='')}",
+            "stations": len(indices),
+            "etag": etag,
+        })
+    return extracts
+
+@app.get("/api/extracts")
+async def list_extracts():
+    """Available provincia extracts with their content hashes"""
+    snapshot = await _current_snapshot()
+    # Building every extract after a refresh is CPU-bound: keep it off the event loop
+    extracts = await run_in_threadpool(_extract_listing, snapshot)
+    return {"generation": snapshot.generation, "extracts": extracts}
+
+@app.get("/api/extracts/provincia/{name:path}")
+async def provincia_extract(name: str, if_none_match: str | None = Header(default=None)):
+    """Binary extract of one provincia (see src/services/extracts.py for the format)"""
+    snapshot = await _current_snapshot()
+    extract = await run_in_threadpool(_extract_cache.provincia, snapshot, name)
+    return _extract_response(extract, if_none_match)
+
+@app.get("/api/extracts/tile/{z}/{x}/{y}")
+async def tile_extract(
+    z: int = Path(ge=0, le=14),
+    x: int = Path(ge=0),
+    y: int = Path(ge=0),
+    if_none_match: str | None = Header(default=None)
+):
+    """Binary extract of one web-mercator tile"""
+    if x >= 2 ** z or y >= 2 ** z:
+        raise HTTPException(status_code=404, detail="Tile out of range")
+    snapshot = await _current_snapshot()
+    extract = await run_in_threadpool(_extract_cache.tile, snapshot, z, x, y)
+    return _extract_response(extract, if_none_match)
+
+_price_tile_cache = PriceTileCache()
+
+PRICE_TILE_MEDIA_TYPES = {
+    "png": "image/png",
+    "json": "application/json",
+}
+
+@app.get("/api/price-grid/{z}/{x}/{y}.{format}")
+async def price_grid_tile(
+    z: int = Path(ge=TILE_ZOOMS[0], le=TILE_ZOOMS[-1]),
+    x: int = Path(ge=0),
+    y: int = Path(ge=0),
+    format: Literal["png", "json"] = Path(description="png (mapa de colores) o json (celdas)"),
+    fuel_type: str = Query(description="Tipo de combustible"),
+    if_none_match: str | None = Header(default=None)
+):
+    """
+    Cheapest price per cell of a web-mercator tile, precomputed per snapshot
+    (see src/services/price_grid.py). Cells without stations are empty.
+    """
+    fuel_enum, = _parse_fuel_types([fuel_type])
+    if x >= 2 ** z or y >= 2 ** z:
+        raise HTTPException(status_code=404, detail="Tile out of range")
+    snapshot = await _current_snapshot()
+    entry = _price_tile_cache.cached(snapshot, fuel_enum, z, x, y, format)
+    if entry is None:
+        # The first tile of a fuel builds its whole grid: keep that off the event loop
+        entry = await run_in_threadpool(_price_tile_cache.tile, snapshot, fuel_enum, z, x, y, format)
+    data, etag = entry
+    return _cached_response(data, etag, PRICE_TILE_MEDIA_TYPES[format], if_none_match)
@@ -1,16 +1,25 @@
 import logging
+from datetime import datetime, timezone
 from telegram import Update
 from telegram.ext import ContextTypes, ConversationHandler
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from src.models import FuelType
-from src.services.ministry_api import MinistryAPIClient
+from src.config import config
 from src.services.finder import FuelStationFinder
+from src.services.snapshot import SnapshotUnavailableError, get_snapshot_store
+from src.request_profiling import get_recorder, stage
 
 logger = logging.getLogger(__name__)
 
 # Conversation states
 LOCATION, FUEL_TYPE, RADIUS = range(3)
 
+# Radii tried, in order, when nothing is found within the one the user asked for
+WIDER_RADII_KM = (10, 25, 50, 100)
+
+# user_data keys of one search; anything else (brand preferences) outlives it
+SEARCH_KEYS = ('latitude', 'longitude', 'fuel_type')
+
 async def location_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle user's location and ask for fuel type"""
     logger.info(f"📍 location_handler called! Update: {update}")
@@ -19,6 +28,48 @@ async def location_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     context.user_data['latitude'] = user_location.latitude
     context.user_data['longitude'] = user_location.longitude
 
+    await ask_fuel_type(update)
+
+    return FUEL_TYPE
+
+async def place_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Handle a typed municipio/provincia name instead of a GPS location"""
+    place_text = update.message.text.strip()
+
+    try:
+        snapshot = await get_snapshot_store().get()
+    except Exception as e:
+        logger.warning(f"Place lookup without snapshot: {e}")
+        await update.message.reply_text(
+            "❌ No puedo buscar lugares ahora mismo. Comparte tu ubicación GPS 📎."
+        )
+        return LOCATION
+
+    place = snapshot.places.resolve(place_text)
+    if place is None:
+        suggestions = snapshot.places.search(place_text, limit=5)
+        if not suggestions:
+            await update.message.reply_text(
+                f"❌ No encontré ningún municipio llamado \"{place_text}\".\n\n"
+                "Prueba con otro nombre o comparte tu ubicación GPS 📎."
+            )
+        else:
+            await update.message.reply_text(
+                "🤔 ¿Cuál de estos lugares?",
+                reply_markup=get_places_keyboard(suggestions)
+            )
+        return LOCATION
+
+    context.user_data['latitude'] = place.latitude
+    context.user_data['longitude'] = place.longitude
+
+    await update.message.reply_text(f"📍 Buscaré cerca de {place.label}.")
+    await ask_fuel_type(update)
+
+    return FUEL_TYPE
+
+async def ask_fuel_type(update: Update) -> None:
+    """Send the fuel type inline keyboard"""
     keyboard = []
     for fuel_type in FuelType:
         keyboard.append([InlineKeyboardButton(
@@ -33,8 +84,6 @@ async def location_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         reply_markup=reply_markup
     )
 
-    return FUEL_TYPE
-
 async def fuel_type_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle fuel type selection and ask for radius"""
     query = update.callback_query
@@ -92,44 +141,109 @@ async def radius_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         "Esto puede tardar unos segundos."
     )
 
+    params = {"lat": lat, "lon": lon, "radius": radius, "fuel_type": fuel_type_str}
     try:
-        api_client = MinistryAPIClient()
-        all_stations = await api_client.get_all_stations()
-
-        finder = FuelStationFinder()
-        stations = await finder.find_cheapest(
-            stations=all_stations,
-            user_lat=lat,
-            user_lon=lon,
-            radius_km=radius,
-            fuel_type=fuel_type
-        )
+        with get_recorder().capture("radius_handler", params):
+            with stage("snapshot"):
+                snapshot = await get_snapshot_store().get()
 
-        await status_message.delete()
+            with stage("search"):
+                # Search the wider radii in the same pass, in case nothing is this close
+                finder = FuelStationFinder()
+                radii = [radius] + [r for r in WIDER_RADII_KM if r > radius]
+                by_radius = await finder.find_cheapest_by_radius(
+                    snapshot=snapshot,
+                    user_lat=lat,
+                    user_lon=lon,
+                    radii_km=radii,
+                    fuel_type=fuel_type,
+                    open_at=datetime.now(timezone.utc),
+                    brands=context.user_data.get('brands', ()),
+                    exclude_brands=context.user_data.get('exclude_brands', ())
+                )
+                found_radius, stations = next(
+                    ((r, found) for r, found in by_radius.items() if found),
+                    (radius, [])
+                )
 
-        if not stations:
-            await update.message.reply_text(
-                f"❌ No encontré gasolineras con {fuel_type_str} "
-                f"en un radio de {radius} km.\n\n"
-                "💡 Intenta con un radio mayor.",
-                reply_markup=get_restart_keyboard()
-            )
-        else:
-            await send_results(update, stations, fuel_type)
+                nearest = []
+                if not stations:
+                    # Nothing even in the widest radius: the closest ones, however far
+                    nearest = await finder.find_nearest_in_snapshot(
+                        snapshot=snapshot,
+                        user_lat=lat,
+                        user_lon=lon,
+                        fuel_type=fuel_type,
+                        limit=3,
+                        open_at=datetime.now(timezone.utc),
+                        brands=context.user_data.get('brands', ()),
+                        exclude_brands=context.user_data.get('exclude_brands', ())
+                    )
 
-    except Exception as e:
+            with stage("reply"):
+                await status_message.delete()
+
+                if nearest:
+                    await update.message.reply_text(
+                        f"ℹ️ No hay gasolineras abiertas con {fuel_type_str} a menos de {max(radii):g} km; "
+                        "estas son las más cercanas."
+                    )
+                    await send_results(
+                        update, nearest, fuel_type,
+                        data_age=snapshot.age, ranking=snapshot.price_ranking,
+                        title=f"Las {len(nearest)} gasolineras abiertas más cercanas"
+                    )
+                elif not stations:
+                    await update.message.reply_text(
+                        f"❌ No encontré gasolineras abiertas con {fuel_type_str} "
+                        f"en un radio de {max(radii):g} km.",
+                        reply_markup=get_restart_keyboard()
+                    )
+                else:
+                    if found_radius != radius:
+                        await update.message.reply_text(
+                            f"ℹ️ No hay gasolineras abiertas con {fuel_type_str} a menos de {radius:g} km; "
+                            f"he ampliado la búsqueda a {found_radius:g} km."
+                        )
+                    await send_results(
+                        update, stations, fuel_type,
+                        data_age=snapshot.age, ranking=snapshot.price_ranking
+                    )
+
+    except SnapshotUnavailableError as e:
+        logger.warning(f"Search without station data: {e}")
         await status_message.delete()
         await update.message.reply_text(
-            f"❌ Error al buscar gasolineras: {str(e)}\n\n"
+            "❌ Los datos del Ministerio no están disponibles ahora mismo.\n\n"
+            "Por favor, intenta más tarde o usa /start para empezar de nuevo."
+        )
+    except Exception:
+        logger.exception("Error searching fuel stations")
+        await status_message.delete()
+        await update.message.reply_text(
+            "❌ Error al buscar gasolineras.\n\n"
             "Por favor, intenta más tarde o usa /start para empezar de nuevo."
         )
 
-    context.user_data.clear()
+    clear_search(context)
     return ConversationHandler.END
 
-async def send_results(update: Update, stations, fuel_type: FuelType) -> None:
-    """Send search results to user"""
-    message = f"⛽ *Las {len(stations)} gasolineras más baratas*\n\n"
+def clear_search(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Forget the current search, keeping preferences such as brands"""
+    for key in SEARCH_KEYS:
+        context.user_data.pop(key, None)
+
+async def send_results(
+    update: Update,
+    stations,
+    fuel_type: FuelType,
+    data_age: float | None = None,
+    ranking=None,
+    title: str | None = None
+) -> None:
+    """Send search results to user, noting when the data is older than usual"""
+    title = title or f"Las {len(stations)} gasolineras más baratas abiertas ahora"
+    message = f"⛽ *{title}*\n\n"
 
     for i, station in enumerate(stations, 1):
         distance = getattr(station, '_distance', 0.0)
@@ -140,10 +254,17 @@ async def send_results(update: Update, stations, fuel_type: FuelType) -> None:
             f"💰 Precio: *{price:.3f} €/l*\n"
             f"📍 {station.direccion}\n"
             f"🏘️ {station.municipio}, {station.provincia}\n"
-            f"📏 Distancia: {distance:.2f} km\n\n"
+            f"📏 Distancia: {distance:.2f} km\n"
         )
+        if station.horario:
+            message += f"🕒 {station.horario}\n"
+        if ranking is not None:
+            message += format_ranking(ranking, station, fuel_type, price)
+        message += "\n"
 
     message += "✅ Datos oficiales del Ministerio de Industria y Turismo"
+    if data_age is not None and data_age > config.SNAPSHOT_MAX_AGE:
+        message += f"\n⏳ Precios de hace {format_age(data_age)}: el Ministerio no responde ahora mismo"
 
     await update.message.reply_text(
         message,
@@ -151,9 +272,34 @@ async def send_results(update: Update, stations, fuel_type: FuelType) -> None:
         reply_markup=get_restart_keyboard()
     )
 
+def format_ranking(ranking, station, fuel_type: FuelType, price: float) -> str:
+    """ "📊 Más barata que el 92% de las de MADRID (85% en España)" line, or "" """
+    provincial = ranking.cheaper_than(fuel_type, price, station.provincia)
+    national = ranking.cheaper_than(fuel_type, price)
+    if provincial is None or national is None:
+        return ""
+    return (
+        f"📊 Más barata que el {provincial:.0f}% de las de {station.provincia} "
+        f"({national:.0f}% en España)\n"
+    )
+
+def format_age(seconds: float) -> str:
+    """Human-readable age in Spanish, e.g. "25 min" or "3 h" """
+    minutes = int(seconds // 60)
+    if minutes < 60:
+        return f"{max(minutes, 1)} min"
+    return f"{minutes // 60} h"
+
 def get_restart_keyboard():
     """Create keyboard with restart button"""
     from telegram import ReplyKeyboardMarkup, KeyboardButton
 
     keyboard = [[KeyboardButton("/start")]]
     return ReplyKeyboardMarkup(keyboard, one_time_keyboard=True, resize_keyboard=True)
+
+def get_places_keyboard(places):
+    """Create keyboard with one button per suggested place"""
+    from telegram import ReplyKeyboardMarkup, KeyboardButton
+
+    keyboard = [[KeyboardButton(place.label)] for place in places]
+    return ReplyKeyboardMarkup(keyboard, one_time_keyboard=True, resize_keyboard=True)
@@ -8,7 +8,8 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
         "👋 ¡Hola! Soy el bot de precios de gasolineras.\n\n"
         "Para encontrar las gasolineras más baratas cerca de ti, "
         "necesito que me compartas tu ubicación.\n\n"
-        "📍 Pulsa el clip 📎 y selecciona 'Ubicación' o usa el botón de ubicación.",
+        "📍 Pulsa el clip 📎 y selecciona 'Ubicación', usa el botón de ubicación "
+        "o escribe el nombre de tu municipio.",
         reply_markup=get_location_keyboard()
     )
     return conversation.LOCATION
@@ -19,13 +20,17 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         "🤖 *Ayuda del Bot*\n\n"
         "Para encontrar las gasolineras más baratas:\n"
         "1. Pulsa /start para comenzar\n"
-        "2. Comparte tu ubicación GPS\n"
+        "2. Comparte tu ubicación GPS o escribe tu municipio\n"
         "3. Selecciona el tipo de combustible\n"
         "4. Indica el radio de búsqueda en km\n\n"
+        "También desde cualquier chat: escribe @ y el nombre del bot "
+        "seguido del combustible y el radio, p. ej. `gasoleo 10`\n\n"
         "Comandos disponibles:\n"
         "/start - Iniciar búsqueda\n"
         "/help - Mostrar esta ayuda\n"
-        "/cancel - Cancelar búsqueda"
+        "/cancel - Cancelar búsqueda\n"
+        "/marcas - Buscar solo ciertas marcas, p. ej. `/marcas repsol, cepsa`\n"
+        "/evitar - No mostrar ciertas marcas, p. ej. `/evitar shell`"
     )
     await update.message.reply_text(help_text, parse_mode='Markdown')
 
@@ -34,9 +39,39 @@ async def cancel_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     await update.message.reply_text(
         "❌ Búsqueda cancelada. Pulsa /start para comenzar de nuevo."
     )
-    context.user_data.clear()
+    conversation.clear_search(context)
     return ConversationHandler.END
 
+def parse_brands(args) -> list:
+    """Comma-separated brand names from command arguments"""
+    return [brand.strip() for brand in " ".join(args).split(",") if brand.strip()]
+
+async def brands_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Restrict searches to some brands; without arguments, search all of them again"""
+    brands = parse_brands(context.args or [])
+    if not brands:
+        context.user_data.pop('brands', None)
+        await update.message.reply_text("✅ Buscaré gasolineras de todas las marcas.")
+        return
+    context.user_data['brands'] = brands
+    await update.message.reply_text(
+        f"✅ Solo buscaré gasolineras de: {', '.join(brands)}.\n"
+        "Escribe /marcas sin nada más para volver a ver todas."
+    )
+
+async def exclude_brands_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Leave some brands out of searches; without arguments, stop excluding"""
+    brands = parse_brands(context.args or [])
+    if not brands:
+        context.user_data.pop('exclude_brands', None)
+        await update.message.reply_text("✅ Ya no excluyo ninguna marca.")
+        return
+    context.user_data['exclude_brands'] = brands
+    await update.message.reply_text(
+        f"✅ No mostraré gasolineras de: {', '.join(brands)}.\n"
+        "Escribe /evitar sin nada más para dejar de excluirlas."
+    )
+
 def get_location_keyboard():
     """Create keyboard with location button"""
     from telegram import ReplyKeyboardMarkup, KeyboardButton
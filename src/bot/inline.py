@@ -0,0 +1,196 @@
+import logging
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import List, Tuple
+from telegram import InlineQueryResultVenue, InlineQueryResultsButton, InputTextMessageContent, Update
+from telegram.ext import ContextTypes
+from src.models import FuelType
+from src.services.finder import FuelStationFinder
+from src.services.opening_hours import week_slot
+from src.services.snapshot import get_snapshot_store
+from src.services.text import normalize_name
+from src.request_profiling import get_recorder, stage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RADIUS_KM = 10.0
+MAX_RADIUS_KM = 100.0
+MAX_RESULTS = 10
+
+# Seconds Telegram may reuse an answer for the same user and query
+TELEGRAM_CACHE_TIME = 60
+
+# Coordinates are rounded to ~100 m for the result cache key
+LOCATION_DECIMALS = 3
+
+# Common names that are not words of any FuelType value
+FUEL_ALIASES = {
+    "diesel": FuelType.GASOLEO_A,
+    "gasoil": FuelType.GASOLEO_A,
+    "glp": FuelType.GASES_LICUADOS,
+    "gnc": FuelType.GAS_NATURAL,
+    "gnl": FuelType.GAS_NATURAL_LICUADO,
+}
+
+_FUEL_WORDS = [(fuel_type, normalize_name(fuel_type.value).split(" ")) for fuel_type in FuelType]
+
+def _match_fuel(words: List[str]) -> FuelType | None:
+    """First fuel type (in enum order) whose name words start with `words`, in order"""
+    if len(words) == 1 and words[0] in FUEL_ALIASES:
+        return FUEL_ALIASES[words[0]]
+    for fuel_type, name_words in _FUEL_WORDS:
+        position = 0
+        for word in words:
+            while position < len(name_words) and not name_words[position].startswith(word):
+                position += 1
+            if position == len(name_words):
+                break
+            position += 1
+        else:
+            return fuel_type
+    return None
+
+def parse_inline_query(text: str) -> Tuple[FuelType, float] | None:
+    """
+    Parse "<combustible> [radio]", e.g. "gasoleo 10", "95 5" or "gasolina 98".
+
+    The longest leading run of words naming a fuel wins, so "gasolina 95"
+    is Gasolina 95 E5 with the default radius and "gasolina 95 20" searches
+    20 km. Returns None when no fuel type is recognised.
+    """
+    words = normalize_name(text).split()
+    for split in range(len(words), 0, -1):
+        fuel_type = _match_fuel(words[:split])
+        if fuel_type is None:
+            continue
+        rest = words[split:]
+        if not rest:
+            return fuel_type, DEFAULT_RADIUS_KM
+        if len(rest) == 1:
+            try:
+                radius = float(rest[0].replace(",", ".").removesuffix("km"))
+            except ValueError:
+                return None
+            if 0 < radius <= MAX_RADIUS_KM:
+                return fuel_type, radius
+        return None
+    return None
+
+class InlineResultCache:
+    """
+    LRU cache of inline answers keyed by query and rounded location.
+
+    Keys include the snapshot generation, so a refreshed snapshot never
+    serves old prices.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._results: OrderedDict[tuple, list] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> list | None:
+        results = self._results.get(key)
+        if results is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._results.move_to_end(key)
+        return results
+
+    def put(self, key: tuple, results: list) -> None:
+        self._results[key] = results
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+
+_result_cache = InlineResultCache()
+
+def _venue_result(station, fuel_type: FuelType) -> InlineQueryResultVenue:
+    distance = getattr(station, '_distance', 0.0)
+    price = station.precios[fuel_type]
+    return InlineQueryResultVenue(
+        id=station.id,
+        latitude=station.latitud,
+        longitude=station.longitud,
+        title=f"{price:.3f} €/l · {station.rotulo} · {distance:.1f} km",
+        address=f"{station.direccion}, {station.municipio}",
+        input_message_content=InputTextMessageContent(
+            f"⛽ {station.rotulo}: {price:.3f} €/l ({fuel_type.value})\n"
+            f"📍 {station.direccion}, {station.municipio} ({station.provincia})\n"
+            f"📏 {distance:.2f} km"
+        )
+    )
+
+def _help_button(text: str) -> InlineQueryResultsButton:
+    return InlineQueryResultsButton(text=text, start_parameter="inline")
+
+async def inline_query_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Answer "@bot gasoleo 10" with the cheapest stations around the user's location"""
+    inline_query = update.inline_query
+
+    if inline_query.location is None:
+        await inline_query.answer(
+            [], cache_time=0, is_personal=True,
+            button=_help_button("📍 Activa la ubicación para buscar gasolineras")
+        )
+        return
+
+    parsed = parse_inline_query(inline_query.query)
+    if parsed is None:
+        await inline_query.answer(
+            [], cache_time=0, is_personal=True,
+            button=_help_button("Escribe combustible y radio, p. ej. \"gasoleo 10\"")
+        )
+        return
+
+    fuel_type, radius = parsed
+    lat = inline_query.location.latitude
+    lon = inline_query.location.longitude
+    params = {"lat": lat, "lon": lon, "radius": radius, "fuel_type": fuel_type.value}
+
+    try:
+        with get_recorder().capture("inline_query", params):
+            with stage("snapshot"):
+                snapshot = await get_snapshot_store().get()
+
+            # Only stations open now are listed, so answers expire with the opening-hours slot
+            now = datetime.now(timezone.utc)
+            brands = tuple(context.user_data.get('brands', ()))
+            exclude_brands = tuple(context.user_data.get('exclude_brands', ()))
+            key = (
+                snapshot.generation, fuel_type, radius,
+                round(lat, LOCATION_DECIMALS), round(lon, LOCATION_DECIMALS),
+                week_slot(now), brands, exclude_brands
+            )
+            results = _result_cache.get(key)
+            if results is None:
+                with stage("search"):
+                    stations = await FuelStationFinder().find_cheapest_in_snapshot(
+                        snapshot=snapshot,
+                        user_lat=lat,
+                        user_lon=lon,
+                        radius_km=radius,
+                        fuel_type=fuel_type,
+                        limit=MAX_RESULTS,
+                        open_at=now,
+                        brands=brands,
+                        exclude_brands=exclude_brands
+                    )
+                    results = [_venue_result(station, fuel_type) for station in stations]
+                _result_cache.put(key, results)
+
+            with stage("reply"):
+                button = None
+                if not results:
+                    button = _help_button(f"Sin resultados en {radius:g} km, prueba un radio mayor")
+                await inline_query.answer(
+                    results, cache_time=TELEGRAM_CACHE_TIME, is_personal=True, button=button
+                )
+    except Exception:
+        logger.exception("Error answering inline query")
+        await inline_query.answer(
+            [], cache_time=0, is_personal=True,
+            button=_help_button("❌ Datos no disponibles, intenta más tarde")
+        )
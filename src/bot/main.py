@@ -1,31 +1,44 @@
 import logging
-import os
-from dotenv import load_dotenv
 from telegram import Update
-from telegram.ext import Application, CommandHandler, MessageHandler, filters, CallbackQueryHandler, ConversationHandler, ContextTypes
-from src.bot import handlers, conversation
+from telegram.request import BaseRequest
+from telegram.ext import Application, BasePersistence, CommandHandler, MessageHandler, filters, CallbackQueryHandler, ConversationHandler, ContextTypes, InlineQueryHandler
+from src.bot import handlers, conversation, inline
+from src.bot.persistence import build_persistence
+from src.bot.processing import PerUserUpdateProcessor
+from src.config import config
 
-load_dotenv()
-
-logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    level=logging.INFO
-)
 logger = logging.getLogger(__name__)
 
-TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "YOUR_BOT_TOKEN_HERE")
+def build_application(
+    token: str,
+    concurrent_updates: int = 1,
+    persistence: BasePersistence | None = None,
+    request: BaseRequest | None = None
+) -> Application:
+    """
+    Create the Application and register all handlers (no network access).
 
-def main() -> None:
-    """Start the bot"""
-    # Create the Application
-    application = Application.builder().token(TOKEN).build()
+    Up to `concurrent_updates` updates are processed at once, each user's
+    in order. With `persistence`, user data and conversation states are
+    restored on start. `request` replaces the Bot API transport (the
+    benchmarks use a fake one).
+    """
+    builder = Application.builder().token(token)
+    if concurrent_updates > 1:
+        builder = builder.concurrent_updates(PerUserUpdateProcessor(concurrent_updates))
+    if persistence is not None:
+        builder = builder.persistence(persistence)
+    if request is not None:
+        builder = builder.request(request)
+    application = builder.build()
 
     # Add conversation handler (includes /start as entry_point)
     conv_handler = ConversationHandler(
         entry_points=[CommandHandler("start", handlers.start_command)],
         states={
             conversation.LOCATION: [
-                MessageHandler(filters.LOCATION, conversation.location_handler)
+                MessageHandler(filters.LOCATION, conversation.location_handler),
+                MessageHandler(filters.TEXT & ~filters.COMMAND, conversation.place_handler)
             ],
             conversation.FUEL_TYPE: [
                 CallbackQueryHandler(conversation.fuel_type_callback)
@@ -36,10 +49,16 @@ def main() -> None:
         },
         fallbacks=[CommandHandler("cancel", handlers.cancel_command)],
         allow_reentry=True,
+        name="search",
+        persistent=persistence is not None,
     )
 
     application.add_handler(conv_handler)
 
+    # Brand preferences, kept across searches
+    application.add_handler(CommandHandler("marcas", handlers.brands_command))
+    application.add_handler(CommandHandler("evitar", handlers.exclude_brands_command))
+
     # Add debug handler to see all messages
     async def debug_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         logger.info(f"🔍 Unhandled update: {update}")
@@ -49,6 +68,24 @@ def main() -> None:
     # Add other command handlers (help, cancel)
     application.add_handler(CommandHandler("help", handlers.help_command))
 
+    # Inline mode: "@bot gasoleo 10" from any chat
+    application.add_handler(InlineQueryHandler(inline.inline_query_handler))
+
+    return application
+
+def main() -> None:
+    """Start the bot"""
+    logging.basicConfig(
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        level=logging.INFO
+    )
+
+    application = build_application(
+        config.TELEGRAM_BOT_TOKEN or "YOUR_BOT_TOKEN_HERE",
+        concurrent_updates=config.BOT_CONCURRENT_UPDATES,
+        persistence=build_persistence(config.BOT_PERSISTENCE, config.BOT_PERSISTENCE_PATH)
+    )
+
     # Start the bot
     logger.info("Starting bot...")
     application.run_polling(allowed_updates=Update.ALL_TYPES)
@@ -0,0 +1,133 @@
+"""
+Conversation state that survives bot restarts.
+
+`build_persistence` picks the backend from configuration: nothing (state
+lives in memory), a local SQLite file, or python-telegram-bot's own pickle
+file. Application flushes changed state every `update_interval` seconds
+and on shutdown.
+"""
+import json
+import sqlite3
+from typing import Dict, Optional
+from telegram.ext import BasePersistence, PersistenceInput, PicklePersistence
+
+PERSISTENCE_BACKENDS = ("", "sqlite", "pickle")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_data (id INTEGER PRIMARY KEY, data TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS chat_data (id INTEGER PRIMARY KEY, data TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS bot_data (id INTEGER PRIMARY KEY CHECK (id = 0), data TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS conversations (
+    name TEXT NOT NULL,
+    key TEXT NOT NULL,
+    state TEXT NOT NULL,
+    PRIMARY KEY (name, key)
+);
+"""
+
+class SQLitePersistence(BasePersistence):
+    """
+    User, chat and bot data plus conversation states in one SQLite file.
+
+    Values are stored as JSON, so they must be plain dicts, lists, strings
+    and numbers (which is all the bot keeps). Each change is one small
+    upsert in WAL mode; callback data is not stored.
+    """
+
+    def __init__(self, path: str, update_interval: float = 60):
+        super().__init__(
+            store_data=PersistenceInput(callback_data=False),
+            update_interval=update_interval
+        )
+        self.path = path
+        self._connection = sqlite3.connect(path)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(_SCHEMA)
+
+    def _load(self, table: str) -> Dict[int, dict]:
+        rows = self._connection.execute(f"SELECT id, data FROM {table}")
+        return {row_id: json.loads(data) for row_id, data in rows}
+
+    def _store(self, table: str, row_id: int, data: dict) -> None:
+        with self._connection:
+            self._connection.execute(
+                f"INSERT INTO {table} (id, data) VALUES (?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET data = excluded.data",
+                (row_id, json.dumps(data))
+            )
+
+    def _drop(self, table: str, row_id: int) -> None:
+        with self._connection:
+            self._connection.execute(f"DELETE FROM {table} WHERE id = ?", (row_id,))
+
+    async def get_user_data(self) -> Dict[int, dict]:
+        return self._load("user_data")
+
+    async def get_chat_data(self) -> Dict[int, dict]:
+        return self._load("chat_data")
+
+    async def get_bot_data(self) -> dict:
+        return self._load("bot_data").get(0, {})
+
+    async def get_callback_data(self) -> None:
+        return None
+
+    async def get_conversations(self, name: str) -> dict:
+        rows = self._connection.execute(
+            "SELECT key, state FROM conversations WHERE name = ?", (name,)
+        )
+        return {tuple(json.loads(key)): json.loads(state) for key, state in rows}
+
+    async def update_user_data(self, user_id: int, data: dict) -> None:
+        self._store("user_data", user_id, data)
+
+    async def update_chat_data(self, chat_id: int, data: dict) -> None:
+        self._store("chat_data", chat_id, data)
+
+    async def update_bot_data(self, data: dict) -> None:
+        self._store("bot_data", 0, data)
+
+    async def update_callback_data(self, data) -> None:
+        pass
+
+    async def update_conversation(self, name: str, key: tuple, new_state: Optional[object]) -> None:
+        with self._connection:
+            if new_state is None:
+                self._connection.execute(
+                    "DELETE FROM conversations WHERE name = ? AND key = ?", (name, json.dumps(key))
+                )
+            else:
+                self._connection.execute(
+                    "INSERT INTO conversations (name, key, state) VALUES (?, ?, ?) "
+                    "ON CONFLICT(name, key) DO UPDATE SET state = excluded.state",
+                    (name, json.dumps(key), json.dumps(new_state))
+                )
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._drop("user_data", user_id)
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        self._drop("chat_data", chat_id)
+
+    async def refresh_user_data(self, user_id: int, user_data: dict) -> None:
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: dict) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: dict) -> None:
+        pass
+
+    async def flush(self) -> None:
+        self._connection.commit()
+
+def build_persistence(backend: str, path: str, update_interval: float = 60) -> BasePersistence | None:
+    """Persistence for `backend` ("" keeps state in memory only)"""
+    if backend not in PERSISTENCE_BACKENDS:
+        raise ValueError(f"Unknown bot persistence backend: {backend}")
+    if backend == "sqlite":
+        return SQLitePersistence(path, update_interval=update_interval)
+    if backend == "pickle":
+        return PicklePersistence(path, update_interval=update_interval)
+    return None
@@ -1,15 +1,95 @@
 import os
-from dotenv import load_dotenv
 
-load_dotenv()
+_env_loaded = False
+
+def load_env() -> None:
+    """Load variables from .env once, on first use instead of at import time"""
+    global _env_loaded
+    if _env_loaded:
+        return
+    from dotenv import load_dotenv
+    load_dotenv()
+    _env_loaded = True
+
+def _getenv(name: str, default: str = "") -> str:
+    load_env()
+    return os.getenv(name, default)
 
 class Config:
-    TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
-    PORT = int(os.getenv("PORT", "8000"))
+    @property
+    def TELEGRAM_BOT_TOKEN(self) -> str:
+        return _getenv("TELEGRAM_BOT_TOKEN")
+
+    @property
+    def PORT(self) -> int:
+        return int(_getenv("PORT", "8000"))
+
+    @property
+    def BOT_CONCURRENT_UPDATES(self) -> int:
+        """Updates the bot processes at once (1 = one by one); each user's stay in order"""
+        return int(_getenv("BOT_CONCURRENT_UPDATES", "32"))
+
+    @property
+    def BOT_PERSISTENCE(self) -> str:
+        """Where conversation state survives restarts: "sqlite", "pickle" or "" (memory only)"""
+        return _getenv("BOT_PERSISTENCE")
+
+    @property
+    def BOT_PERSISTENCE_PATH(self) -> str:
+        return _getenv("BOT_PERSISTENCE_PATH", "bot_state.db")
+
+    @property
+    def MINISTRY_API_URL(self) -> str:
+        """Upstream Ministry endpoint override, e.g. a local stand-in for load tests"""
+        return _getenv("MINISTRY_API_URL")
+
+    @property
+    def MINISTRY_REFRESH_MODE(self) -> str:
+        """"national" (one document) or "province" (concurrent per-province slices)"""
+        return _getenv("MINISTRY_REFRESH_MODE", "national")
+
+    @property
+    def MINISTRY_CONCURRENCY(self) -> int:
+        """Province requests in flight at once in "province" refresh mode"""
+        return int(_getenv("MINISTRY_CONCURRENCY", "8"))
+
+    @property
+    def SNAPSHOT_PATH(self) -> str:
+        """Shared snapshot file; when set, API workers attach to it instead of downloading"""
+        return _getenv("SNAPSHOT_PATH")
+
+    @property
+    def SNAPSHOT_MAX_AGE(self) -> float:
+        """Seconds a downloaded snapshot is reused before refreshing"""
+        return float(_getenv("SNAPSHOT_MAX_AGE", "600"))
+
+    @property
+    def PROFILE_SLOW_MS(self) -> float:
+        """Record requests slower than this many milliseconds (0 disables)"""
+        return float(_getenv("PROFILE_SLOW_MS", "0"))
+
+    @property
+    def PROFILE_SAMPLE_RATE(self) -> float:
+        """Share of requests run under cProfile (0 disables)"""
+        return float(_getenv("PROFILE_SAMPLE_RATE", "0"))
+
+    @property
+    def PROFILE_ALLOW_HEADER(self) -> bool:
+        """Honour the X-Profile request header"""
+        return _getenv("PROFILE_ALLOW_HEADER", "0") == "1"
+
+    @property
+    def PROFILE_BUFFER_SIZE(self) -> int:
+        """Number of captured traces kept for the admin endpoint"""
+        return int(_getenv("PROFILE_BUFFER_SIZE", "50"))
+
+    @property
+    def ADMIN_TOKEN(self) -> str:
+        """Token for /admin endpoints; they are disabled when empty"""
+        return _getenv("ADMIN_TOKEN")
 
-    @classmethod
-    def validate(cls):
-        if not cls.TELEGRAM_BOT_TOKEN:
+    def validate(self):
+        if not self.TELEGRAM_BOT_TOKEN:
             raise ValueError("TELEGRAM_BOT_TOKEN environment variable is required")
 
 config = Config()
@@ -1,3 +1,4 @@
+import sys
 from enum import Enum
 from pydantic import BaseModel, Field, field_validator
 from typing import Dict
@@ -24,6 +25,7 @@ class FuelStation(BaseModel):
     latitud: float = Field(ge=-90, le=90)
     longitud: float = Field(ge=-180, le=180)
     precios: Dict[FuelType, float]
+    horario: str = ""
 
     @field_validator('precios')
     @classmethod
@@ -32,3 +34,9 @@ class FuelStation(BaseModel):
             if price < 0:
                 raise ValueError(f'Price for {fuel_type} cannot be negative: {price}')
         return v
+
+    @field_validator('rotulo', 'municipio', 'provincia', 'horario')
+    @classmethod
+    def intern_repeated_text(cls, v):
+        # A few hundred brands, towns and schedules repeat across ~12k stations; share one copy of each
+        return sys.intern(v)
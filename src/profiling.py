@@ -0,0 +1,154 @@
+"""
+Startup profiling for the API and bot entry points.
+
+Runs the entry point in a fresh interpreter (so nothing is already cached in
+sys.modules) and reports how long the imports and the initialisation took:
+
+    python -m src.profiling api
+    python -m src.profiling bot --top 15
+"""
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Tuple
+
+# Only cheap stdlib modules are imported at module level: the measuring child
+# process imports this module after the entry point and must not skew it.
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENTRY_POINTS = {
+    "api": "src.api.main",
+    "bot": "src.bot.main",
+}
+
+def parse_importtime(output: str) -> List[Tuple[str, int, int]]:
+    """Parse `python -X importtime` output into (module, self_us, cumulative_us) rows"""
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        try:
+            self_us = int(parts[0])
+            cumulative_us = int(parts[1])
+        except ValueError:
+            continue  # Header line
+        rows.append((parts[2].strip(), self_us, cumulative_us))
+    return rows
+
+def import_time_by_package(rows: List[Tuple[str, int, int]]) -> Dict[str, float]:
+    """Sum self import time per top-level package, in milliseconds"""
+    totals: Dict[str, float] = {}
+    for module, self_us, _ in rows:
+        package = module.split(".")[0]
+        totals[package] = totals.get(package, 0.0) + self_us / 1000
+    return totals
+
+async def _asgi_get(app, path: str) -> int:
+    """Send a single GET through the ASGI app without any HTTP client"""
+    status = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [],
+        "client": ("127.0.0.1", 0),
+        "server": ("startup-profile", 80),
+    }
+    await app(scope, receive, send)
+    return status
+
+def _init_entry_point(target: str, module) -> None:
+    if target == "api":
+        import asyncio
+
+        asyncio.run(_asgi_get(module.app, "/health"))
+    elif target == "bot":
+        module.build_application("0:startup-profile")
+
+# Executed with `python -X importtime -c` so the entry point is the first thing imported
+_CHILD_CODE = (
+    "import time; start = time.perf_counter(); "
+    "import {module} as module; imported = time.perf_counter(); "
+    "from src.profiling import _report_child; "
+    "_report_child({target!r}, module, start, imported)"
+)
+
+def _report_child(target: str, module, start: float, imported: float) -> None:
+    """Initialise the freshly imported entry point and print timings as JSON"""
+    _init_entry_point(target, module)
+    ready = time.perf_counter()
+
+    print(json.dumps({
+        "import_ms": (imported - start) * 1000,
+        "init_ms": (ready - imported) * 1000,
+        "total_ms": (ready - start) * 1000,
+    }))
+
+def profile_startup(target: str) -> dict:
+    """Measure a cold start of `target` ("api" or "bot") in a subprocess"""
+    if target not in ENTRY_POINTS:
+        raise ValueError(f"Unknown entry point: {target}")
+
+    import subprocess
+
+    code = _CHILD_CODE.format(module=ENTRY_POINTS[target], target=target)
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    process_ms = (time.perf_counter() - start) * 1000
+
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings["process_ms"] = process_ms
+    timings["imports"] = import_time_by_package(parse_importtime(result.stderr))
+    return timings
+
+def format_report(target: str, timings: dict, top: int = 10) -> str:
+    lines = [
+        f"Startup profile: {target} ({ENTRY_POINTS[target]})",
+        f"  import   {timings['import_ms']:8.1f} ms",
+        f"  init     {timings['init_ms']:8.1f} ms",
+        f"  total    {timings['total_ms']:8.1f} ms",
+        f"  process  {timings['process_ms']:8.1f} ms (interpreter start to exit)",
+        "Slowest packages (self import time):",
+    ]
+    packages = sorted(timings["imports"].items(), key=lambda item: item[1], reverse=True)
+    for package, ms in packages[:top]:
+        lines.append(f"  {package:<24} {ms:8.1f} ms")
+    return "\n".join(lines)
+
+def main(argv=None) -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Profile entry point cold start")
+    parser.add_argument("target", choices=sorted(ENTRY_POINTS), nargs="?", default="api")
+    parser.add_argument("--top", type=int, default=10, help="Number of packages to list")
+    args = parser.parse_args(argv)
+
+    print(format_report(args.target, profile_startup(args.target), top=args.top))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Opt-in per-request profiling and slow-query capture.
+
+A request is traced when one of these triggers fires:
+
+- "header": the caller asked for it (e.g. `X-Profile: 1` on the API),
+- "sample": a random share of requests (`PROFILE_SAMPLE_RATE`),
+- "threshold": the request took longer than `PROFILE_SLOW_MS`.
+
+Header and sampled requests run under cProfile. Threshold tracing cannot
+know in advance which request will be slow, so it only records stage
+timings (a couple of perf_counter calls per stage). Captured traces are kept
+in a fixed-size ring buffer. When no trigger is configured, `stage()` returns
+a shared no-op context manager and nothing else runs.
+
+Note that cProfile sees every coroutine running on the event loop while a
+profiled request is in flight, not just that request.
+"""
+import contextlib
+import contextvars
+import logging
+import random
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_current_trace: contextvars.ContextVar[Optional["RequestTrace"]] = \
+    contextvars.ContextVar("current_trace", default=None)
+
+_NO_STAGE = contextlib.nullcontext()
+
+class RequestTrace:
+    """Stage timings (and optionally a cProfile report) of one request"""
+
+    def __init__(self, name: str, params: dict, trigger: str):
+        self.name = name
+        self.params = params
+        self.trigger = trigger
+        self.started_at = time.time()
+        self.stages: List[tuple[str, float]] = []
+        self.total_ms = 0.0
+        self.profile: str | None = None
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "params": self.params,
+            "trigger": self.trigger,
+            "started_at": self.started_at,
+            "total_ms": round(self.total_ms, 3),
+            "stages": [{"stage": name, "ms": round(ms, 3)} for name, ms in self.stages],
+            "profile": self.profile,
+        }
+
+class _Stage:
+    __slots__ = ("_trace", "_name", "_start")
+
+    def __init__(self, trace: RequestTrace, name: str):
+        self._trace = trace
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self._trace.stages.append((self._name, (time.perf_counter() - self._start) * 1000))
+
+def stage(name: str):
+    """Time a block as a named stage of the current trace, if any"""
+    trace = _current_trace.get()
+    if trace is None:
+        return _NO_STAGE
+    return _Stage(trace, name)
+
+def _format_profile(profiler, limit: int = 30) -> str:
+    import io
+    import pstats
+
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(limit)
+    return stream.getvalue()
+
+class SlowQueryRecorder:
+    """Decides which requests to trace and keeps the last `capacity` traces"""
+
+    def __init__(
+        self,
+        capacity: int = 50,
+        slow_ms: float = 0.0,
+        sample_rate: float = 0.0,
+        random_func: Callable[[], float] = random.random
+    ):
+        self.traces: deque[RequestTrace] = deque(maxlen=capacity)
+        self.slow_ms = slow_ms
+        self.sample_rate = sample_rate
+        self._random = random_func
+        self._profiling = False  # Only one cProfile can be active per thread
+
+    def _trigger(self, force: bool) -> str | None:
+        if force:
+            return "header"
+        if self.sample_rate and self._random() < self.sample_rate:
+            return "sample"
+        if self.slow_ms:
+            return "threshold"
+        return None
+
+    @contextlib.contextmanager
+    def capture(self, name: str, params: Dict | None = None, force: bool = False):
+        """Trace the enclosed block if a trigger fires; yields the trace or None"""
+        trigger = self._trigger(force)
+        if trigger is None:
+            yield None
+            return
+
+        trace = RequestTrace(name, params or {}, trigger)
+        profiler = None
+        if trigger != "threshold" and not self._profiling:
+            import cProfile
+
+            profiler = cProfile.Profile()
+            self._profiling = True
+            profiler.enable()
+
+        token = _current_trace.set(trace)
+        start = time.perf_counter()
+        try:
+            yield trace
+        finally:
+            trace.total_ms = (time.perf_counter() - start) * 1000
+            _current_trace.reset(token)
+            if profiler is not None:
+                profiler.disable()
+                self._profiling = False
+                trace.profile = _format_profile(profiler)
+            self._record(trace)
+
+    def _record(self, trace: RequestTrace) -> None:
+        slow = self.slow_ms and trace.total_ms >= self.slow_ms
+        if trace.trigger == "threshold" and not slow:
+            return
+        self.traces.append(trace)
+        if slow:
+            stages = ", ".join(f"{name}={ms:.1f}ms" for name, ms in trace.stages)
+            logger.warning(f"Slow {trace.name}: {trace.total_ms:.1f} ms ({stages}) {trace.params}")
+
+    def recent(self) -> List[dict]:
+        """Captured traces, newest first"""
+        return [trace.to_dict() for trace in reversed(self.traces)]
+
+_recorder: SlowQueryRecorder | None = None
+
+def get_recorder() -> SlowQueryRecorder:
+    """Process-wide recorder configured from PROFILE_* settings"""
+    global _recorder
+    if _recorder is None:
+        from src.config import config
+
+        _recorder = SlowQueryRecorder(
+            capacity=config.PROFILE_BUFFER_SIZE,
+            slow_ms=config.PROFILE_SLOW_MS,
+            sample_rate=config.PROFILE_SAMPLE_RATE
+        )
+    return _recorder
@@ -0,0 +1,96 @@
+import csv
+import io
+import json
+from typing import Iterable, Iterator, Sequence
+from src.models import FuelStation, FuelType
+from src.services.snapshot import FUEL_TYPES, StationSnapshot
+from src.services.text import normalize_name
+
+EXPORT_FIELDS = ["id", "rotulo", "direccion", "municipio", "provincia", "latitud", "longitud"]
+
+# (min_lon, min_lat, max_lon, max_lat)
+BBox = tuple[float, float, float, float]
+
+def parse_bbox(value: str) -> BBox:
+    """Parse "min_lon,min_lat,max_lon,max_lat" """
+    parts = [float(part) for part in value.split(",")]
+    if len(parts) != 4:
+        raise ValueError("bbox must have 4 comma-separated numbers")
+    min_lon, min_lat, max_lon, max_lat = parts
+    if min_lon > max_lon or min_lat > max_lat:
+        raise ValueError("bbox minimums must not exceed maximums")
+    return min_lon, min_lat, max_lon, max_lat
+
+def filter_stations(
+    snapshot: StationSnapshot,
+    provincia: str | None = None,
+    fuel_types: Sequence[FuelType] = (),
+    bbox: BBox | None = None
+) -> Iterator[int]:
+    """
+    Lazily yield indices of the stations matching every given filter.
+
+    Coordinates and fuel availability are tested on the snapshot columns
+    and provinces are matched (ignoring accents and case) through the
+    snapshot's province index, so no station is decoded while filtering.
+    """
+    latitudes = snapshot.latitudes
+    longitudes = snapshot.longitudes
+    in_provincia = None
+    if provincia:
+        in_provincia = set(snapshot.indices_by_provincia.get(normalize_name(provincia), ()))
+
+    for index in snapshot.stations_selling(fuel_types):
+        if bbox is not None:
+            min_lon, min_lat, max_lon, max_lat = bbox
+            if not (min_lat <= latitudes[index] <= max_lat and min_lon <= longitudes[index] <= max_lon):
+                continue
+        if in_provincia is not None and index not in in_provincia:
+            continue
+        yield index
+
+def station_record(station: FuelStation) -> dict:
+    record = {field: getattr(station, field) for field in EXPORT_FIELDS}
+    record["precios"] = {fuel_type.value: price for fuel_type, price in station.precios.items()}
+    return record
+
+def ndjson_chunks(
+    snapshot: StationSnapshot,
+    indices: Iterable[int],
+    batch_size: int = 500
+) -> Iterator[bytes]:
+    """One JSON object per line, yielded in chunks of `batch_size` stations"""
+    lines = []
+    for index in indices:
+        lines.append(json.dumps(station_record(snapshot.station(index)), ensure_ascii=False))
+        if len(lines) >= batch_size:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+def csv_chunks(
+    snapshot: StationSnapshot,
+    indices: Iterable[int],
+    batch_size: int = 500
+) -> Iterator[bytes]:
+    """CSV with a header row and one price column per fuel type (empty if not sold)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS + [fuel_type.value for fuel_type in FUEL_TYPES])
+
+    rows = 0
+    for index in indices:
+        station = snapshot.station(index)
+        writer.writerow(
+            [getattr(station, field) for field in EXPORT_FIELDS]
+            + [station.precios.get(fuel_type, "") for fuel_type in FUEL_TYPES]
+        )
+        rows += 1
+        if rows % batch_size == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
@@ -0,0 +1,292 @@
+"""
+Compact binary extracts of a snapshot for offline clients.
+
+An extract covers one provincia or one web-mercator tile (z/x/y) and is a
+fraction of the size of the Ministry JSON:
+
+    header (uncompressed, little-endian)
+        magic "GEXT", version u8, ref_width u8, n_fuels u16, count u32,
+        n_strings u32, min_lat f64, min_lon f64, lat_step f64, lon_step f64
+    body (zlib)
+        string offsets  uint32[n_strings + 1], then the UTF-8 string blob
+        fuel names      ref[n_fuels]             string table refs
+        latitudes       uint16[count]            min_lat + q * lat_step
+        longitudes      uint16[count]            min_lon + q * lon_step
+        prices          uint16[count][n_fuels]   thousandths of a euro, 0 = not sold
+        text refs       ref[count][5]            id, rotulo, direccion, municipio, provincia
+
+`ref` is uint16 when the string table has fewer than 65536 entries and
+uint32 otherwise. Repeated strings (brands, towns, provinces) are stored once.
+The bytes only depend on the stations they contain, so the content hash
+works as an ETag across snapshot generations when nothing changed.
+"""
+import hashlib
+import heapq
+import math
+import struct
+import sys
+import threading
+import zlib
+from array import array
+from typing import Dict, List, Sequence
+from src.models import FuelStation, FuelType
+from src.services.geo import calculate_distance
+from src.services.snapshot import FUEL_TYPES, StationSnapshot
+from src.services.text import normalize_name
+
+MAGIC = b"GEXT"
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct("<4sBBHIIdddd")
+
+TEXT_FIELDS = ("id", "rotulo", "direccion", "municipio", "provincia")
+N_TEXT_FIELDS = len(TEXT_FIELDS)
+
+QUANTIZATION_LEVELS = 65535
+PRICE_SCALE = 1000
+
+def _le_bytes(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+def _from_le(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+def _quantize(values: Sequence[float]) -> tuple[float, float, array]:
+    low = min(values, default=0.0)
+    high = max(values, default=0.0)
+    step = (high - low) / QUANTIZATION_LEVELS or 1e-9
+    return low, step, array("H", (round((v - low) / step) for v in values))
+
+def encode_extract(snapshot: StationSnapshot, indices: Sequence[int]) -> bytes:
+    """Serialise the stations at `indices` into an extract"""
+    strings: Dict[str, int] = {}
+
+    def ref(text: str) -> int:
+        if text not in strings:
+            strings[text] = len(strings)
+        return strings[text]
+
+    fuel_refs = [ref(fuel_type.value) for fuel_type in FUEL_TYPES]
+    text_refs = [
+        ref(snapshot.text(index, field))
+        for index in indices
+        for field in TEXT_FIELDS
+    ]
+
+    min_lat, lat_step, lat_q = _quantize([snapshot.latitudes[i] for i in indices])
+    min_lon, lon_step, lon_q = _quantize([snapshot.longitudes[i] for i in indices])
+
+    prices = array("H")
+    for index in indices:
+        for fuel_type in FUEL_TYPES:
+            price = snapshot.prices[fuel_type][index]
+            prices.append(0 if math.isnan(price) else min(round(price * PRICE_SCALE), 65535))
+
+    blob = bytearray()
+    offsets = array("I", [0])
+    for text in strings:
+        blob += text.encode("utf-8")
+        offsets.append(len(blob))
+
+    ref_type = "H" if len(strings) <= 65535 else "I"
+    body = b"".join([
+        _le_bytes(offsets),
+        bytes(blob),
+        _le_bytes(array(ref_type, fuel_refs)),
+        _le_bytes(lat_q),
+        _le_bytes(lon_q),
+        _le_bytes(prices),
+        _le_bytes(array(ref_type, text_refs)),
+    ])
+
+    header = _HEADER.pack(
+        MAGIC, FORMAT_VERSION, array(ref_type).itemsize, len(FUEL_TYPES), len(indices),
+        len(strings), min_lat, min_lon, lat_step, lon_step
+    )
+    return header + zlib.compress(body, 9)
+
+def content_etag(data: bytes) -> str:
+    return '"' + hashlib.sha256(data).hexdigest()[:32] + '"'
+
+class Extract:
+    """Reader for an extract; answers find_cheapest-style queries offline"""
+
+    def __init__(self, data: bytes):
+        (magic, version, ref_width, n_fuels, count, n_strings,
+         self.min_lat, self.min_lon, self.lat_step, self.lon_step) = _HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("Not a station extract")
+
+        body = zlib.decompress(data[_HEADER.size:])
+        ref_type = "H" if ref_width == 2 else "I"
+        position = 0
+
+        def take(typecode: str, length: int) -> array:
+            nonlocal position
+            size = array(typecode).itemsize * length
+            values = _from_le(typecode, body[position:position + size])
+            position += size
+            return values
+
+        offsets = take("I", n_strings + 1)
+        blob = body[position:position + offsets[-1]]
+        position += offsets[-1]
+        self._strings = [
+            blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(n_strings)
+        ]
+
+        self._fuel_columns = {}
+        for column, r in enumerate(take(ref_type, n_fuels)):
+            try:
+                self._fuel_columns[FuelType(self._strings[r])] = column
+            except ValueError:
+                pass  # Fuel type unknown to this reader: kept in the matrix, not queryable
+        self._n_fuels = n_fuels
+        self._lat_q = take("H", count)
+        self._lon_q = take("H", count)
+        self._prices = take("H", count * n_fuels)
+        self._text_refs = take(ref_type, count * N_TEXT_FIELDS)
+
+    def __len__(self) -> int:
+        return len(self._lat_q)
+
+    def latitude(self, index: int) -> float:
+        return self.min_lat + self._lat_q[index] * self.lat_step
+
+    def longitude(self, index: int) -> float:
+        return self.min_lon + self._lon_q[index] * self.lon_step
+
+    def price(self, index: int, fuel_type: FuelType) -> float | None:
+        column = self._fuel_columns.get(fuel_type)
+        if column is None:
+            return None
+        value = self._prices[index * self._n_fuels + column]
+        return value / PRICE_SCALE if value else None
+
+    def station(self, index: int) -> FuelStation:
+        refs = self._text_refs[index * N_TEXT_FIELDS:(index + 1) * N_TEXT_FIELDS]
+        precios = {}
+        for fuel_type in self._fuel_columns:
+            price = self.price(index, fuel_type)
+            if price is not None:
+                precios[fuel_type] = price
+
+        return FuelStation(
+            **{field: self._strings[r] for field, r in zip(TEXT_FIELDS, refs)},
+            latitud=self.latitude(index),
+            longitud=self.longitude(index),
+            precios=precios
+        )
+
+    def find_cheapest(
+        self,
+        user_lat: float,
+        user_lon: float,
+        radius_km: float,
+        fuel_type: FuelType,
+        limit: int = 3
+    ) -> List[FuelStation]:
+        """Equivalent of FuelStationFinder.find_cheapest on the extract's stations"""
+        candidates = []
+        for index in range(len(self)):
+            price = self.price(index, fuel_type)
+            if price is None:
+                continue
+            distance = calculate_distance(
+                user_lat, user_lon, self.latitude(index), self.longitude(index)
+            )
+            if distance <= radius_km:
+                candidates.append((price, index, distance))
+
+        results = []
+        for _, index, distance in heapq.nsmallest(limit, candidates):
+            station = self.station(index)
+            station._distance = distance  # type: ignore
+            results.append(station)
+        return results
+
+def tile_for(lat: float, lon: float, zoom: int) -> tuple[int, int]:
+    """Web-mercator (slippy map) tile x/y containing a point"""
+    n = 2 ** zoom
+    lat_rad = math.radians(max(min(lat, 85.0511), -85.0511))
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+class ExtractCache:
+    """
+    Extracts of the current snapshot, built on first request.
+
+    Entries are (data, etag) and are dropped as soon as a snapshot with a
+    newer generation is passed in. The API calls it from worker threads:
+    the lock only guards the cache, extracts are built outside it, and an
+    extract built from an older snapshot than the current one is returned
+    but not cached. Stations are bucketed by tile once per zoom, so a tile
+    (even an empty one) costs a dict lookup after the first.
+    """
+
+    def __init__(self):
+        self._generation: int | None = None
+        self._extracts: Dict[str, tuple[bytes, str]] = {}
+        self._tiles_by_zoom: Dict[int, Dict[tuple[int, int], array]] = {}
+        self._lock = threading.Lock()
+
+    def _is_current(self, snapshot: StationSnapshot) -> bool:
+        """Start over for a newer snapshot; False for an older one. Call with the lock held."""
+        if self._generation is None or snapshot.generation > self._generation:
+            self._generation = snapshot.generation
+            self._extracts = {}
+            self._tiles_by_zoom = {}
+        return snapshot.generation == self._generation
+
+    def _get(self, snapshot: StationSnapshot, key: str, indices_func) -> tuple[bytes, str] | None:
+        with self._lock:
+            if self._is_current(snapshot) and key in self._extracts:
+                return self._extracts[key]
+
+        indices = indices_func()
+        if not indices:
+            return None
+        data = encode_extract(snapshot, indices)
+        extract = (data, content_etag(data))
+
+        with self._lock:
+            if snapshot.generation == self._generation:
+                self._extracts[key] = extract
+        return extract
+
+    def _tile_index(self, snapshot: StationSnapshot, zoom: int) -> Dict[tuple[int, int], array]:
+        """Station indices per tile x/y at `zoom`"""
+        with self._lock:
+            if self._is_current(snapshot) and zoom in self._tiles_by_zoom:
+                return self._tiles_by_zoom[zoom]
+
+        tiles: Dict[tuple[int, int], array] = {}
+        for index in range(len(snapshot)):
+            key = tile_for(snapshot.latitudes[index], snapshot.longitudes[index], zoom)
+            tiles.setdefault(key, array("I")).append(index)
+
+        with self._lock:
+            if snapshot.generation == self._generation:
+                self._tiles_by_zoom[zoom] = tiles
+        return tiles
+
+    def provincia(self, snapshot: StationSnapshot, name: str) -> tuple[bytes, str] | None:
+        key = normalize_name(name)
+        return self._get(
+            snapshot, f"provincia/{key}",
+            lambda: list(snapshot.indices_by_provincia.get(key, ()))
+        )
+
+    def tile(self, snapshot: StationSnapshot, zoom: int, x: int, y: int) -> tuple[bytes, str] | None:
+        return self._get(
+            snapshot, f"tile/{zoom}/{x}/{y}",
+            lambda: self._tile_index(snapshot, zoom).get((x, y), ())
+        )
@@ -1,6 +1,15 @@
-from typing import List
+import heapq
+from bisect import bisect_left
+from datetime import datetime
+from itertools import islice
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
 from src.models import FuelStation, FuelType
 from src.services.geo import calculate_distance
+from src.services.snapshot import fuel_mask
+from src.request_profiling import stage
+
+if TYPE_CHECKING:
+    from src.services.snapshot import StationSnapshot
 
 class FuelStationFinder:
     async def find_cheapest(
@@ -50,3 +59,271 @@ class FuelStationFinder:
 
         # Return top 3
         return stations_in_radius[:3]
+
+    async def find_cheapest_in_snapshot(
+        self,
+        snapshot: "StationSnapshot",
+        user_lat: float,
+        user_lon: float,
+        radius_km: float,
+        fuel_type: FuelType,
+        limit: int = 3,
+        also_selling: Sequence[FuelType] = (),
+        open_at: datetime | None = None,
+        brands: Sequence[str] = (),
+        exclude_brands: Sequence[str] = ()
+    ) -> List[FuelStation]:
+        """
+        Same as find_cheapest, but scans the snapshot's coordinate and price
+        columns and only materialises the stations that are returned.
+
+        Only stations from the snapshot's fuel index are visited. Stations
+        must also sell every fuel in `also_selling`; ranking is always by the
+        price of `fuel_type`.
+
+        With `open_at`, only stations open at that time are returned
+        (see opening_hours.OpeningHours.slot_bits for how it is read).
+        `brands` keeps only stations of those brands and `exclude_brands`
+        drops stations of those brands (see StationSnapshot.stations_of_brand).
+        Both are applied before ranking.
+
+        Returned stations are copies, so `_distance` is never written onto
+        objects shared with concurrent requests.
+        """
+        with stage("scan"):
+            candidates = heapq.nsmallest(limit, self._scan_radius(
+                snapshot, user_lat, user_lon, radius_km, fuel_type, also_selling, open_at,
+                brands, exclude_brands
+            ))
+
+        with stage("materialize"):
+            return self._materialize(snapshot, candidates)
+
+    async def find_cheapest_by_radius(
+        self,
+        snapshot: "StationSnapshot",
+        user_lat: float,
+        user_lon: float,
+        radii_km: Sequence[float],
+        fuel_type: FuelType,
+        limit: int = 3,
+        also_selling: Sequence[FuelType] = (),
+        open_at: datetime | None = None,
+        brands: Sequence[str] = (),
+        exclude_brands: Sequence[str] = ()
+    ) -> Dict[float, List[FuelStation]]:
+        """
+        The `limit` cheapest stations for each radius in `radii_km`, in one scan.
+
+        Distances are computed once, against the largest radius. Each
+        candidate goes into a bounded heap for every radius that contains
+        it. Asking for 5/10/25 km therefore costs about the same as a single
+        25 km search.
+
+        Returns:
+            Results keyed by radius, in ascending radius order
+        """
+        radii = sorted(set(radii_km))
+        if not radii or limit <= 0:
+            return {radius: [] for radius in radii}
+
+        # Max-heaps of (-price, -index, distance) holding the best `limit` per radius
+        heaps: List[List[Tuple[float, int, float]]] = [[] for _ in radii]
+        with stage("scan"):
+            for price, index, distance in self._scan_radius(
+                snapshot, user_lat, user_lon, radii[-1], fuel_type, also_selling, open_at,
+                brands, exclude_brands
+            ):
+                entry = (-price, -index, distance)
+                for heap in heaps[bisect_left(radii, distance):]:
+                    if len(heap) < limit:
+                        heapq.heappush(heap, entry)
+                    elif entry > heap[0]:
+                        heapq.heapreplace(heap, entry)
+
+        with stage("materialize"):
+            return {
+                radius: self._materialize(snapshot, sorted(
+                    (-neg_price, -neg_index, distance) for neg_price, neg_index, distance in heap
+                ))
+                for radius, heap in zip(radii, heaps)
+            }
+
+    async def find_nearest_in_snapshot(
+        self,
+        snapshot: "StationSnapshot",
+        user_lat: float,
+        user_lon: float,
+        fuel_type: FuelType,
+        limit: int = 5,
+        also_selling: Sequence[FuelType] = (),
+        open_at: datetime | None = None,
+        brands: Sequence[str] = (),
+        exclude_brands: Sequence[str] = (),
+        max_distance_km: float | None = None
+    ) -> List[FuelStation]:
+        """
+        The `limit` stations closest to the user that sell `fuel_type`, at
+        any distance.
+
+        Walks the snapshot's grid index of that fuel best-first (see
+        spatial.GridIndex), so only distances to stations in the cells near
+        the user are computed. Filters are the same as find_cheapest_in_snapshot.
+
+        Returns:
+            Up to `limit` stations, nearest first
+        """
+        if limit <= 0:
+            return []
+        accept = self._station_filter(snapshot, fuel_type, also_selling, open_at, brands, exclude_brands)
+        prices = snapshot.prices[fuel_type]
+
+        with stage("scan"):
+            candidates = [
+                (prices[index], index, distance)
+                for distance, index in islice(snapshot.spatial_index(fuel_type).nearest(
+                    user_lat, user_lon, snapshot.latitudes, snapshot.longitudes,
+                    accept=accept, max_distance_km=max_distance_km
+                ), limit)
+            ]
+
+        with stage("materialize"):
+            return self._materialize(snapshot, candidates)
+
+    async def find_page_in_snapshot(
+        self,
+        snapshot: "StationSnapshot",
+        user_lat: float,
+        user_lon: float,
+        radius_km: float,
+        fuel_type: FuelType,
+        limit: int = 100,
+        after: Tuple[float, int] | None = None,
+        also_selling: Sequence[FuelType] = (),
+        open_at: datetime | None = None,
+        brands: Sequence[str] = (),
+        exclude_brands: Sequence[str] = ()
+    ) -> Tuple[List[FuelStation], Tuple[float, int] | None]:
+        """
+        One page of every station in the radius, ordered by (price, index).
+
+        Keyset pagination: pass the returned key as `after` to get the next
+        page. Only `limit + 1` candidates are held in memory per page, however
+        many stations the radius contains.
+
+        Returns:
+            The stations of this page and the key to continue from, or None
+            on the last page
+        """
+        candidates = self._scan_radius(
+            snapshot, user_lat, user_lon, radius_km, fuel_type, also_selling, open_at,
+            brands, exclude_brands
+        )
+        if after is not None:
+            candidates = (c for c in candidates if c[:2] > after)
+
+        with stage("scan"):
+            page = heapq.nsmallest(limit + 1, candidates)
+
+        next_key = None
+        if len(page) > limit:
+            page = page[:limit]
+            next_key = page[-1][:2]
+
+        with stage("materialize"):
+            return self._materialize(snapshot, page), next_key
+
+    def _scan_radius(
+        self,
+        snapshot: "StationSnapshot",
+        user_lat: float,
+        user_lon: float,
+        radius_km: float,
+        fuel_type: FuelType,
+        also_selling: Sequence[FuelType] = (),
+        open_at: datetime | None = None,
+        brands: Sequence[str] = (),
+        exclude_brands: Sequence[str] = ()
+    ) -> Iterator[Tuple[float, int, float]]:
+        """Yield (price, index, distance) for indexed stations inside the radius"""
+        prices = snapshot.prices[fuel_type]
+        latitudes = snapshot.latitudes
+        longitudes = snapshot.longitudes
+
+        fuel_types = [fuel_type, *also_selling]
+        indices = snapshot.stations_selling(fuel_types)
+        if brands:
+            allowed = self._brand_union(snapshot, brands)
+            if len(allowed) < len(indices):
+                # Few partner stations: walk the brand index and check fuels by mask
+                required = fuel_mask(fuel_types)
+                masks = snapshot.fuel_masks
+                indices = sorted(i for i in allowed if masks[i] & required == required)
+            else:
+                indices = [i for i in indices if i in allowed]
+        if exclude_brands:
+            excluded = self._brand_union(snapshot, exclude_brands)
+            indices = [i for i in indices if i not in excluded]
+        if open_at is not None:
+            # One bit test per candidate against the parsed weekly schedules
+            hours = snapshot.opening_hours
+            bits = hours.slot_bits(open_at)
+            masks, canary = hours.masks, hours.canary
+            indices = [i for i in indices if masks[i] & bits[canary[i]]]
+
+        for index in indices:
+            distance = calculate_distance(
+                user_lat, user_lon,
+                latitudes[index], longitudes[index]
+            )
+            if distance <= radius_km:
+                yield prices[index], index, distance
+
+    @staticmethod
+    def _brand_union(snapshot: "StationSnapshot", brands: Sequence[str]) -> frozenset:
+        return frozenset().union(*(snapshot.stations_of_brand(b) for b in brands))
+
+    def _station_filter(
+        self,
+        snapshot: "StationSnapshot",
+        fuel_type: FuelType,
+        also_selling: Sequence[FuelType] = (),
+        open_at: datetime | None = None,
+        brands: Sequence[str] = (),
+        exclude_brands: Sequence[str] = ()
+    ) -> Callable[[int], bool] | None:
+        """
+        Per-station version of _scan_radius's filters, for searches that only
+        look at a few stations. None when nothing has to be filtered.
+        """
+        checks = []
+        if also_selling:
+            required = fuel_mask([fuel_type, *also_selling])
+            masks = snapshot.fuel_masks
+            checks.append(lambda i: masks[i] & required == required)
+        if brands:
+            allowed = self._brand_union(snapshot, brands)
+            checks.append(allowed.__contains__)
+        if exclude_brands:
+            excluded = self._brand_union(snapshot, exclude_brands)
+            checks.append(lambda i: i not in excluded)
+        if open_at is not None:
+            hours = snapshot.opening_hours
+            bits = hours.slot_bits(open_at)
+            checks.append(lambda i: hours.is_open(i, bits))
+
+        if not checks:
+            return None
+        return lambda i: all(check(i) for check in checks)
+
+    def _materialize(
+        self,
+        snapshot: "StationSnapshot",
+        candidates: Iterable[Tuple[float, int, float]]
+    ) -> List[FuelStation]:
+        results = []
+        for _, index, distance in candidates:
+            station = snapshot.station(index).model_copy()
+            station._distance = distance  # type: ignore
+            results.append(station)
+        return results
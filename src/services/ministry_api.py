@@ -1,27 +1,218 @@
-import httpx
-from typing import List
+import asyncio
+import hashlib
+import json
+import logging
+import re
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Sequence, Tuple
+from src.config import config
 from src.models.fuel_station import FuelStation, FuelType
 
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
 MINISTRY_API_URL = "https://sedeaplicaciones.minetur.gob.es/ServiciosRESTCarburantes/PreciosCarburantes/EstacionesTerrestres/"
 
+# INE province codes accepted by the FiltroProvincia endpoint (52 = Melilla)
+PROVINCE_IDS = tuple(f"{code:02d}" for code in range(1, 53))
+
+# "Fecha" (the dataset timestamp) comes first in the document; only its start is searched
+_FECHA_RE = re.compile(rb'"Fecha"\s*:\s*"([^"]*)"')
+FECHA_SCAN_BYTES = 1024
+
+@dataclass(frozen=True)
+class PayloadVersion:
+    """
+    What identifies one upstream document, to recognise it when it comes again.
+
+    `etag`/`last_modified` are sent back as conditional request headers when
+    the server offered them. Otherwise a body with the same `Fecha` is taken
+    as unchanged, and without `Fecha` a body with the same SHA-256.
+    """
+    etag: str | None = None
+    last_modified: str | None = None
+    fecha: str | None = None
+    digest: str | None = None
+
+    @classmethod
+    def of(cls, headers, body: bytes) -> "PayloadVersion":
+        match = _FECHA_RE.search(body, 0, FECHA_SCAN_BYTES)
+        fecha = match.group(1).decode("utf-8", "replace") if match else None
+        return cls(
+            etag=headers.get("etag"),
+            last_modified=headers.get("last-modified"),
+            fecha=fecha,
+            # Hashing is only needed when there is no Fecha to compare
+            digest=None if fecha else hashlib.sha256(body).hexdigest()
+        )
+
+    def request_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def same_payload(self, other: "PayloadVersion") -> bool:
+        if self.fecha is not None and other.fecha is not None:
+            return self.fecha == other.fecha
+        return self.digest is not None and self.digest == other.digest
+
 class MinistryAPIClient:
-    def __init__(self, http_client: httpx.AsyncClient | None = None):
+    def __init__(self, http_client: "httpx.AsyncClient | None" = None, url: str | None = None):
         self._http_client = http_client
+        self._url = url or config.MINISTRY_API_URL or MINISTRY_API_URL
 
     async def get_all_stations(self) -> List[FuelStation]:
         """Fetch all fuel stations from the Ministry API"""
         if self._http_client is None:
+            # httpx is imported on first fetch to keep it off the cold-start path
+            import httpx
+
             async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(MINISTRY_API_URL)
+                response = await client.get(self._url)
                 response.raise_for_status()
                 data = response.json()
         else:
-            response = await self._http_client.get(MINISTRY_API_URL)
+            response = await self._http_client.get(self._url)
             response.raise_for_status()
             data = response.json()
 
         return self._parse_stations(data)
 
+    async def get_all_stations_if_changed(
+        self,
+        previous: PayloadVersion | None = None
+    ) -> Tuple[List[FuelStation] | None, PayloadVersion]:
+        """
+        Fetch all stations unless the document is the one `previous` describes.
+
+        The request is conditional when `previous` has an ETag or
+        Last-Modified, and a 304 costs no body at all. A full body is still
+        checked against `previous` (Fecha, else content hash) before any
+        JSON decoding or parsing.
+
+        Returns:
+            The stations, or None when unchanged, and the document's version
+        """
+        if self._http_client is None:
+            import httpx
+
+            async with httpx.AsyncClient(timeout=30.0) as client:
+                data, version = await self._fetch_if_changed(client, self._url, previous)
+        else:
+            data, version = await self._fetch_if_changed(self._http_client, self._url, previous)
+
+        if data is None:
+            return None, version
+        return self._parse_stations(data), version
+
+    async def _fetch_if_changed(
+        self,
+        client: "httpx.AsyncClient",
+        url: str,
+        previous: PayloadVersion | None
+    ) -> Tuple[dict | None, PayloadVersion]:
+        """Decoded JSON of `url`, or None (and no decoding) when it is `previous` again"""
+        headers = previous.request_headers() if previous is not None else {}
+        response = await client.get(url, headers=headers)
+        if response.status_code == 304 and previous is not None:
+            return None, previous
+        response.raise_for_status()
+
+        body = response.content
+        version = PayloadVersion.of(response.headers, body)
+        if previous is not None and version.same_payload(previous):
+            return None, version
+        return json.loads(body), version
+
+    def province_url(self, province_id: str) -> str:
+        return f"{self._url.rstrip('/')}/FiltroProvincia/{province_id}"
+
+    async def get_stations_by_province(
+        self,
+        province_ids: Sequence[str] = PROVINCE_IDS,
+        concurrency: int = 8,
+        retries: int = 2,
+        retry_delay: float = 0.5,
+        versions: Dict[str, PayloadVersion] | None = None
+    ) -> Tuple[Dict[str, List[FuelStation]], List[str]]:
+        """
+        Fetch the stations of each province concurrently.
+
+        At most `concurrency` requests are in flight over one pooled client.
+        Each slice is parsed as soon as it arrives, while the others are
+        still downloading. Slices that fail are retried up to `retries` more
+        times, with exponential backoff, and only those slices are requested
+        again.
+
+        With `versions` (province id -> PayloadVersion of the last slice
+        seen), requests are conditional: provinces whose slice did not
+        change are left out of the result without being parsed, and
+        `versions` is updated in place.
+
+        Returns:
+            Stations by province id, and the ids that still failed
+        """
+        if self._http_client is None:
+            import httpx
+
+            limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+            async with httpx.AsyncClient(timeout=30.0, limits=limits) as client:
+                return await self._fetch_provinces(
+                    client, province_ids, concurrency, retries, retry_delay, versions
+                )
+        return await self._fetch_provinces(
+            self._http_client, province_ids, concurrency, retries, retry_delay, versions
+        )
+
+    async def _fetch_provinces(
+        self,
+        client: "httpx.AsyncClient",
+        province_ids: Sequence[str],
+        concurrency: int,
+        retries: int,
+        retry_delay: float,
+        versions: Dict[str, PayloadVersion] | None = None
+    ) -> Tuple[Dict[str, List[FuelStation]], List[str]]:
+        semaphore = asyncio.Semaphore(concurrency)
+        slices: Dict[str, List[FuelStation]] = {}
+
+        async def fetch(province_id: str) -> None:
+            async with semaphore:
+                if versions is None:
+                    response = await client.get(self.province_url(province_id))
+                    response.raise_for_status()
+                    data = response.json()
+                else:
+                    data, version = await self._fetch_if_changed(
+                        client, self.province_url(province_id), versions.get(province_id)
+                    )
+            if data is not None:
+                slices[province_id] = self._parse_stations(data)
+            # Only remembered once parsed, so a slice that failed is fetched in full again
+            if versions is not None:
+                versions[province_id] = version
+
+        pending = list(province_ids)
+        for attempt in range(retries + 1):
+            if attempt:
+                await asyncio.sleep(retry_delay * 2 ** (attempt - 1))
+            outcomes = await asyncio.gather(*(fetch(p) for p in pending), return_exceptions=True)
+            failed = []
+            for province_id, outcome in zip(pending, outcomes):
+                if isinstance(outcome, Exception):
+                    logger.warning(f"Province {province_id} fetch failed (attempt {attempt + 1}): {outcome!r}")
+                    failed.append(province_id)
+            pending = failed
+            if not pending:
+                break
+
+        return slices, pending
+
     def _parse_stations(self, data: dict) -> List[FuelStation]:
         """Parse Ministry API response into FuelStation objects"""
         stations = []
@@ -59,7 +250,8 @@ class MinistryAPIClient:
                 provincia=item.get("Provincia", ""),
                 latitud=latitud,
                 longitud=longitud,
-                precios=precios
+                precios=precios,
+                horario=item.get("Horario", "")
             )
 
             stations.append(station)
@@ -0,0 +1,150 @@
+"""
+Weekly opening hours parsed from the Ministry `Horario` field.
+
+A schedule becomes a 672-bit integer: 7 days x 96 fifteen-minute slots,
+Monday 00:00 first. Bit `day * 96 + slot` is set when the station is open
+for that whole slot, so "is it open at T" is a single bit test. Typical
+values look like:
+
+    "L-D: 24H"
+    "L-V: 06:00-22:00; S: 07:00-15:00"
+    "L-S: 07:00-14:00 y 16:00-21:00; D: 08:00-14:00"
+    "L-D: 22:00-06:00"                (past midnight, into the next day)
+
+Schedules that cannot be parsed (or are missing) count as always open. A
+station is never hidden just because its Horario is unusual.
+"""
+import re
+from array import array
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, List
+from zoneinfo import ZoneInfo
+
+if TYPE_CHECKING:
+    from src.services.snapshot import StationSnapshot
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+SLOTS_PER_WEEK = 7 * SLOTS_PER_DAY
+ALWAYS_OPEN = (1 << SLOTS_PER_WEEK) - 1
+
+DAYS = "LMXJVSD"
+
+# Stations keep their own local time; the Canary Islands are an hour behind
+PENINSULA_TZ = ZoneInfo("Europe/Madrid")
+CANARY_TZ = ZoneInfo("Atlantic/Canary")
+# Decided by position: the feed spells the provinces "PALMAS (LAS)" and
+# "SANTA CRUZ DE TENERIFE", and every island lies west of this longitude
+CANARY_MAX_LONGITUDE = -13.0
+
+_SEGMENT_RE = re.compile(r"^\s*(?P<days>[LMXJVSD ,\-]+?)\s*:\s*(?P<times>.+?)\s*$")
+_RANGE_RE = re.compile(r"(\d{1,2})[:.](\d{2})\s*-\s*(\d{1,2})[:.](\d{2})")
+
+def _parse_days(text: str) -> List[int] | None:
+    days = []
+    for part in text.replace(" ", "").split(","):
+        if len(part) == 1 and part in DAYS:
+            days.append(DAYS.index(part))
+        elif len(part) == 3 and part[1] == "-" and part[0] in DAYS and part[2] in DAYS:
+            start, end = DAYS.index(part[0]), DAYS.index(part[2])
+            days.extend((start + i) % 7 for i in range((end - start) % 7 + 1))
+        else:
+            return None
+    return days
+
+def _open_slots(day: int, start_minute: int, end_minute: int) -> int:
+    """Bits of the whole slots between two times of `day`; wraps past midnight"""
+    if end_minute <= start_minute:
+        end_minute += 24 * 60
+    first = -(-start_minute // SLOT_MINUTES)  # ceil: only slots open from their start
+    last = end_minute // SLOT_MINUTES
+    bits = 0
+    for slot in range(first, last):
+        bits |= 1 << ((day * SLOTS_PER_DAY + slot) % SLOTS_PER_WEEK)
+    return bits
+
+def parse_horario(text: str) -> int | None:
+    """Weekly slot bitset of a Horario string, or None if it cannot be parsed"""
+    if not text or not text.strip():
+        return None
+
+    mask = 0
+    for segment in text.upper().split(";"):
+        if not segment.strip():
+            continue
+        match = _SEGMENT_RE.match(segment)
+        if not match:
+            return None
+        days = _parse_days(match.group("days"))
+        if not days:
+            return None
+
+        times = match.group("times")
+        if times.replace(" ", "") == "24H":
+            ranges = [(0, 24 * 60)]
+        else:
+            ranges = [
+                (int(h1) * 60 + int(m1), int(h2) * 60 + int(m2))
+                for h1, m1, h2, m2 in _RANGE_RE.findall(times)
+            ]
+            if not ranges or any(end > 24 * 60 or start >= 24 * 60 for start, end in ranges):
+                return None
+
+        for day in days:
+            for start, end in ranges:
+                mask |= _open_slots(day, start, end)
+    return mask
+
+def week_slot(moment: datetime) -> int:
+    """Slot of a (local, wall-clock) time in the weekly bitset"""
+    return moment.weekday() * SLOTS_PER_DAY + (moment.hour * 60 + moment.minute) // SLOT_MINUTES
+
+class OpeningHours:
+    """
+    Weekly slot bitsets of every station in a snapshot.
+
+    Each distinct Horario string is parsed once, and stations with the same
+    schedule share the same integer.
+    """
+
+    def __init__(self, masks: List[int], canary: array, unparsed: int = 0):
+        self.masks = masks
+        self.canary = canary
+        self.unparsed = unparsed
+
+    @classmethod
+    def build(cls, snapshot: "StationSnapshot") -> "OpeningHours":
+        parsed: Dict[str, int | None] = {}
+        masks = []
+        canary = array("B")
+        unparsed = 0
+        for index in range(len(snapshot)):
+            horario = snapshot.text(index, "horario")
+            if horario not in parsed:
+                parsed[horario] = parse_horario(horario)
+            mask = parsed[horario]
+            if mask is None:
+                unparsed += 1
+                mask = ALWAYS_OPEN
+            masks.append(mask)
+            canary.append(snapshot.longitudes[index] < CANARY_MAX_LONGITUDE)
+        return cls(masks, canary, unparsed)
+
+    @staticmethod
+    def slot_bits(moment: datetime) -> tuple[int, int]:
+        """
+        Bit to test for peninsular and for Canary stations at `moment`.
+
+        A naive `moment` is taken as wall-clock time wherever the station is;
+        an aware one is converted to each station's time zone.
+        """
+        if moment.tzinfo is None:
+            bit = 1 << week_slot(moment)
+            return bit, bit
+        return (
+            1 << week_slot(moment.astimezone(PENINSULA_TZ)),
+            1 << week_slot(moment.astimezone(CANARY_TZ)),
+        )
+
+    def is_open(self, index: int, bits: tuple[int, int]) -> bool:
+        return bool(self.masks[index] & bits[self.canary[index]])
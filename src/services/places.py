@@ -0,0 +1,141 @@
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Tuple
+from src.services.text import normalize_name
+
+def _label_parts(text: str) -> Iterator[Tuple[str, str]]:
+    """
+    Every (name, qualifier) reading of a "name (qualifier)" label, the format
+    used for suggestions. Ministry names have parentheses of their own
+    ("San Bartolomé (PALMAS (LAS))"), so each "(" is tried as the split.
+    """
+    text = text.strip()
+    if not text.endswith(")"):
+        return
+    start = text.find("(", 1)
+    while start != -1:
+        yield text[:start], text[start + 1:-1]
+        start = text.find("(", start + 1)
+
+@dataclass(frozen=True)
+class Place:
+    name: str
+    provincia: str
+    kind: str  # "municipio" or "provincia"
+    latitude: float
+    longitude: float
+    stations: int
+
+    @property
+    def label(self) -> str:
+        if self.kind == "provincia":
+            return f"{self.name} (provincia)"
+        return f"{self.name} ({self.provincia})"
+
+class PlaceIndex:
+    """
+    Municipio and provincia names from a snapshot, each mapped to the
+    centroid of its stations.
+
+    Lookups use a sorted list of normalised keys (accent- and
+    case-insensitive) and bisect, so a prefix query costs O(log n) plus the
+    matches it returns. Every word start of a name is indexed too, so "henares"
+    finds "Alcalá de Henares".
+    """
+
+    def __init__(self, places: List[Place]):
+        self.places = places
+        keys: List[Tuple[str, int, int]] = []
+        self._by_name: Dict[str, List[int]] = {}
+        for place_id, place in enumerate(places):
+            name = normalize_name(place.name)
+            self._by_name.setdefault(name, []).append(place_id)
+            words = name.split(" ")
+            for start in range(len(words)):
+                # Second element ranks whole-name matches before word matches
+                keys.append((" ".join(words[start:]), 0 if start == 0 else 1, place_id))
+        keys.sort()
+        self._keys = [key for key, _, _ in keys]
+        self._entries = [(rank, place_id) for _, rank, place_id in keys]
+
+    @classmethod
+    def build(cls, snapshot) -> "PlaceIndex":
+        """Group the snapshot's stations by municipio and by provincia"""
+        groups: Dict[Tuple[str, str, str], List[float]] = {}
+        for index in range(len(snapshot)):
+            municipio = snapshot.text(index, "municipio")
+            provincia = snapshot.text(index, "provincia")
+            lat = snapshot.latitudes[index]
+            lon = snapshot.longitudes[index]
+            for key in ((municipio, provincia, "municipio"), (provincia, provincia, "provincia")):
+                if not key[0]:
+                    continue
+                total = groups.setdefault(key, [0.0, 0.0, 0])
+                total[0] += lat
+                total[1] += lon
+                total[2] += 1
+
+        places = [
+            Place(name, provincia, kind, lat_sum / count, lon_sum / count, count)
+            for (name, provincia, kind), (lat_sum, lon_sum, count) in groups.items()
+        ]
+        return cls(places)
+
+    def search(self, query: str, limit: int = 10) -> List[Place]:
+        """
+        Places whose name (or a word in it) starts with `query`.
+
+        Ranked by: exact name, whole-name prefix before word prefix,
+        municipios before provincias, then by number of stations and name.
+        """
+        prefix = normalize_name(query)
+        if not prefix:
+            return []
+
+        start = bisect_left(self._keys, prefix)
+        best: Dict[int, int] = {}
+        for position in range(start, len(self._keys)):
+            if not self._keys[position].startswith(prefix):
+                break
+            rank, place_id = self._entries[position]
+            if self._keys[position] == prefix and rank == 0:
+                rank = -1
+            best[place_id] = min(rank, best.get(place_id, rank))
+
+        ranked = sorted(
+            best.items(),
+            key=lambda item: (
+                item[1],
+                self.places[item[0]].kind != "municipio",
+                -self.places[item[0]].stations,
+                normalize_name(self.places[item[0]].name),
+                normalize_name(self.places[item[0]].provincia),
+            )
+        )
+        return [self.places[place_id] for place_id, _ in ranked[:limit]]
+
+    def resolve(self, text: str) -> Place | None:
+        """
+        The place `text` unambiguously names, if any.
+
+        Accepts a bare name ("alcobendas") or a suggestion label
+        ("Alcobendas (Madrid)", "Madrid (provincia)"). A bare name prefers
+        the municipio over the provincia of the same name, and is ambiguous
+        (None) when several provinces have a municipio called that.
+        """
+        for name, qualifier in _label_parts(text):
+            name, qualifier = normalize_name(name), normalize_name(qualifier)
+            for place_id in self._by_name.get(name, []):
+                place = self.places[place_id]
+                if qualifier == "provincia" and place.kind == "provincia":
+                    return place
+                if place.kind == "municipio" and normalize_name(place.provincia) == qualifier:
+                    return place
+
+        candidates = [self.places[i] for i in self._by_name.get(normalize_name(text), [])]
+        municipios = [place for place in candidates if place.kind == "municipio"]
+        if len(municipios) == 1:
+            return municipios[0]
+        if not municipios and candidates:
+            return candidates[0]
+        return None
@@ -0,0 +1,248 @@
+"""
+Cheapest-price raster of a snapshot, served as map tiles.
+
+For each fuel, the stations selling it are binned into web-mercator cells:
+a tile z/x/y is GRID_SIZE x GRID_SIZE cells, so cells at tile zoom z are
+the tiles of zoom z + GRID_BITS. Every cell keeps the minimum price in it
+and the station that has it. Only cells with stations are stored, in three
+parallel arrays sorted by Morton (Z-order) key:
+
+    keys      uint64   interleaved bits of the cell x/y
+    prices    float32  cheapest price in the cell
+    stations  uint32   snapshot index of the cheapest station
+
+Because a tile is an aligned power-of-two square of cells, its cells are one
+contiguous run of keys, found with two binary searches. Coarser zoom levels
+are derived from the finest one (the parent of key k is k >> 2), so the
+whole pyramid costs a sort and one linear pass per level.
+"""
+import json
+import struct
+import threading
+import zlib
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Iterator, Tuple
+from src.models import FuelType
+from src.services.extracts import content_etag, tile_for
+
+if TYPE_CHECKING:
+    from src.services.snapshot import StationSnapshot
+
+GRID_BITS = 6
+GRID_SIZE = 1 << GRID_BITS
+TILE_PIXELS = 256
+CELL_PIXELS = TILE_PIXELS // GRID_SIZE
+TILE_ZOOMS = range(0, 13)
+MAX_ZOOM = TILE_ZOOMS[-1]
+
+# Prices are coloured from green to red between these national percentiles
+SCALE_PERCENTILES = (0.05, 0.95)
+
+def _spread(value: int) -> int:
+    """Put the bits of a 32-bit integer in the even positions of a 64-bit one"""
+    value &= 0xFFFFFFFF
+    value = (value | (value << 16)) & 0x0000FFFF0000FFFF
+    value = (value | (value << 8)) & 0x00FF00FF00FF00FF
+    value = (value | (value << 4)) & 0x0F0F0F0F0F0F0F0F
+    value = (value | (value << 2)) & 0x3333333333333333
+    return (value | (value << 1)) & 0x5555555555555555
+
+def _compact(value: int) -> int:
+    """Inverse of _spread: the even bits of `value` as an integer"""
+    value &= 0x5555555555555555
+    value = (value | (value >> 1)) & 0x3333333333333333
+    value = (value | (value >> 2)) & 0x0F0F0F0F0F0F0F0F
+    value = (value | (value >> 4)) & 0x00FF00FF00FF00FF
+    value = (value | (value >> 8)) & 0x0000FFFF0000FFFF
+    return (value | (value >> 16)) & 0xFFFFFFFF
+
+def morton(x: int, y: int) -> int:
+    return _spread(x) | (_spread(y) << 1)
+
+def unmorton(key: int) -> Tuple[int, int]:
+    return _compact(key), _compact(key >> 1)
+
+class PriceGrid:
+    """Cheapest price and station per cell of one fuel, for every zoom in TILE_ZOOMS"""
+
+    def __init__(
+        self,
+        fuel_type: FuelType,
+        levels: Dict[int, Tuple[array, array, array]],
+        scale: Tuple[float, float]
+    ):
+        self.fuel_type = fuel_type
+        self.levels = levels
+        self.scale = scale
+
+    @classmethod
+    def build(cls, snapshot: "StationSnapshot", fuel_type: FuelType) -> "PriceGrid":
+        prices = snapshot.prices[fuel_type]
+        finest = MAX_ZOOM + GRID_BITS
+
+        best: Dict[int, Tuple[float, int]] = {}
+        for index in snapshot.stations_by_fuel[fuel_type]:
+            key = morton(*tile_for(snapshot.latitudes[index], snapshot.longitudes[index], finest))
+            candidate = (prices[index], index)
+            if key not in best or candidate < best[key]:
+                best[key] = candidate
+
+        cells = sorted(best.items())
+        levels = {}
+        for zoom in reversed(TILE_ZOOMS):
+            levels[zoom] = (
+                array("Q", (key for key, _ in cells)),
+                array("f", (price for _, (price, _) in cells)),
+                array("I", (index for _, (_, index) in cells)),
+            )
+            # Parent cells are key >> 2, and stay sorted: merge runs of siblings
+            parents = []
+            for key, candidate in cells:
+                parent = key >> 2
+                if parents and parents[-1][0] == parent:
+                    if candidate < parents[-1][1]:
+                        parents[-1] = (parent, candidate)
+                else:
+                    parents.append((parent, candidate))
+            cells = parents
+
+        return cls(fuel_type, levels, cls._scale(snapshot, fuel_type))
+
+    @staticmethod
+    def _scale(snapshot: "StationSnapshot", fuel_type: FuelType) -> Tuple[float, float]:
+        national = snapshot.price_ranking.national.get(fuel_type)
+        if not national:
+            return 0.0, 0.0
+        low, high = SCALE_PERCENTILES
+        return national[int(low * (len(national) - 1))], national[int(high * (len(national) - 1))]
+
+    def cells(self, zoom: int, x: int, y: int) -> Iterator[Tuple[int, int, float, int]]:
+        """Yield (col, row, price, station index) of the non-empty cells of a tile"""
+        keys, prices, stations = self.levels[zoom]
+        tile_key = morton(x, y)
+        start = bisect_left(keys, tile_key << (2 * GRID_BITS))
+        end = bisect_left(keys, (tile_key + 1) << (2 * GRID_BITS))
+        for position in range(start, end):
+            cell_x, cell_y = unmorton(keys[position])
+            yield cell_x - x * GRID_SIZE, cell_y - y * GRID_SIZE, prices[position], stations[position]
+
+    def colour(self, price: float) -> bytes:
+        """RGBA from green (cheap) through yellow to red (expensive)"""
+        low, high = self.scale
+        t = 0.5 if high <= low else min(max((price - low) / (high - low), 0.0), 1.0)
+        if t < 0.5:
+            red, green = int(510 * t), 200
+        else:
+            red, green = 255, int(200 * (2 - 2 * t))
+        return bytes((red, green, 0, 220))
+
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+def encode_png(width: int, height: int, rgba: bytes) -> bytes:
+    """Minimal 8-bit RGBA PNG, no filtering"""
+    stride = width * 4
+    raw = b"".join(b"\x00" + rgba[row * stride:(row + 1) * stride] for row in range(height))
+    return b"".join([
+        b"\x89PNG\r\n\x1a\n",
+        _png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)),
+        _png_chunk(b"IDAT", zlib.compress(raw, 6)),
+        _png_chunk(b"IEND", b""),
+    ])
+
+def render_png(grid: PriceGrid, zoom: int, x: int, y: int) -> bytes:
+    """TILE_PIXELS square tile, one CELL_PIXELS square per cell, transparent where empty"""
+    pixels = bytearray(TILE_PIXELS * TILE_PIXELS * 4)
+    stride = TILE_PIXELS * 4
+    for col, row, price, _ in grid.cells(zoom, x, y):
+        block = grid.colour(price) * CELL_PIXELS
+        start = row * CELL_PIXELS * stride + col * CELL_PIXELS * 4
+        for line in range(CELL_PIXELS):
+            offset = start + line * stride
+            pixels[offset:offset + len(block)] = block
+    return encode_png(TILE_PIXELS, TILE_PIXELS, bytes(pixels))
+
+def render_json(grid: PriceGrid, snapshot: "StationSnapshot", zoom: int, x: int, y: int) -> bytes:
+    """Non-empty cells of a tile with their cheapest price and station id"""
+    low, high = grid.scale
+    return json.dumps({
+        "fuel_type": grid.fuel_type.value,
+        "z": zoom,
+        "x": x,
+        "y": y,
+        "grid_size": GRID_SIZE,
+        "escala_precios": [round(low, 3), round(high, 3)],
+        "cells": [
+            {"col": col, "row": row, "precio": round(price, 3), "id": snapshot.text(index, "id")}
+            for col, row, price, index in grid.cells(zoom, x, y)
+        ],
+    }, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+class PriceTileCache:
+    """
+    Encoded tiles of the current snapshot, least recently used evicted.
+
+    Entries are (data, etag), with the ETag a hash of the content, so a tile
+    whose cells did not change keeps its ETag across snapshot generations.
+    `cached` is cheap enough for the event loop; `tile` may build the grid
+    and render, so the API runs it in a worker thread. The lock only guards
+    the LRU, not the rendering.
+    """
+
+    def __init__(self, max_tiles: int = 4096):
+        self.max_tiles = max_tiles
+        self._generation: int | None = None
+        self._tiles: OrderedDict[tuple, Tuple[bytes, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def cached(
+        self,
+        snapshot: "StationSnapshot",
+        fuel_type: FuelType,
+        zoom: int,
+        x: int,
+        y: int,
+        format: str
+    ) -> Tuple[bytes, str] | None:
+        key = (fuel_type, zoom, x, y, format)
+        with self._lock:
+            if self._generation is None or snapshot.generation > self._generation:
+                self._generation = snapshot.generation
+                self._tiles = OrderedDict()
+            elif snapshot.generation < self._generation:
+                # A request still holding the previous snapshot: render, don't cache
+                return None
+            entry = self._tiles.get(key)
+            if entry is not None:
+                self._tiles.move_to_end(key)
+            return entry
+
+    def tile(
+        self,
+        snapshot: "StationSnapshot",
+        fuel_type: FuelType,
+        zoom: int,
+        x: int,
+        y: int,
+        format: str
+    ) -> Tuple[bytes, str]:
+        entry = self.cached(snapshot, fuel_type, zoom, x, y, format)
+        if entry is not None:
+            return entry
+
+        grid = snapshot.price_grid(fuel_type)
+        if format == "png":
+            data = render_png(grid, zoom, x, y)
+        else:
+            data = render_json(grid, snapshot, zoom, x, y)
+        entry = (data, content_etag(data))
+
+        with self._lock:
+            # A newer snapshot may have replaced this one while rendering
+            if snapshot.generation == self._generation:
+                self._tiles[(fuel_type, zoom, x, y, format)] = entry
+                while len(self._tiles) > self.max_tiles:
+                    self._tiles.popitem(last=False)
+        return entry
@@ -0,0 +1,56 @@
+from array import array
+from bisect import bisect_right
+from typing import TYPE_CHECKING, Dict
+from src.models import FuelType
+from src.services.text import normalize_name
+
+if TYPE_CHECKING:
+    from src.services.snapshot import StationSnapshot
+
+class PriceRanking:
+    """
+    Sorted prices of every station, per fuel type, nationally and per provincia.
+
+    Built once per snapshot. Placing a price is a binary search, so ranking
+    a returned station costs O(log n).
+    """
+
+    def __init__(
+        self,
+        national: Dict[FuelType, array],
+        by_provincia: Dict[str, Dict[FuelType, array]]
+    ):
+        self.national = national
+        self.by_provincia = by_provincia
+
+    @classmethod
+    def build(cls, snapshot: "StationSnapshot") -> "PriceRanking":
+        national = {}
+        by_provincia: Dict[str, Dict[FuelType, array]] = {key: {} for key in snapshot.indices_by_provincia}
+        for fuel_type, indices in snapshot.stations_by_fuel.items():
+            prices = snapshot.prices[fuel_type]
+            national[fuel_type] = array("d", sorted(prices[i] for i in indices))
+            for key, province_indices in snapshot.indices_by_provincia.items():
+                by_provincia[key][fuel_type] = array("d", sorted(
+                    prices[i] for i in province_indices if prices[i] == prices[i]  # skip NaN
+                ))
+        return cls(national, by_provincia)
+
+    @staticmethod
+    def _cheaper_than(sorted_prices: array, price: float) -> float | None:
+        if not sorted_prices:
+            return None
+        more_expensive = len(sorted_prices) - bisect_right(sorted_prices, price)
+        return 100.0 * more_expensive / len(sorted_prices)
+
+    def cheaper_than(self, fuel_type: FuelType, price: float, provincia: str | None = None) -> float | None:
+        """
+        Percentage of stations selling `fuel_type` at a higher price than `price`.
+
+        Compared nationally, or only within `provincia` when given. None when
+        no station sells that fuel there.
+        """
+        if provincia is None:
+            return self._cheaper_than(self.national.get(fuel_type, array("d")), price)
+        prices = self.by_provincia.get(normalize_name(provincia), {}).get(fuel_type, array("d"))
+        return self._cheaper_than(prices, price)
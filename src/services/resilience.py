@@ -0,0 +1,55 @@
+import time
+from typing import Callable
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker with exponential backoff.
+
+    After `failure_threshold` failures in a row the circuit opens and calls
+    are refused for `base_delay` seconds, doubling with every further
+    failure up to `max_delay`. Once the delay has passed one trial call is
+    allowed (half-open); a success closes the circuit again.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 3,
+        base_delay: float = 5.0,
+        max_delay: float = 300.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.failure_threshold = failure_threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._clock = clock
+        self.failures = 0
+        self._open_until = 0.0
+
+    @property
+    def state(self) -> str:
+        if self.failures < self.failure_threshold:
+            return "closed"
+        if self._clock() < self._open_until:
+            return "open"
+        return "half-open"
+
+    @property
+    def retry_in(self) -> float:
+        """Seconds until the next call is allowed (0 when allowed now)"""
+        if self.state != "open":
+            return 0.0
+        return self._open_until - self._clock()
+
+    def allow(self) -> bool:
+        return self.state != "open"
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._open_until = 0.0
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            exponent = self.failures - self.failure_threshold
+            delay = min(self.max_delay, self.base_delay * 2 ** exponent)
+            self._open_until = self._clock() + delay
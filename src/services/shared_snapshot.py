@@ -0,0 +1,326 @@
+"""
+Station snapshot shared between processes through a memory-mapped file.
+
+A single refresher process downloads the Ministry data and publishes it with
+`write_snapshot`; every uvicorn worker attaches with `SharedSnapshotReader`,
+which maps the file read-only and reads coordinates and prices straight out
+of the mapping. Publishing writes a new file and renames it over the old one,
+so workers still holding the previous generation keep a valid mapping and
+switch over on their next check.
+
+File layout (little-endian, 8-byte aligned sections):
+
+    header       magic, version, generation, fetched_at, count, n_fuels, blob_size
+    latitudes    float64[count]
+    longitudes   float64[count]
+    prices       float64[n_fuels][count]   (fuel-major, NaN = not sold)
+    fuel_masks   uint32[count]             (bit i = FUEL_TYPES[i] sold)
+    fuel_starts  uint32[n_fuels + 1]       into fuel_index
+    fuel_index   uint32[...]               station indices selling each fuel
+    offsets      uint32[count * N_TEXT_FIELDS + 1] into the string blob
+    blob         UTF-8 text fields
+"""
+import asyncio
+import logging
+import math
+import mmap
+import os
+import struct
+import tempfile
+import time
+from typing import List, Sequence
+from src.models import FuelStation
+from src.services.snapshot import FUEL_TYPES, SnapshotStore, SnapshotUnavailableError, StationSnapshot
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"GSNP"
+FORMAT_VERSION = 3
+
+_HEADER = struct.Struct("<4sIQdIII")
+HEADER_SIZE = (_HEADER.size + 7) // 8 * 8
+# fetched_at is rewritten in place when the upstream data did not change
+_FETCHED_AT = struct.Struct("<d")
+FETCHED_AT_OFFSET = struct.calcsize("<4sIQ")
+
+TEXT_FIELDS = ("id", "rotulo", "direccion", "municipio", "provincia", "horario")
+N_TEXT_FIELDS = len(TEXT_FIELDS)
+
+def _align(offset: int) -> int:
+    return (offset + 7) // 8 * 8
+
+def encode_snapshot(snapshot: StationSnapshot) -> bytes:
+    """Serialise a snapshot into the shared file layout"""
+    count = len(snapshot)
+
+    blob = bytearray()
+    offsets = [0]
+    for index in range(count):
+        station = snapshot.station(index)
+        for field in TEXT_FIELDS:
+            blob += getattr(station, field).encode("utf-8")
+            offsets.append(len(blob))
+
+    sections = [
+        struct.pack(f"<{count}d", *snapshot.latitudes),
+        struct.pack(f"<{count}d", *snapshot.longitudes),
+    ]
+    for fuel_type in FUEL_TYPES:
+        sections.append(struct.pack(f"<{count}d", *snapshot.prices[fuel_type]))
+    sections.append(struct.pack(f"<{count}I", *snapshot.fuel_masks))
+
+    fuel_starts = [0]
+    fuel_index = []
+    for fuel_type in FUEL_TYPES:
+        fuel_index.extend(snapshot.stations_by_fuel[fuel_type])
+        fuel_starts.append(len(fuel_index))
+    sections.append(struct.pack(f"<{len(fuel_starts)}I", *fuel_starts))
+    sections.append(struct.pack(f"<{len(fuel_index)}I", *fuel_index))
+    sections.append(struct.pack(f"<{len(offsets)}I", *offsets))
+
+    data = bytearray(_HEADER.pack(
+        MAGIC, FORMAT_VERSION, snapshot.generation, snapshot.fetched_at,
+        count, len(FUEL_TYPES), len(blob)
+    ))
+    for section in sections:
+        data += b"\0" * (_align(len(data)) - len(data))
+        data += section
+    data += blob
+    return bytes(data)
+
+def write_snapshot(path: str, snapshot: StationSnapshot) -> None:
+    """Atomically publish `snapshot` at `path`"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".snapshot-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(encode_snapshot(snapshot))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def read_generation(path: str) -> int:
+    """Generation stored in the file at `path`, or 0 if nothing is published"""
+    try:
+        with open(path, "rb") as f:
+            header = f.read(_HEADER.size)
+    except FileNotFoundError:
+        return 0
+    if len(header) < _HEADER.size:
+        return 0
+    magic, version, generation, *_ = _HEADER.unpack(header)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        return 0
+    return generation
+
+def touch_snapshot(path: str, fetched_at: float | None = None) -> bool:
+    """
+    Mark the published snapshot as fetched at `fetched_at` (now) in place.
+
+    Used instead of publishing when the upstream data is unchanged: the file
+    keeps its inode and generation, so workers keep their mapping and every
+    index built on it. Returns False if there is no snapshot to touch.
+    """
+    if read_generation(path) == 0:
+        return False
+    with open(path, "r+b") as f:
+        f.seek(FETCHED_AT_OFFSET)
+        f.write(_FETCHED_AT.pack(time.time() if fetched_at is None else fetched_at))
+    return True
+
+class _SharedStations(Sequence[FuelStation]):
+    """Sequence of stations decoded on access from the mapped file"""
+
+    def __init__(self, snapshot: "SharedSnapshot"):
+        self._snapshot = snapshot
+
+    def __len__(self) -> int:
+        return len(self._snapshot)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self._snapshot.station(index)
+
+class SharedSnapshot(StationSnapshot):
+    """StationSnapshot whose columns are zero-copy views into a mapped file"""
+
+    def __init__(self, buffer: mmap.mmap):
+        magic, version, generation, fetched_at, count, n_fuels, blob_size = \
+            _HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("Not a station snapshot file")
+        if n_fuels != len(FUEL_TYPES):
+            raise ValueError(f"Snapshot has {n_fuels} fuel types, expected {len(FUEL_TYPES)}")
+
+        self._buffer = buffer
+        view = memoryview(buffer)
+        offset = HEADER_SIZE
+
+        def take(size: int, fmt: str) -> memoryview:
+            nonlocal offset
+            offset = _align(offset)
+            column = view[offset:offset + size].cast(fmt)
+            offset += size
+            return column
+
+        latitudes = take(count * 8, "d")
+        longitudes = take(count * 8, "d")
+        prices = {fuel_type: take(count * 8, "d") for fuel_type in FUEL_TYPES}
+        fuel_masks = take(count * 4, "I")
+        fuel_starts = take((n_fuels + 1) * 4, "I")
+        fuel_index = take(fuel_starts[-1] * 4, "I")
+        stations_by_fuel = {
+            fuel_type: fuel_index[fuel_starts[i]:fuel_starts[i + 1]]
+            for i, fuel_type in enumerate(FUEL_TYPES)
+        }
+        self._offsets = take((count * N_TEXT_FIELDS + 1) * 4, "I")
+        self._blob = view[offset:offset + blob_size]
+
+        super().__init__(
+            stations=_SharedStations(self),
+            latitudes=latitudes,
+            longitudes=longitudes,
+            prices=prices,
+            generation=generation,
+            fetched_at=fetched_at,
+            fuel_masks=fuel_masks,
+            stations_by_fuel=stations_by_fuel
+        )
+
+    def _text(self, index: int, field: int) -> str:
+        position = index * N_TEXT_FIELDS + field
+        start, end = self._offsets[position], self._offsets[position + 1]
+        return bytes(self._blob[start:end]).decode("utf-8")
+
+    def text(self, index: int, field: str) -> str:
+        return self._text(index, TEXT_FIELDS.index(field))
+
+    def station(self, index: int) -> FuelStation:
+        precios = {}
+        for fuel_type in FUEL_TYPES:
+            price = self.prices[fuel_type][index]
+            if not math.isnan(price):
+                precios[fuel_type] = price
+
+        return FuelStation(
+            **{field: self._text(index, i) for i, field in enumerate(TEXT_FIELDS)},
+            latitud=self.latitudes[index],
+            longitud=self.longitudes[index],
+            precios=precios
+        )
+
+class SharedSnapshotReader:
+    """
+    Read-only attachment to a published snapshot file.
+
+    `current()` stats the file at most once every `check_interval` seconds
+    and remaps it when a new generation has been renamed into place. A file
+    only touched in place (same inode and size) just updates `fetched_at`.
+    """
+
+    def __init__(self, path: str, check_interval: float = 1.0):
+        self.path = path
+        self._check_interval = check_interval
+        self._snapshot: SharedSnapshot | None = None
+        self._file_id: tuple | None = None
+        self._checked_at = 0.0
+
+    def current(self) -> SharedSnapshot:
+        now = time.monotonic()
+        if self._snapshot is None or now - self._checked_at >= self._check_interval:
+            self._checked_at = now
+            self._reload_if_changed()
+
+        if self._snapshot is None:
+            raise SnapshotUnavailableError(f"No snapshot published at {self.path}")
+        return self._snapshot
+
+    def _reload_if_changed(self) -> None:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+
+        file_id = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if file_id == self._file_id:
+            return
+        if self._file_id is not None and (stat.st_ino, stat.st_size) == (self._file_id[0], self._file_id[2]):
+            buffer = self._snapshot._buffer
+            self._snapshot.fetched_at, = _FETCHED_AT.unpack_from(buffer, FETCHED_AT_OFFSET)
+            self._file_id = file_id
+            return
+
+        with open(self.path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        snapshot = SharedSnapshot(buffer)
+
+        logger.info(f"Attached snapshot generation {snapshot.generation} ({len(snapshot)} stations)")
+        self._snapshot = snapshot
+        self._file_id = file_id
+
+class SharedSnapshotStore:
+    """Snapshot store for API workers backed by a SharedSnapshotReader"""
+
+    def __init__(self, path: str):
+        self.reader = SharedSnapshotReader(path)
+
+    async def get(self) -> StationSnapshot:
+        return self.reader.current()
+
+def publish_snapshot(path: str, stations: List[FuelStation]) -> StationSnapshot:
+    """Publish `stations` as the next generation at `path`"""
+    snapshot = StationSnapshot.build(stations, generation=read_generation(path) + 1)
+    write_snapshot(path, snapshot)
+    return snapshot
+
+async def run_refresher(path: str, interval: float, refresh_mode: str = "national", concurrency: int = 8) -> None:
+    """Download and publish a new generation every `interval` seconds, if the data changed"""
+    store = SnapshotStore(refresh_mode=refresh_mode, concurrency=concurrency)
+    while True:
+        try:
+            stations = await store.download_stations()
+            if stations is None and touch_snapshot(path):
+                logger.info(
+                    f"Upstream unchanged, kept generation {read_generation(path)} "
+                    f"({store.refreshes_skipped} skipped, {store.refreshes_processed} processed)"
+                )
+            elif stations is None:
+                # The published file is gone: download everything again next time
+                store.forget_versions()
+            else:
+                snapshot = publish_snapshot(path, stations)
+                logger.info(f"Published generation {snapshot.generation} ({len(snapshot)} stations)")
+        except Exception:
+            store.forget_versions()
+            logger.exception("Snapshot refresh failed, keeping the previous generation")
+        await asyncio.sleep(interval)
+
+def main() -> None:
+    import argparse
+    from src.config import config
+
+    parser = argparse.ArgumentParser(description="Publish Ministry snapshots for API workers")
+    parser.add_argument("path", nargs="?", default=config.SNAPSHOT_PATH)
+    parser.add_argument("--interval", type=float, default=config.SNAPSHOT_MAX_AGE)
+    args = parser.parse_args()
+    if not args.path:
+        parser.error("a snapshot path is required (argument or SNAPSHOT_PATH)")
+
+    logging.basicConfig(
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        level=logging.INFO
+    )
+    asyncio.run(run_refresher(
+        args.path, args.interval, config.MINISTRY_REFRESH_MODE, config.MINISTRY_CONCURRENCY
+    ))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,429 @@
+import asyncio
+import logging
+import math
+import re
+import time
+from array import array
+from collections import OrderedDict
+from functools import cached_property
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Sequence
+from src.models import FuelStation, FuelType
+from src.services.ministry_api import MinistryAPIClient, PayloadVersion
+from src.services.resilience import CircuitBreaker
+from src.services.text import normalize_name
+
+if TYPE_CHECKING:
+    from src.services.opening_hours import OpeningHours
+    from src.services.places import PlaceIndex
+    from src.services.price_grid import PriceGrid
+    from src.services.ranking import PriceRanking
+    from src.services.spatial import GridIndex
+
+logger = logging.getLogger(__name__)
+
+# "national": one EstacionesTerrestres document; "province": concurrent FiltroProvincia slices
+REFRESH_MODES = ("national", "province")
+
+# Column order of fuel types in snapshots (and in the shared-memory layout)
+FUEL_TYPES = list(FuelType)
+
+# Bit of each fuel type in the per-station availability masks
+FUEL_BITS = {fuel_type: 1 << i for i, fuel_type in enumerate(FUEL_TYPES)}
+
+# Distinct brand queries whose matching stations are kept per snapshot
+BRAND_CACHE_SIZE = 256
+
+def _words(text: str) -> str:
+    """Text with punctuation turned into single spaces ("e.s. repsol-2" -> "e s repsol 2")"""
+    return " ".join(re.split(r"\W+", text)).strip()
+
+def fuel_mask(fuel_types: Iterable[FuelType]) -> int:
+    """Availability mask with the bits of all `fuel_types` set"""
+    mask = 0
+    for fuel_type in fuel_types:
+        mask |= FUEL_BITS[fuel_type]
+    return mask
+
+def build_fuel_index(
+    prices: Dict[FuelType, Sequence[float]],
+    count: int
+) -> tuple[array, Dict[FuelType, array]]:
+    """Per-station fuel masks and per-fuel arrays of the station indices selling it"""
+    masks = array("I", [0]) * count
+    stations_by_fuel = {}
+    for fuel_type in FUEL_TYPES:
+        column = prices[fuel_type]
+        bit = FUEL_BITS[fuel_type]
+        indices = array("I", (i for i in range(count) if column[i] == column[i]))
+        for i in indices:
+            masks[i] |= bit
+        stations_by_fuel[fuel_type] = indices
+    return masks, stations_by_fuel
+
+class SnapshotUnavailableError(Exception):
+    """Raised when no station snapshot has been published yet"""
+
+class StationSnapshot:
+    """
+    One Ministry download, immutable once built.
+
+    Besides the FuelStation objects it keeps columnar copies of coordinates
+    and prices (NaN where a fuel is not sold) so queries can scan plain
+    float arrays instead of pydantic models, plus a fuel availability index:
+    a bitmask per station (see FUEL_BITS) and, per fuel, the indices of the
+    stations selling it.
+    """
+
+    def __init__(
+        self,
+        stations: Sequence[FuelStation],
+        latitudes: Sequence[float],
+        longitudes: Sequence[float],
+        prices: Dict[FuelType, Sequence[float]],
+        generation: int = 0,
+        fetched_at: float | None = None,
+        fuel_masks: Sequence[int] | None = None,
+        stations_by_fuel: Dict[FuelType, Sequence[int]] | None = None
+    ):
+        self.stations = stations
+        self.latitudes = latitudes
+        self.longitudes = longitudes
+        self.prices = prices
+        if fuel_masks is None or stations_by_fuel is None:
+            fuel_masks, stations_by_fuel = build_fuel_index(prices, len(latitudes))
+        self.fuel_masks = fuel_masks
+        self.stations_by_fuel = stations_by_fuel
+        self.generation = generation
+        self.fetched_at = time.time() if fetched_at is None else fetched_at
+
+    @classmethod
+    def build(
+        cls,
+        stations: Sequence[FuelStation],
+        generation: int = 0,
+        fetched_at: float | None = None
+    ) -> "StationSnapshot":
+        """Build the columnar representation from parsed stations"""
+        return cls(
+            stations=stations,
+            latitudes=array("d", (s.latitud for s in stations)),
+            longitudes=array("d", (s.longitud for s in stations)),
+            prices={
+                fuel_type: array("d", (s.precios.get(fuel_type, math.nan) for s in stations))
+                for fuel_type in FUEL_TYPES
+            },
+            generation=generation,
+            fetched_at=fetched_at
+        )
+
+    def __len__(self) -> int:
+        return len(self.latitudes)
+
+    def station(self, index: int) -> FuelStation:
+        return self.stations[index]
+
+    def text(self, index: int, field: str) -> str:
+        """One text field of a station, without materialising the rest of it"""
+        return getattr(self.stations[index], field)
+
+    @cached_property
+    def indices_by_provincia(self) -> Dict[str, array]:
+        """Station indices per normalised provincia name, built on first use"""
+        provinces: Dict[str, array] = {}
+        for index in range(len(self)):
+            key = normalize_name(self.text(index, "provincia"))
+            provinces.setdefault(key, array("I")).append(index)
+        return provinces
+
+    @cached_property
+    def indices_by_rotulo(self) -> Dict[str, array]:
+        """Station indices per normalised brand (rotulo), built on first use"""
+        brands: Dict[str, array] = {}
+        for index in range(len(self)):
+            key = normalize_name(self.text(index, "rotulo"))
+            brands.setdefault(key, array("I")).append(index)
+        return brands
+
+    @cached_property
+    def _brand_matches(self) -> "OrderedDict[str, frozenset]":
+        return OrderedDict()
+
+    def stations_of_brand(self, brand: str) -> frozenset:
+        """
+        Indices of the stations whose rotulo is `brand` or contains it as whole
+        words, ignoring accents and case ("repsol" matches "E.S. REPSOL BUTARQUE").
+
+        Only the distinct rotulos are compared. Brands come straight from user
+        queries, so only the BRAND_CACHE_SIZE most recently used answers are kept.
+        """
+        key = _words(normalize_name(brand))
+        if key in self._brand_matches:
+            self._brand_matches.move_to_end(key)
+            return self._brand_matches[key]
+
+        matches = set()
+        if key:
+            needle = f" {key} "
+            for rotulo, indices in self.indices_by_rotulo.items():
+                if needle in f" {_words(rotulo)} ":
+                    matches.update(indices)
+        self._brand_matches[key] = frozenset(matches)
+        while len(self._brand_matches) > BRAND_CACHE_SIZE:
+            self._brand_matches.popitem(last=False)
+        return self._brand_matches[key]
+
+    @cached_property
+    def _spatial_indexes(self) -> Dict[FuelType, "GridIndex"]:
+        return {}
+
+    def spatial_index(self, fuel_type: FuelType) -> "GridIndex":
+        """Grid of the stations selling `fuel_type`, built on first use per fuel"""
+        if fuel_type not in self._spatial_indexes:
+            from src.services.spatial import GridIndex
+
+            self._spatial_indexes[fuel_type] = GridIndex.build(
+                self.latitudes, self.longitudes, self.stations_by_fuel[fuel_type]
+            )
+        return self._spatial_indexes[fuel_type]
+
+    @cached_property
+    def _price_grids(self) -> Dict[FuelType, "PriceGrid"]:
+        return {}
+
+    def price_grid(self, fuel_type: FuelType) -> "PriceGrid":
+        """Cheapest-price raster pyramid of `fuel_type`, built on first use per fuel"""
+        if fuel_type not in self._price_grids:
+            from src.services.price_grid import PriceGrid
+
+            self._price_grids[fuel_type] = PriceGrid.build(self, fuel_type)
+        return self._price_grids[fuel_type]
+
+    @cached_property
+    def places(self) -> "PlaceIndex":
+        """Municipio/provincia name index, built on first use"""
+        from src.services.places import PlaceIndex
+
+        return PlaceIndex.build(self)
+
+    @cached_property
+    def price_ranking(self) -> "PriceRanking":
+        """Sorted prices per fuel, nationally and per provincia, built on first use"""
+        from src.services.ranking import PriceRanking
+
+        return PriceRanking.build(self)
+
+    @cached_property
+    def opening_hours(self) -> "OpeningHours":
+        """Weekly opening-hour bitsets, parsed on first use"""
+        from src.services.opening_hours import OpeningHours
+
+        return OpeningHours.build(self)
+
+    def stations_selling(self, fuel_types: Sequence[FuelType]) -> Sequence[int]:
+        """Indices of the stations that sell every fuel in `fuel_types`"""
+        fuel_types = set(fuel_types)
+        if not fuel_types:
+            return range(len(self))
+
+        # Walk the shortest per-fuel list and test the rest with one AND
+        rarest = min(fuel_types, key=lambda fuel_type: len(self.stations_by_fuel[fuel_type]))
+        indices = self.stations_by_fuel[rarest]
+        if len(fuel_types) == 1:
+            return indices
+
+        required = fuel_mask(fuel_types)
+        masks = self.fuel_masks
+        return [i for i in indices if masks[i] & required == required]
+
+    @property
+    def age(self) -> float:
+        """Seconds since the snapshot was downloaded"""
+        return time.time() - self.fetched_at
+
+class SnapshotStore:
+    """
+    Process-local snapshot cache with stale-while-revalidate.
+
+    The Ministry data only changes a few times a day, so the snapshot is
+    reused until it is older than `max_age` seconds. After that the old
+    snapshot keeps being served immediately while a single background task
+    downloads the new one. Only the very first download is awaited by callers.
+
+    Downloads go through a circuit breaker: while the upstream keeps failing,
+    no new attempts are made until its backoff expires, and a cold store
+    fails fast with SnapshotUnavailableError instead of waiting for timeouts.
+
+    With `refresh_mode="province"` the data is downloaded as one slice per
+    province, `concurrency` at a time. A province that still fails after
+    its retries keeps its slice from the previous refresh, and the snapshot
+    is refreshed again on the next request (as far as the breaker allows),
+    instead of the whole refresh failing.
+
+    Refreshes are conditional: a payload the upstream reports as unchanged
+    (304, same Fecha or same content hash) is not parsed, and the current
+    snapshot is kept with its generation, so every cache built on it stays
+    warm. `refreshes_processed` and `refreshes_skipped` count both outcomes.
+    """
+
+    def __init__(
+        self,
+        client_factory: Callable[[], MinistryAPIClient] = MinistryAPIClient,
+        max_age: float = 600.0,
+        breaker: CircuitBreaker | None = None,
+        refresh_mode: str = "national",
+        concurrency: int = 8
+    ):
+        if refresh_mode not in REFRESH_MODES:
+            raise ValueError(f"Unknown refresh mode: {refresh_mode}")
+        self._client_factory = client_factory
+        self.max_age = max_age
+        self.breaker = breaker or CircuitBreaker()
+        self.refresh_mode = refresh_mode
+        self.concurrency = concurrency
+        self._slices: Dict[str, List[FuelStation]] = {}
+        self._version: PayloadVersion | None = None
+        self._province_versions: Dict[str, PayloadVersion] = {}
+        self.refreshes_processed = 0
+        self.refreshes_skipped = 0
+        self._complete = True
+        self._snapshot: StationSnapshot | None = None
+        self._lock = asyncio.Lock()
+        self._refresh_task: asyncio.Task | None = None
+
+    async def get(self) -> StationSnapshot:
+        if self._snapshot is not None:
+            if self._snapshot.age >= self.max_age or not self._complete:
+                self._schedule_refresh()
+            return self._snapshot
+
+        async with self._lock:
+            if self._snapshot is None:
+                if not self.breaker.allow():
+                    raise SnapshotUnavailableError(
+                        f"Ministry API unavailable, retrying in {self.breaker.retry_in:.0f} s"
+                    )
+                try:
+                    await self.refresh()
+                except Exception as e:
+                    raise SnapshotUnavailableError(f"Could not download station data: {e}") from e
+        return self._snapshot
+
+    def _schedule_refresh(self) -> None:
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return
+        if not self.breaker.allow():
+            return
+        self._refresh_task = asyncio.create_task(self._background_refresh())
+
+    async def _background_refresh(self) -> None:
+        try:
+            await self.refresh()
+        except Exception:
+            logger.warning(
+                f"Snapshot refresh failed ({self.breaker.failures} in a row, "
+                f"circuit {self.breaker.state}); serving generation {self._snapshot.generation}",
+                exc_info=True
+            )
+
+    async def download_stations(self) -> List[FuelStation] | None:
+        """
+        Download every station; counts towards the circuit breaker.
+
+        Returns None when nothing changed upstream since the last download.
+        """
+        try:
+            if self.refresh_mode == "province":
+                stations = await self._download_provinces()
+            else:
+                stations, self._version = await self._client_factory().get_all_stations_if_changed(
+                    self._version
+                )
+                self._complete = True
+        except Exception:
+            self.breaker.record_failure()
+            raise
+
+        if self._complete:
+            self.breaker.record_success()
+        else:
+            # Partial data is still published, but keep backing off the flaky upstream
+            self.breaker.record_failure()
+
+        if stations is None:
+            self.refreshes_skipped += 1
+        else:
+            self.refreshes_processed += 1
+        return stations
+
+    def refresh_stats(self) -> Dict[str, int | None]:
+        """Refresh counters, for the admin endpoint"""
+        return {
+            "processed": self.refreshes_processed,
+            "skipped": self.refreshes_skipped,
+            "generation": self._snapshot.generation if self._snapshot is not None else None,
+        }
+
+    def forget_versions(self) -> None:
+        """Make the next download parse everything, e.g. after failing to publish it"""
+        self._version = None
+        self._province_versions.clear()
+
+    async def _download_provinces(self) -> List[FuelStation] | None:
+        slices, failed = await self._client_factory().get_stations_by_province(
+            concurrency=self.concurrency,
+            versions=self._province_versions
+        )
+        changed = bool(slices)
+        self._slices.update(slices)
+        if not self._slices:
+            raise RuntimeError(f"All {len(failed)} province requests failed")
+
+        self._complete = not failed
+        if failed:
+            stale = [p for p in failed if p in self._slices]
+            logger.warning(
+                f"{len(failed)} province(s) failed: {', '.join(failed)}; "
+                f"{len(stale)} keep their previous stations"
+            )
+            if not changed:
+                # Not a confirmation that the data is current: keep its age
+                raise RuntimeError(
+                    f"{len(failed)} province request(s) failed and no other province changed"
+                )
+        elif not changed:
+            return None
+        return [station for province_id in sorted(self._slices) for station in self._slices[province_id]]
+
+    async def refresh(self) -> StationSnapshot:
+        stations = await self.download_stations()
+        if stations is None:
+            # Same data as the current snapshot: only its age starts over
+            self._snapshot.fetched_at = time.time()
+            logger.info(
+                f"Upstream unchanged, keeping generation {self._snapshot.generation} "
+                f"({self.refreshes_skipped} skipped, {self.refreshes_processed} processed)"
+            )
+            return self._snapshot
+
+        generation = self._snapshot.generation + 1 if self._snapshot is not None else 1
+        self._snapshot = StationSnapshot.build(stations, generation=generation)
+        return self._snapshot
+
+_snapshot_store = None
+
+def get_snapshot_store():
+    """Shared-memory snapshot when SNAPSHOT_PATH is set, otherwise a per-process cache"""
+    global _snapshot_store
+    if _snapshot_store is None:
+        from src.config import config
+
+        if config.SNAPSHOT_PATH:
+            from src.services.shared_snapshot import SharedSnapshotStore
+            _snapshot_store = SharedSnapshotStore(config.SNAPSHOT_PATH)
+        else:
+            _snapshot_store = SnapshotStore(
+                max_age=config.SNAPSHOT_MAX_AGE,
+                refresh_mode=config.MINISTRY_REFRESH_MODE,
+                concurrency=config.MINISTRY_CONCURRENCY
+            )
+    return _snapshot_store
@@ -0,0 +1,137 @@
+"""
+Grid index for nearest-station queries.
+
+Stations are bucketed into square latitude/longitude cells. A query walks
+the cells best-first, from the user's cell outwards, keeping a heap of both
+cells (keyed by a lower bound of the distance to anything inside them) and
+stations (keyed by their real distance). A station popped from the heap is
+therefore closer than anything not yet visited, and only the cells near the
+user are ever opened, however far the k-th station turns out to be.
+"""
+import heapq
+import math
+from array import array
+from typing import Callable, Dict, Iterator, Sequence, Tuple
+from src.services.geo import calculate_distance
+
+EARTH_RADIUS_KM = 6371
+
+# Cells are sized for about this many stations each, within these bounds
+STATIONS_PER_CELL = 4
+MIN_CELL_DEGREES = 0.05
+MAX_CELL_DEGREES = 2.0
+
+def _hav(angle: float) -> float:
+    return math.sin(angle / 2) ** 2
+
+class GridIndex:
+    """Station indices bucketed into lat/lon cells of `cell_degrees` degrees"""
+
+    def __init__(
+        self,
+        cells: Dict[Tuple[int, int], array],
+        cell_degrees: float,
+        rows: Tuple[int, int],
+        cols: Tuple[int, int],
+        max_abs_latitude: float
+    ):
+        self.cells = cells
+        self.cell_degrees = cell_degrees
+        self.rows = rows
+        self.cols = cols
+        # cos() of the latitude furthest from the equator, for the distance lower bound
+        self._min_cos = math.cos(math.radians(max_abs_latitude))
+
+    @classmethod
+    def build(
+        cls,
+        latitudes: Sequence[float],
+        longitudes: Sequence[float],
+        indices: Sequence[int]
+    ) -> "GridIndex":
+        if not indices:
+            return cls({}, MAX_CELL_DEGREES, (0, -1), (0, -1), 0.0)
+
+        lats = [latitudes[i] for i in indices]
+        lons = [longitudes[i] for i in indices]
+        area = max(max(lats) - min(lats), MIN_CELL_DEGREES) * max(max(lons) - min(lons), MIN_CELL_DEGREES)
+        cell_degrees = min(MAX_CELL_DEGREES, max(
+            MIN_CELL_DEGREES, math.sqrt(area * STATIONS_PER_CELL / len(indices))
+        ))
+
+        cells: Dict[Tuple[int, int], array] = {}
+        for index, lat, lon in zip(indices, lats, lons):
+            key = (math.floor(lat / cell_degrees), math.floor(lon / cell_degrees))
+            cells.setdefault(key, array("I")).append(index)
+
+        rows = [row for row, _ in cells]
+        cols = [col for _, col in cells]
+        max_abs_latitude = max(abs(min(lats)), abs(max(lats)))
+        return cls(cells, cell_degrees, (min(rows), max(rows)), (min(cols), max(cols)), max_abs_latitude)
+
+    def _lower_bound(self, lat: float, lon: float, row: int, col: int) -> float:
+        """
+        Distance from (lat, lon) that nothing in the cell can be closer than.
+
+        Haversine grows with the latitude and longitude differences and with
+        cos(lat1) * cos(lat2), so using the smallest differences to the cell
+        and the smallest cosine in the index gives a true lower bound. It
+        also never decreases when moving away from the user, which is what
+        lets the search expand cell by cell.
+        """
+        south, west = row * self.cell_degrees, col * self.cell_degrees
+        dlat = max(south - lat, lat - (south + self.cell_degrees), 0.0)
+        dlon = max(west - lon, lon - (west + self.cell_degrees), 0.0)
+        h = _hav(math.radians(dlat)) + math.cos(math.radians(lat)) * self._min_cos * _hav(math.radians(dlon))
+        return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(h, 1.0)))
+
+    def nearest(
+        self,
+        lat: float,
+        lon: float,
+        latitudes: Sequence[float],
+        longitudes: Sequence[float],
+        accept: Callable[[int], bool] | None = None,
+        max_distance_km: float | None = None
+    ) -> Iterator[Tuple[float, int]]:
+        """
+        Yield (distance, index) of the indexed stations, nearest first.
+
+        Stations for which `accept` returns False are skipped. The walk stops
+        at `max_distance_km`, or once every cell has been visited. Take as
+        many results as needed: cells are only opened on demand.
+        """
+        if not self.cells:
+            return
+        limit = math.inf if max_distance_km is None else max_distance_km
+        (min_row, max_row), (min_col, max_col) = self.rows, self.cols
+
+        # Start from the cell closest to the user, even when the user is outside the grid
+        start = (
+            min(max(math.floor(lat / self.cell_degrees), min_row), max_row),
+            min(max(math.floor(lon / self.cell_degrees), min_col), max_col),
+        )
+        seen = {start}
+        # (distance, kind, key): kind 0 = station (key = index), 1 = cell (key = (row, col))
+        heap: list = [(self._lower_bound(lat, lon, *start), 1, start)]
+        while heap:
+            distance, kind, key = heapq.heappop(heap)
+            if distance > limit:
+                return
+            if kind == 0:
+                yield distance, key
+                continue
+
+            for index in self.cells.get(key, ()):
+                if accept is None or accept(index):
+                    d = calculate_distance(lat, lon, latitudes[index], longitudes[index])
+                    heapq.heappush(heap, (d, 0, index))
+
+            row, col = key
+            for neighbour in ((row - 1, col), (row + 1, col), (row, col - 1), (row, col + 1)):
+                if neighbour in seen:
+                    continue
+                if not (min_row <= neighbour[0] <= max_row and min_col <= neighbour[1] <= max_col):
+                    continue
+                seen.add(neighbour)
+                heapq.heappush(heap, (self._lower_bound(lat, lon, *neighbour), 1, neighbour))
@@ -0,0 +1,11 @@
+import unicodedata
+
+def normalize_name(text: str) -> str:
+    """
+    Accent- and case-insensitive form of a place or brand name.
+
+    "Málaga", "MALAGA" and "  malaga " all normalise to "malaga".
+    """
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.casefold().split())
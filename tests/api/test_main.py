@@ -1,4 +1,5 @@
 import pytest
+from unittest.mock import AsyncMock, Mock
 from httpx import AsyncClient, ASGITransport
 from src.api.main import app
 
@@ -30,3 +31,391 @@ async def test_fuel_stations_endpoint_invalid_radius():
         )
 
     assert response.status_code == 422
+
+@pytest.mark.asyncio
+async def test_fuel_stations_endpoint_uses_snapshot(make_station):
+    """Test that results come from the snapshot store, not a fresh download"""
+    from unittest.mock import patch
+    from src.models import FuelType
+    from src.services.snapshot import StationSnapshot
+
+    snapshot = StationSnapshot.build([
+        make_station(precios={FuelType.GASOLINA_95_E5: 1.459})
+    ])
+    store = Mock()
+    store.get = AsyncMock(return_value=snapshot)
+
+    transport = ASGITransport(app=app)
+    with patch('src.api.main.get_snapshot_store', return_value=store):
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get(
+                "/api/fuel-stations?lat=40.4168&lon=-3.7038&radius=5&fuel_type=Gasolina+95+E5"
+            )
+
+    assert response.status_code == 200
+    assert response.json()[0]["id"] == "1"
+    assert response.json()[0]["precio"] == 1.459
+
+@pytest.mark.asyncio
+async def test_fuel_stations_endpoint_without_snapshot_returns_503():
+    from unittest.mock import patch
+    from src.services.snapshot import SnapshotUnavailableError
+
+    store = Mock()
+    store.get = AsyncMock(side_effect=SnapshotUnavailableError("No snapshot"))
+
+    transport = ASGITransport(app=app)
+    with patch('src.api.main.get_snapshot_store', return_value=store):
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get(
+                "/api/fuel-stations?lat=40.4168&lon=-3.7038&radius=5&fuel_type=Gasolina+95+E5"
+            )
+
+    assert response.status_code == 503
+
+@pytest.mark.asyncio
+async def test_slow_queries_endpoint_disabled_without_token(monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "")
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/admin/slow-queries")
+
+    assert response.status_code == 404
+
+@pytest.mark.asyncio
+async def test_slow_queries_endpoint_returns_profiled_request(monkeypatch):
+    """Test that an X-Profile request shows up in the admin ring buffer"""
+    from unittest.mock import patch
+    from src.request_profiling import SlowQueryRecorder
+    from src.services.snapshot import StationSnapshot
+
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    monkeypatch.setenv("PROFILE_ALLOW_HEADER", "1")
+    store = Mock()
+    store.get = AsyncMock(return_value=StationSnapshot.build([]))
+    recorder = SlowQueryRecorder()
+
+    transport = ASGITransport(app=app)
+    with patch('src.api.main.get_snapshot_store', return_value=store), \
+         patch('src.api.main.get_recorder', return_value=recorder):
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.get(
+                "/api/fuel-stations?lat=40.4168&lon=-3.7038&radius=5&fuel_type=Gasolina+95+E5",
+                headers={"X-Profile": "1"}
+            )
+            forbidden = await client.get("/admin/slow-queries", headers={"X-Admin-Token": "wrong"})
+            response = await client.get("/admin/slow-queries", headers={"X-Admin-Token": "secret"})
+
+    assert forbidden.status_code == 403
+    traces = response.json()
+    assert traces[0]["name"] == "find_fuel_stations"
+    assert [s["stage"] for s in traces[0]["stages"]] == ["snapshot", "scan", "materialize", "serialize"]
+
+@pytest.mark.asyncio
+async def test_refreshes_endpoint_counts_skipped_refreshes(monkeypatch, make_api_snapshot):
+    from unittest.mock import patch
+    from src.services.ministry_api import PayloadVersion
+    from src.services.snapshot import SnapshotStore
+
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    ministry = AsyncMock()
+    ministry.get_all_stations_if_changed.side_effect = [
+        ([], PayloadVersion(fecha="1")), (None, PayloadVersion(fecha="1"))
+    ]
+    store = SnapshotStore(client_factory=lambda: ministry)
+    await store.refresh()
+    await store.refresh()
+
+    transport = ASGITransport(app=app)
+    with patch('src.api.main.get_snapshot_store', return_value=store):
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get("/admin/refreshes", headers={"X-Admin-Token": "secret"})
+
+    assert response.json() == {"processed": 1, "skipped": 1, "generation": 1}
+
+@pytest.fixture
+def make_api_snapshot(make_station):
+    from src.models import FuelType
+    from src.services.snapshot import StationSnapshot
+
+    def make(count):
+        return StationSnapshot.build([
+            make_station(
+                str(i),
+                provincia="Madrid",
+                latitud=40.4168 + i * 0.001,
+                precios={FuelType.GASOLINA_95_E5: 1.4 + i * 0.01}
+            )
+            for i in range(count)
+        ], generation=7)
+    return make
+
+@pytest.mark.asyncio
+async def test_fuel_stations_page_follows_cursor(make_api_snapshot):
+    from unittest.mock import patch
+
+    store = Mock()
+    store.get = AsyncMock(return_value=make_api_snapshot(5))
+    url = "/api/fuel-stations/page?lat=40.4168&lon=-3.7038&radius=500&fuel_type=Gasolina+95+E5&limit=3"
+
+    transport = ASGITransport(app=app)
+    with patch('src.api.main.get_snapshot_store', return_value=store):
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            first = (await client.get(url)).json()
+            second = (await client.get(url + f"&cursor={first['next_cursor']}")).json()
+
+    assert [s["id"] for s in first["items"]] == ["0", "1", "2"]
+    assert first["items"][0]["mas_barata_que_pct_nacional"] == 80.0
+    assert second["items"][-1]["mas_barata_que_pct_provincia"] == 0.0
+    assert [s["id"] for s in second["items"]] == ["3", "4"]
+    assert second["next_cursor"] is None
+
+@pytest.mark.asyncio
+async def test_fuel_stations_ladder_returns_results_per_radius(make_api_snapshot):
+    from unittest.mock import patch
+
+    store = Mock()
+    store.get = AsyncMock(return_value=make_api_snapshot(5))
+    url = (
+        "/api/fuel-stations/ladder?lat=40.4168&lon=-3.7038&fuel_type=Gasolina+95+E5"
+        "&radius=1&radius=0.25&limit=2"
+    )
+
+    transport = ASGITransport(app=app)
+    with patch('src.api.main.get_snapshot_store', return_value=store):
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get(url)
+            too_wide = await client.get(url + "&radius=500")
+
+    assert response.status_code == 200
+    assert [(r["radius_km"], [s["id"] for s in r["items"]]) for r in response.json()] == [
+        (0.25, ["0", "1"]),
+        (1.0, ["0", "1"]),
+    ]
+    assert too_wide.status_code == 400
+
+@pytest.mark.asyncio
+async def test_fuel_stations_nearest_ignores_radius(make_api_snapshot):
+    from unittest.mock import patch
+
+    store = Mock()
+    store.get = AsyncMock(return_value=make_api_snapshot(5))
+    # About 330 km south of the stations
+    url = "/api/fuel-stations/nearest?lat=37.4&lon=-3.7038&fuel_type=Gasolina+95+E5&limit=2"
+
+    transport = ASGITransport(app=app)
+    with patch('src.api.main.get_snapshot_store', return_value=store):
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get(url)
+            capped = await client.get(url + "&max_distance=100")
+
+    assert response.status_code == 200
+    assert [s["id"] for s in response.json()] == ["0", "1"]
+    assert response.json()[0]["distancia_km"] > 300
+    assert capped.json() == []
+
+@pytest.mark.asyncio
+async def test_fuel_stations_open_at_filters_closed_stations(make_station):
+    from unittest.mock import patch
+    from src.models import FuelType
+    from src.services.snapshot import StationSnapshot
+
+    snapshot = StationSnapshot.build([
+        make_station(id, precios={FuelType.GASOLEO_A: price}, horario=horario)
+        for id, price, horario in [("day", 1.3, "L-D: 07:00-22:00"), ("night", 1.4, "L-D: 24H")]
+    ])
+    store = Mock()
+    store.get = AsyncMock(return_value=snapshot)
+    url = "/api/fuel-stations?lat=40.4168&lon=-3.7038&radius=5&fuel_type=Gasoleo+A"
+
+    transport = ASGITransport(app=app)
+    with patch('src.api.main.get_snapshot_store', return_value=store):
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            night = (await client.get(url + "&open_at=2026-10-19T02:00:00")).json()
+            anytime = (await client.get(url)).json()
+
+    assert [s["id"] for s in night] == ["night"]
+    assert night[0]["horario"] == "L-D: 24H"
+    assert [s["id"] for s in anytime] == ["day", "night"]
+
+@pytest.mark.asyncio
+async def test_fuel_stations_page_open_now_filters_closed_stations(make_station):
+    from datetime import datetime, timezone
+    from unittest.mock import patch
+    from src.models import FuelType
+    from src.services.snapshot import StationSnapshot
+
+    class Night(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime(2026, 10, 19, 1, 0, tzinfo=timezone.utc)
+
+    snapshot = StationSnapshot.build([
+        make_station(id, precios={FuelType.GASOLEO_A: price}, horario=horario)
+        for id, price, horario in [("day", 1.3, "L-D: 07:00-22:00"), ("night", 1.4, "L-D: 24H")]
+    ])
+    store = Mock()
+    store.get = AsyncMock(return_value=snapshot)
+    url = "/api/fuel-stations/page?lat=40.4168&lon=-3.7038&radius=5&fuel_type=Gasoleo+A&open_now=true"
+
+    transport = ASGITransport(app=app)
+    with patch('src.api.main.get_snapshot_store', return_value=store), \
+         patch('src.api.main.datetime', Night):
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            page = (await client.get(url)).json()
+
+    assert [s["id"] for s in page["items"]] == ["night"]
+
+@pytest.mark.asyncio
+async def test_fuel_stations_brand_filters(make_station):
+    from unittest.mock import patch
+    from src.models import FuelType
+    from src.services.snapshot import StationSnapshot
+
+    snapshot = StationSnapshot.build([
+        make_station(str(i), rotulo=rotulo, precios={FuelType.GASOLEO_A: 1.3 + i * 0.01})
+        for i, rotulo in enumerate(["Cepsa", "Ballenoil", "Shell", "E.S. Repsol"])
+    ])
+    store = Mock()
+    store.get = AsyncMock(return_value=snapshot)
+    url = "/api/fuel-stations?lat=40.4168&lon=-3.7038&radius=5&fuel_type=Gasoleo+A"
+
+    transport = ASGITransport(app=app)
+    with patch('src.api.main.get_snapshot_store', return_value=store):
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            only = (await client.get(url + "&brand=repsol&brand=shell")).json()
+            without = (await client.get(url + "&exclude_brand=cepsa")).json()
+
+    assert [s["id"] for s in only] == ["2", "3"]
+    assert [s["id"] for s in without] == ["1", "2", "3"]
+
+@pytest.mark.asyncio
+async def test_fuel_stations_page_rejects_cursor_from_old_generation(make_api_snapshot):
+    from unittest.mock import patch
+
+    store = Mock()
+    store.get = AsyncMock(return_value=make_api_snapshot(5))
+    url = "/api/fuel-stations/page?lat=40.4168&lon=-3.7038&radius=500&fuel_type=Gasolina+95+E5&limit=3"
+
+    transport = ASGITransport(app=app)
+    with patch('src.api.main.get_snapshot_store', return_value=store):
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            cursor = (await client.get(url)).json()["next_cursor"]
+            store.get.return_value = make_api_snapshot(5)
+            store.get.return_value.generation = 8
+            expired = await client.get(url + f"&cursor={cursor}")
+            invalid = await client.get(url + "&cursor=not-a-cursor")
+
+    assert expired.status_code == 410
+    assert invalid.status_code == 400
+
+@pytest.mark.asyncio
+async def test_export_streams_ndjson(make_api_snapshot):
+    from unittest.mock import patch
+
+    store = Mock()
+    store.get = AsyncMock(return_value=make_api_snapshot(3))
+
+    transport = ASGITransport(app=app)
+    with patch('src.api.main.get_snapshot_store', return_value=store):
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get("/api/export?provincia=madrid&bbox=-4,40,-3,40.4180")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.headers["x-snapshot-generation"] == "7"
+    assert len(response.text.splitlines()) == 2
+
+@pytest.mark.asyncio
+async def test_provincia_extract_supports_conditional_requests(make_api_snapshot):
+    from unittest.mock import patch
+    from src.services.extracts import Extract
+
+    store = Mock()
+    store.get = AsyncMock(return_value=make_api_snapshot(3))
+
+    transport = ASGITransport(app=app)
+    with patch('src.api.main.get_snapshot_store', return_value=store):
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            listing = (await client.get("/api/extracts")).json()
+            response = await client.get(listing["extracts"][0]["url"])
+            cached = await client.get(
+                listing["extracts"][0]["url"],
+                headers={"If-None-Match": response.headers["etag"]}
+            )
+            missing = await client.get("/api/extracts/provincia/sevilla")
+
+    assert listing["extracts"][0]["stations"] == 3
+    assert response.headers["etag"] == listing["extracts"][0]["etag"]
+    assert len(Extract(response.content)) == 3
+    assert cached.status_code == 304
+    assert missing.status_code == 404
+
+@pytest.mark.asyncio
+async def test_every_listed_extract_url_resolves(make_station):
+    from unittest.mock import patch
+    from src.services.extracts import Extract
+    from src.services.snapshot import StationSnapshot
+
+    provincias = ["VALENCIA / VALÈNCIA", "Araba/Álava", "A CORUÑA", "Madrid"]
+    store = Mock()
+    store.get = AsyncMock(return_value=StationSnapshot.build([
+        make_station(str(i), provincia=provincia)
+        for i, provincia in enumerate(provincias)
+    ]))
+
+    transport = ASGITransport(app=app)
+    with patch('src.api.main.get_snapshot_store', return_value=store):
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            listing = (await client.get("/api/extracts")).json()["extracts"]
+            responses = [await client.get(extract["url"]) for extract in listing]
+
+    assert sorted(extract["provincia"] for extract in listing) == sorted(provincias)
+    assert all(" " not in extract["url"] for extract in listing)
+    assert [response.status_code for response in responses] == [200] * len(provincias)
+    assert [Extract(response.content).station(0).provincia for response in responses] == \
+        [extract["provincia"] for extract in listing]
+
+@pytest.mark.asyncio
+async def test_places_autocomplete(make_api_snapshot):
+    from unittest.mock import patch
+
+    store = Mock()
+    store.get = AsyncMock(return_value=make_api_snapshot(2))
+
+    transport = ASGITransport(app=app)
+    with patch('src.api.main.get_snapshot_store', return_value=store):
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get("/api/places?q=mad")
+
+    places = response.json()
+    assert [(p["name"], p["kind"]) for p in places] == [("Madrid", "municipio"), ("Madrid", "provincia")]
+    assert places[0]["stations"] == 2
+    assert places[0]["label"] == "Madrid (Madrid)"
+
+@pytest.mark.asyncio
+async def test_price_grid_tiles_support_conditional_requests(make_api_snapshot):
+    from unittest.mock import patch
+    from src.services.extracts import tile_for
+
+    store = Mock()
+    store.get = AsyncMock(return_value=make_api_snapshot(5))
+    x, y = tile_for(40.4168, -3.7038, 10)
+    url = f"/api/price-grid/10/{x}/{y}"
+
+    transport = ASGITransport(app=app)
+    with patch('src.api.main.get_snapshot_store', return_value=store):
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            cells = await client.get(url + ".json?fuel_type=Gasolina+95+E5")
+            png = await client.get(url + ".png?fuel_type=Gasolina+95+E5")
+            unchanged = await client.get(
+                url + ".png?fuel_type=Gasolina+95+E5", headers={"If-None-Match": png.headers["etag"]}
+            )
+            bad_zoom = await client.get("/api/price-grid/20/0/0.png?fuel_type=Gasolina+95+E5")
+
+    assert cells.status_code == 200
+    assert "0" in [cell["id"] for cell in cells.json()["cells"]]
+    assert png.headers["content-type"] == "image/png"
+    assert png.content.startswith(b"\x89PNG")
+    assert unchanged.status_code == 304
+    assert bad_zoom.status_code == 422
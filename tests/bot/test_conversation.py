@@ -2,10 +2,12 @@ import pytest
 from unittest.mock import Mock, AsyncMock, patch
 from telegram import Update, User, Chat, Location
 from telegram.ext import ContextTypes
+from src.services.snapshot import SnapshotUnavailableError
 from src.bot.conversation import (
     location_handler,
     fuel_type_callback,
     radius_handler,
+    place_handler,
     LOCATION,
     FUEL_TYPE,
     RADIUS
@@ -61,25 +63,121 @@ async def test_radius_handler_valid_radius():
         'fuel_type': 'Gasolina 95 E5'
     }
 
-    with patch('src.bot.conversation.MinistryAPIClient') as mock_api_client, \
+    with patch('src.bot.conversation.get_snapshot_store') as mock_get_store, \
          patch('src.bot.conversation.FuelStationFinder') as mock_finder_class:
 
-        # Mock the API client
-        mock_api_instance = AsyncMock()
-        mock_api_instance.get_all_stations.return_value = []
-        mock_api_client.return_value = mock_api_instance
+        # Mock the snapshot store
+        mock_store = AsyncMock()
+        mock_get_store.return_value = mock_store
 
         # Mock the finder
         mock_finder_instance = AsyncMock()
-        mock_finder_instance.find_cheapest.return_value = []
+        mock_finder_instance.find_cheapest_by_radius.return_value = {}
+        mock_finder_instance.find_nearest_in_snapshot.return_value = []
         mock_finder_class.return_value = mock_finder_instance
 
         result = await radius_handler(update, context)
 
-        mock_api_instance.get_all_stations.assert_called_once()
-        mock_finder_instance.find_cheapest.assert_called_once()
+        mock_store.get.assert_called_once()
+        mock_finder_instance.find_cheapest_by_radius.assert_called_once()
         assert result == -1  # ConversationHandler.END
 
+@pytest.mark.asyncio
+async def test_radius_handler_widens_radius_when_empty(make_station):
+    """Test radius handler falls back to a wider radius from the same search"""
+    from src.models import FuelType
+    from src.services.snapshot import StationSnapshot
+
+    update = Mock(spec=Update)
+    update.message = AsyncMock()
+    update.message.text = "5"
+
+    context = Mock(spec=ContextTypes.DEFAULT_TYPE)
+    context.user_data = {
+        'latitude': 40.4168,
+        'longitude': -3.7038,
+        'fuel_type': 'Gasoleo A'
+    }
+
+    # About 20 km north of the user
+    snapshot = StationSnapshot.build([make_station(
+        rotulo="REPSOL", municipio="Alcobendas", provincia="Madrid", latitud=40.5968,
+        precios={FuelType.GASOLEO_A: 1.4}
+    )])
+
+    with patch('src.bot.conversation.get_snapshot_store') as mock_get_store:
+        mock_get_store.return_value.get = AsyncMock(return_value=snapshot)
+
+        await radius_handler(update, context)
+
+    replies = [call[0][0] for call in update.message.reply_text.call_args_list]
+    assert "ampliado la búsqueda a 25 km" in replies[-2]
+    assert "REPSOL" in replies[-1]
+    assert "Más barata que el 0% de las de Madrid" in replies[-1]
+
+@pytest.mark.asyncio
+async def test_radius_handler_falls_back_to_nearest_stations(make_station):
+    """Test radius handler lists the nearest stations when none is within the widest radius"""
+    from src.models import FuelType
+    from src.services.snapshot import StationSnapshot
+
+    update = Mock(spec=Update)
+    update.message = AsyncMock()
+    update.message.text = "5"
+
+    context = Mock(spec=ContextTypes.DEFAULT_TYPE)
+    context.user_data = {
+        'latitude': 40.4168,
+        'longitude': -3.7038,
+        'fuel_type': 'Hidrógeno'
+    }
+
+    # Zaragoza and Barcelona, both much further than 100 km from Madrid
+    snapshot = StationSnapshot.build([
+        make_station(
+            id, rotulo=rotulo, municipio=municipio, provincia=municipio,
+            latitud=lat, longitud=lon, precios={FuelType.HIDROGENO: 9.0}
+        )
+        for id, rotulo, municipio, lat, lon in [
+            ("1", "H2 BCN", "Barcelona", 41.3874, 2.1686),
+            ("2", "H2 ZGZ", "Zaragoza", 41.6488, -0.8891),
+        ]
+    ])
+
+    with patch('src.bot.conversation.get_snapshot_store') as mock_get_store:
+        mock_get_store.return_value.get = AsyncMock(return_value=snapshot)
+
+        await radius_handler(update, context)
+
+    replies = [call[0][0] for call in update.message.reply_text.call_args_list]
+    assert "las más cercanas" in replies[-2]
+    assert "más cercanas*" in replies[-1]
+    assert replies[-1].index("H2 ZGZ") < replies[-1].index("H2 BCN")
+
+@pytest.mark.asyncio
+async def test_radius_handler_without_station_data():
+    """Test radius handler when the Ministry data cannot be downloaded"""
+    update = Mock(spec=Update)
+    update.message = AsyncMock()
+    update.message.text = "10"
+
+    context = Mock(spec=ContextTypes.DEFAULT_TYPE)
+    context.user_data = {
+        'latitude': 40.4168,
+        'longitude': -3.7038,
+        'fuel_type': 'Gasolina 95 E5'
+    }
+
+    with patch('src.bot.conversation.get_snapshot_store') as mock_get_store:
+        mock_get_store.return_value.get = AsyncMock(side_effect=SnapshotUnavailableError("down"))
+
+        result = await radius_handler(update, context)
+
+    reply = update.message.reply_text.call_args[0][0]
+    assert "no están disponibles" in reply
+    assert "down" not in reply
+    assert result == -1
+
 @pytest.mark.asyncio
 async def test_radius_handler_invalid_radius_negative():
     """Test radius handler with negative radius"""
@@ -153,3 +251,68 @@ async def test_radius_handler_missing_user_data():
 
     assert result == -1  # ConversationHandler.END
     update.message.reply_text.assert_called_once()
+
+@pytest.fixture
+def places_snapshot(make_station):
+    from src.services.snapshot import StationSnapshot
+
+    return StationSnapshot.build([
+        make_station(str(i), municipio=municipio, provincia=provincia, latitud=latitud, longitud=-3.6)
+        for i, (municipio, provincia, latitud) in enumerate([
+            ("Alcobendas", "MADRID", 40.54),
+            ("Villanueva", "TOLEDO", 39.9),
+            ("Villanueva", "CÓRDOBA", 38.3),
+        ])
+    ])
+
+@pytest.mark.asyncio
+async def test_place_handler_accepts_typed_municipio(places_snapshot):
+    """Test that a typed place name is resolved to its stations' centroid"""
+    update = Mock(spec=Update)
+    update.message = AsyncMock()
+    update.message.text = "alcobendas"
+
+    context = Mock(spec=ContextTypes.DEFAULT_TYPE)
+    context.user_data = {}
+
+    store = Mock()
+    store.get = AsyncMock(return_value=places_snapshot)
+    with patch('src.bot.conversation.get_snapshot_store', return_value=store):
+        result = await place_handler(update, context)
+
+    assert result == FUEL_TYPE
+    assert context.user_data['latitude'] == 40.54
+    assert context.user_data['longitude'] == -3.6
+
+@pytest.mark.asyncio
+async def test_place_handler_suggests_on_ambiguous_name(places_snapshot):
+    update = Mock(spec=Update)
+    update.message = AsyncMock()
+    update.message.text = "Villanueva"
+
+    context = Mock(spec=ContextTypes.DEFAULT_TYPE)
+    context.user_data = {}
+
+    store = Mock()
+    store.get = AsyncMock(return_value=places_snapshot)
+    with patch('src.bot.conversation.get_snapshot_store', return_value=store):
+        result = await place_handler(update, context)
+
+    assert result == LOCATION
+    assert context.user_data == {}
+    keyboard = update.message.reply_text.call_args.kwargs['reply_markup'].keyboard
+    assert [row[0].text for row in keyboard] == ["Villanueva (CÓRDOBA)", "Villanueva (TOLEDO)"]
+
+@pytest.mark.asyncio
+async def test_send_results_notes_stale_data(make_station):
+    """Results from an old snapshot say how old the prices are"""
+    from src.bot.conversation import send_results
+    from src.models import FuelType
+
+    update = Mock(spec=Update)
+    update.message = AsyncMock()
+    station = make_station(rotulo="REPSOL", precios={FuelType.GASOLEO_A: 1.4})
+
+    await send_results(update, [station], FuelType.GASOLEO_A, data_age=3 * 3600)
+
+    assert "hace 3 h" in update.message.reply_text.call_args[0][0]
@@ -2,7 +2,7 @@ import pytest
 from unittest.mock import Mock, AsyncMock, patch
 from telegram import Update, User, Chat, Location
 from telegram.ext import ContextTypes
-from src.bot.handlers import start_command, help_command, cancel_command
+from src.bot.handlers import start_command, help_command, cancel_command, brands_command, exclude_brands_command
 
 @pytest.mark.asyncio
 async def test_start_command():
@@ -33,3 +33,36 @@ async def test_cancel_command():
 
     update.message.reply_text.assert_called_once()
     assert context.user_data == {}
+
+@pytest.mark.asyncio
+async def test_cancel_command_keeps_brand_preferences():
+    """Test /cancel forgets the search but not the brand preferences"""
+    update = Mock(spec=Update)
+    update.message = AsyncMock()
+
+    context = Mock(spec=ContextTypes.DEFAULT_TYPE)
+    context.user_data = {'latitude': 40.4, 'fuel_type': 'Gasoleo A', 'brands': ['Repsol']}
+
+    await cancel_command(update, context)
+
+    assert context.user_data == {'brands': ['Repsol']}
+
+@pytest.mark.asyncio
+async def test_brand_commands_set_and_clear_preferences():
+    """Test /marcas and /evitar store comma-separated brands, and clear them without arguments"""
+    update = Mock(spec=Update)
+    update.message = AsyncMock()
+
+    context = Mock(spec=ContextTypes.DEFAULT_TYPE)
+    context.user_data = {}
+
+    context.args = ["Repsol,", "Petro", "Prix"]
+    await brands_command(update, context)
+    context.args = ["shell"]
+    await exclude_brands_command(update, context)
+    assert context.user_data == {'brands': ['Repsol', 'Petro Prix'], 'exclude_brands': ['shell']}
+
+    context.args = []
+    await brands_command(update, context)
+    assert context.user_data == {'exclude_brands': ['shell']}
+    assert "todas" in update.message.reply_text.call_args[0][0]
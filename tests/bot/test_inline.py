@@ -0,0 +1,87 @@
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+from src.bot.inline import InlineResultCache, inline_query_handler, parse_inline_query
+from src.models import FuelType
+from src.services.snapshot import StationSnapshot
+
+def test_parse_inline_query():
+    assert parse_inline_query("gasoleo 10") == (FuelType.GASOLEO_A, 10.0)
+    assert parse_inline_query("Gasóleo premium") == (FuelType.GASOLEO_PREMIUM, 10.0)
+    assert parse_inline_query("gasolina 95") == (FuelType.GASOLINA_95_E5, 10.0)
+    assert parse_inline_query("gasolina 98 2,5") == (FuelType.GASOLINA_98_E5, 2.5)
+    assert parse_inline_query("95 5km") == (FuelType.GASOLINA_95_E5, 5.0)
+    assert parse_inline_query("diesel") == (FuelType.GASOLEO_A, 10.0)
+
+def test_parse_inline_query_rejects_unknown_fuel_and_bad_radius():
+    assert parse_inline_query("") is None
+    assert parse_inline_query("queroseno 10") is None
+    assert parse_inline_query("gasoleo 500") is None
+    assert parse_inline_query("gasoleo cerca") is None
+
+def test_result_cache_evicts_least_recently_used():
+    cache = InlineResultCache(max_entries=2)
+    cache.put("a", [1])
+    cache.put("b", [2])
+    cache.get("a")
+    cache.put("c", [3])
+
+    assert cache.get("b") is None
+    assert cache.get("a") == [1]
+    assert cache.hits == 2
+
+def make_inline_update(query, location=(40.4168, -3.7038)):
+    update = Mock()
+    update.inline_query = AsyncMock()
+    update.inline_query.query = query
+    if location is None:
+        update.inline_query.location = None
+    else:
+        update.inline_query.location = Mock(latitude=location[0], longitude=location[1])
+    return update
+
+@pytest.fixture
+def inline_snapshot(make_station):
+    return StationSnapshot.build([
+        make_station(
+            str(i), rotulo=f"Station {i}", latitud=40.4168 + i * 0.001,
+            precios={FuelType.GASOLEO_A: 1.5 - i * 0.01}
+        )
+        for i in range(5)
+    ], generation=3)
+
+async def test_inline_query_answers_from_snapshot_and_caches(inline_snapshot):
+    store = AsyncMock()
+    store.get.return_value = inline_snapshot
+
+    with patch('src.bot.inline.get_snapshot_store', return_value=store), \
+         patch('src.bot.inline._result_cache', InlineResultCache()) as cache:
+        update = make_inline_update("gasoleo 5")
+        await inline_query_handler(update, Mock(user_data={}))
+        await inline_query_handler(update, Mock(user_data={}))
+
+    results = update.inline_query.answer.call_args[0][0]
+    assert [result.id for result in results] == ["4", "3", "2", "1", "0"]
+    assert update.inline_query.answer.call_args.kwargs["is_personal"] is True
+    assert (cache.hits, cache.misses) == (1, 1)
+
+async def test_inline_query_applies_brand_preferences(inline_snapshot):
+    store = AsyncMock()
+    store.get.return_value = inline_snapshot
+
+    with patch('src.bot.inline.get_snapshot_store', return_value=store), \
+         patch('src.bot.inline._result_cache', InlineResultCache()) as cache:
+        update = make_inline_update("gasoleo 5")
+        await inline_query_handler(update, Mock(user_data={}))
+        await inline_query_handler(update, Mock(user_data={'exclude_brands': ['4', '3']}))
+
+    results = update.inline_query.answer.call_args[0][0]
+    assert [result.id for result in results] == ["2", "1", "0"]
+    assert cache.misses == 2
+
+async def test_inline_query_without_location_asks_for_it():
+    update = make_inline_update("gasoleo 5", location=None)
+
+    await inline_query_handler(update, Mock())
+
+    assert update.inline_query.answer.call_args[0][0] == []
+    assert "ubicación" in update.inline_query.answer.call_args.kwargs["button"].text
@@ -39,3 +39,19 @@ def test_main_creates_application():
         mock_logger.info.assert_called_with("Starting bot...")
         mock_application.run_polling.assert_called_once()
 
+
+def test_build_application_with_concurrency_and_persistence(tmp_path):
+    """Test that updates are processed concurrently and the conversation is persisted"""
+    from telegram.ext import ConversationHandler
+    from src.bot.main import build_application
+    from src.bot.persistence import SQLitePersistence
+    from src.bot.processing import PerUserUpdateProcessor
+
+    persistence = SQLitePersistence(str(tmp_path / "state.db"))
+    application = build_application("123456:TEST", concurrent_updates=8, persistence=persistence)
+
+    assert isinstance(application.update_processor, PerUserUpdateProcessor)
+    assert application.concurrent_updates == 8
+    assert application.persistence is persistence
+    conv_handler = next(h for h in application.handlers[0] if isinstance(h, ConversationHandler))
+    assert conv_handler.persistent and conv_handler.name == "search"
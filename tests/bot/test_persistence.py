@@ -0,0 +1,28 @@
+import pytest
+from telegram.ext import PicklePersistence
+from src.bot.persistence import SQLitePersistence, build_persistence
+
+async def test_sqlite_persistence_survives_reopening(tmp_path):
+    path = str(tmp_path / "state.db")
+    persistence = SQLitePersistence(path)
+    await persistence.update_user_data(7, {"latitude": 40.4, "brands": ["Repsol"]})
+    await persistence.update_user_data(8, {"fuel_type": "Gasoleo A"})
+    await persistence.drop_user_data(8)
+    await persistence.update_conversation("search", (7, 7), 2)
+    await persistence.update_conversation("search", (9, 9), 1)
+    await persistence.update_conversation("search", (9, 9), None)
+    await persistence.flush()
+
+    reopened = SQLitePersistence(path)
+
+    assert await reopened.get_user_data() == {7: {"latitude": 40.4, "brands": ["Repsol"]}}
+    assert await reopened.get_conversations("search") == {(7, 7): 2}
+    assert await reopened.get_conversations("other") == {}
+    assert await reopened.get_bot_data() == {}
+
+def test_build_persistence_selects_backend(tmp_path):
+    assert build_persistence("", str(tmp_path / "state.db")) is None
+    assert isinstance(build_persistence("sqlite", str(tmp_path / "state.db")), SQLitePersistence)
+    assert isinstance(build_persistence("pickle", str(tmp_path / "state.pickle")), PicklePersistence)
+    with pytest.raises(ValueError):
+        build_persistence("redis", "")
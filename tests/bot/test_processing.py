@@ -0,0 +1,54 @@
+import asyncio
+from telegram import Update
+from src.bot.processing import PerUserUpdateProcessor
+
+def make_update(update_id, user_id):
+    return Update.de_json({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "Test"},
+            "text": "10",
+        },
+    }, None)
+
+async def test_updates_of_one_user_run_in_order_and_users_run_concurrently():
+    processor = PerUserUpdateProcessor(8)
+    running = set()
+    overlaps = []
+    order = []
+
+    async def handle(update):
+        user_id = update.effective_user.id
+        assert user_id not in running
+        running.add(user_id)
+        overlaps.append(len(running))
+        await asyncio.sleep(0.01)
+        order.append((user_id, update.update_id))
+        running.discard(user_id)
+
+    updates = [make_update(i, user_id) for i, user_id in enumerate([1, 2, 1, 2, 1])]
+    await asyncio.gather(*(processor.process_update(u, handle(u)) for u in updates))
+
+    assert [update_id for user_id, update_id in order if user_id == 1] == [0, 2, 4]
+    assert max(overlaps) == 2
+    assert processor._locks == {}
+
+async def test_user_flooding_the_queue_does_not_take_every_slot():
+    processor = PerUserUpdateProcessor(4)
+    finished = {}
+
+    async def handle(update):
+        await asyncio.sleep(0.05)
+        finished[update.update_id] = asyncio.get_running_loop().time()
+
+    flood = [make_update(i, 1) for i in range(4)]
+    other = make_update(99, 2)
+    start = asyncio.get_running_loop().time()
+    await asyncio.gather(*(processor.process_update(u, handle(u)) for u in flood + [other]))
+
+    assert processor.max_concurrent_updates == 4
+    assert finished[99] - start < 0.09
+    assert finished[3] - start >= 0.2
@@ -0,0 +1,22 @@
+import pytest
+from src.models import FuelStation, FuelType
+
+@pytest.fixture
+def make_station():
+    """
+    Factory for test stations: a Repsol in central Madrid selling Gasoleo A,
+    with any field overridden by keyword.
+    """
+    def make(id: str = "1", **fields) -> FuelStation:
+        return FuelStation(**{
+            "id": id,
+            "rotulo": "Repsol",
+            "direccion": "Calle Falsa 123",
+            "municipio": "Madrid",
+            "provincia": "MADRID",
+            "latitud": 40.4168,
+            "longitud": -3.7038,
+            "precios": {FuelType.GASOLEO_A: 1.4},
+            **fields,
+        })
+    return make
@@ -49,6 +49,23 @@ def test_fuel_station_validation_invalid_longitude():
             precios={}
         )
 
+def test_fuel_station_interns_repeated_text(make_station):
+    # Build each value at runtime so the two stations start with distinct objects
+    first, second = (
+        make_station(
+            id,
+            rotulo="".join(["REP", "SOL"]),
+            municipio="".join(["Mad", "rid"]),
+            provincia="".join(["Mad", "rid"]),
+            precios={}
+        )
+        for id in ["1", "2"]
+    )
+
+    assert first.rotulo is second.rotulo
+    assert first.municipio is second.municipio
+    assert first.provincia is second.municipio
+
 def test_fuel_type_enum():
     assert FuelType.GASOLINA_95_E5.value == "Gasolina 95 E5"
     assert FuelType.GASOLEO_A.value == "Gasóleo A"
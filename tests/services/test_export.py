@@ -0,0 +1,72 @@
+import csv
+import io
+import json
+import pytest
+from src.models import FuelType
+from src.services.export import csv_chunks, filter_stations, ndjson_chunks, parse_bbox
+from src.services.snapshot import StationSnapshot
+
+@pytest.fixture
+def snapshot(make_station):
+    return StationSnapshot.build([
+        make_station("1", precios={FuelType.GASOLINA_95_E5: 1.459, FuelType.GASOLEO_A: 1.349}),
+        make_station(
+            "2",
+            rotulo="Cepsa",
+            direccion="Avenida 1",
+            municipio="Barcelona",
+            provincia="BARCELONA",
+            latitud=41.3851,
+            longitud=2.1734,
+            precios={FuelType.GASOLEO_A: 1.299}
+        ),
+        make_station(
+            "3",
+            rotulo="Galp",
+            direccion="Plaza 2",
+            municipio="Getafe",
+            latitud=40.3057,
+            longitud=-3.7329,
+            precios={FuelType.GASOLINA_95_E5: 1.399}
+        ),
+    ])
+
+def test_parse_bbox_rejects_inverted_box():
+    assert parse_bbox("-4,40,-3,41") == (-4.0, 40.0, -3.0, 41.0)
+    with pytest.raises(ValueError):
+        parse_bbox("-3,40,-4,41")
+    with pytest.raises(ValueError):
+        parse_bbox("1,2,3")
+
+def test_filter_stations_combines_filters(snapshot):
+    assert list(filter_stations(snapshot)) == [0, 1, 2]
+    assert list(filter_stations(snapshot, provincia="madrid")) == [0, 2]
+    assert list(filter_stations(snapshot, fuel_types=[FuelType.GASOLEO_A])) == [0, 1]
+    assert list(filter_stations(snapshot, bbox=(-4.0, 40.35, -3.0, 41.0))) == [0]
+    assert list(filter_stations(
+        snapshot, provincia="MADRID", fuel_types=[FuelType.GASOLINA_95_E5], bbox=(-4.0, 40.0, -3.0, 40.35)
+    )) == [2]
+
+def test_ndjson_chunks_are_batched(snapshot):
+    chunks = list(ndjson_chunks(snapshot, filter_stations(snapshot), batch_size=2))
+    lines = b"".join(chunks).decode().splitlines()
+
+    assert len(chunks) == 2
+    assert json.loads(lines[1]) == {
+        "id": "2",
+        "rotulo": "Cepsa",
+        "direccion": "Avenida 1",
+        "municipio": "Barcelona",
+        "provincia": "BARCELONA",
+        "latitud": 41.3851,
+        "longitud": 2.1734,
+        "precios": {"Gasoleo A": 1.299},
+    }
+
+def test_csv_chunks_have_header_and_price_columns(snapshot):
+    data = b"".join(csv_chunks(snapshot, filter_stations(snapshot), batch_size=2)).decode()
+    rows = list(csv.DictReader(io.StringIO(data)))
+
+    assert len(rows) == 3
+    assert rows[0]["Gasolina 95 E5"] == "1.459"
+    assert rows[1]["Gasolina 95 E5"] == ""
@@ -0,0 +1,111 @@
+import pytest
+from src.models import FuelType
+from src.services.extracts import Extract, ExtractCache, encode_extract, tile_for
+from src.services.finder import FuelStationFinder
+from src.services.snapshot import StationSnapshot
+
+@pytest.fixture
+def make_snapshot(make_station):
+    def make(generation=1):
+        stations = [
+            make_station(
+                str(i),
+                rotulo="REPSOL" if i % 2 else "CEPSA",
+                direccion=f"Calle {i}",
+                municipio="Madrid" if i < 10 else "Getafe",
+                latitud=40.30 + i * 0.01,
+                longitud=-3.80 + i * 0.005,
+                precios={FuelType.GASOLEO_A: 1.300 + (i % 7) * 0.011}
+                if i % 3 else {FuelType.GASOLINA_95_E5: 1.5}
+            )
+            for i in range(20)
+        ]
+        stations.append(make_station(
+            "bcn",
+            rotulo="GALP",
+            direccion="Avenida 1",
+            municipio="Barcelona",
+            provincia="BARCELONA",
+            latitud=41.3851,
+            longitud=2.1734,
+            precios={FuelType.GASOLEO_A: 1.2}
+        ))
+        return StationSnapshot.build(stations, generation=generation)
+    return make
+
+def test_extract_round_trips_stations_with_quantized_coordinates(make_snapshot):
+    snapshot = make_snapshot()
+
+    extract = Extract(encode_extract(snapshot, range(20)))
+
+    assert len(extract) == 20
+    station = extract.station(4)
+    assert station.id == "4"
+    assert station.municipio == "Madrid"
+    assert station.precios == {FuelType.GASOLEO_A: 1.344}
+    assert station.latitud == pytest.approx(40.34, abs=1e-4)
+    assert station.longitud == pytest.approx(-3.78, abs=1e-4)
+
+def test_extract_is_smaller_than_json(make_snapshot):
+    snapshot = make_snapshot()
+
+    data = encode_extract(snapshot, range(len(snapshot)))
+    as_json = "".join(s.model_dump_json() for s in snapshot.stations)
+
+    assert len(data) < len(as_json) / 3
+
+@pytest.mark.asyncio
+async def test_extract_find_cheapest_matches_finder(make_snapshot):
+    snapshot = make_snapshot()
+    extract = Extract(encode_extract(snapshot, range(len(snapshot))))
+
+    expected = await FuelStationFinder().find_cheapest_in_snapshot(
+        snapshot, 40.4, -3.75, 15, FuelType.GASOLEO_A
+    )
+    results = extract.find_cheapest(40.4, -3.75, 15, FuelType.GASOLEO_A)
+
+    assert [s.id for s in results] == [s.id for s in expected]
+    assert extract.find_cheapest(40.4, -3.75, 15, FuelType.HIDROGENO) == []
+
+def test_cache_etag_is_stable_across_generations(make_snapshot):
+    cache = ExtractCache()
+
+    data, etag = cache.provincia(make_snapshot(generation=1), "Madrid")
+    _, same_etag = cache.provincia(make_snapshot(generation=2), "madrid")
+
+    assert etag == same_etag
+    assert len(Extract(data)) == 20
+    assert cache.provincia(make_snapshot(), "Sevilla") is None
+
+def test_cache_tile_contains_only_its_stations(make_snapshot):
+    snapshot = make_snapshot()
+    x, y = tile_for(41.3851, 2.1734, 10)
+
+    data, _ = ExtractCache().tile(snapshot, 10, x, y)
+
+    assert [Extract(data).station(0).id] == ["bcn"]
+
+def test_cache_does_not_mix_generations(make_snapshot):
+    cache = ExtractCache()
+    old, new = make_snapshot(generation=1), make_snapshot(generation=2)
+    x, y = tile_for(41.3851, 2.1734, 10)
+
+    cache.provincia(new, "Madrid")
+    # A request still holding the previous snapshot neither caches nor resets anything
+    old_extract = cache.provincia(old, "Barcelona")
+    cache.tile(old, 10, x, y)
+
+    assert cache._generation == 2
+    assert list(cache._extracts) == ["provincia/madrid"]
+    assert cache._tiles_by_zoom == {}
+    assert cache.provincia(new, "Barcelona") is not old_extract
+
+def test_cache_buckets_tiles_once_per_zoom(make_snapshot):
+    cache = ExtractCache()
+    snapshot = make_snapshot()
+
+    assert cache.tile(snapshot, 10, 0, 0) is None
+    buckets = cache._tiles_by_zoom[10]
+    assert cache.tile(snapshot, 10, 1, 1) is None
+    assert cache._tiles_by_zoom[10] is buckets
+    assert sum(len(indices) for indices in buckets.values()) == len(snapshot)
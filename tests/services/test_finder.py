@@ -1,6 +1,7 @@
 import pytest
 from src.services.finder import FuelStationFinder
 from src.models import FuelStation, FuelType
+from src.services.snapshot import StationSnapshot
 
 @pytest.mark.asyncio
 async def test_find_cheapest_stations_filters_by_distance():
@@ -154,3 +155,194 @@ async def test_find_cheapest_stations_filters_by_fuel_type():
 
     assert len(results) == 1
     assert results[0].id == "1"
+
+@pytest.mark.asyncio
+async def test_find_cheapest_in_snapshot_matches_list_search(make_station):
+    """Test that the columnar snapshot search returns the same stations"""
+    stations = [
+        make_station(
+            str(i),
+            latitud=40.4168 + (i * 0.01),
+            precios={FuelType.GASOLINA_95_E5: 1.500 - (i * 0.01)} if i % 2 else {}
+        )
+        for i in range(10)
+    ]
+
+    finder = FuelStationFinder()
+    expected = await finder.find_cheapest(
+        stations=stations,
+        user_lat=40.4168,
+        user_lon=-3.7038,
+        radius_km=5,
+        fuel_type=FuelType.GASOLINA_95_E5
+    )
+    results = await finder.find_cheapest_in_snapshot(
+        snapshot=StationSnapshot.build(stations),
+        user_lat=40.4168,
+        user_lon=-3.7038,
+        radius_km=5,
+        fuel_type=FuelType.GASOLINA_95_E5
+    )
+
+    assert [s.id for s in results] == [s.id for s in expected]
+    assert [s._distance for s in results] == [s._distance for s in expected]
+
+@pytest.mark.asyncio
+async def test_find_cheapest_in_snapshot_requires_all_fuels(make_station):
+    """Test that also_selling excludes stations missing any extra fuel"""
+    stations = [
+        make_station("1", rotulo="Only Gasoleo A", precios={FuelType.GASOLEO_A: 1.300}),
+        make_station(
+            "2",
+            rotulo="Both",
+            latitud=40.4170,
+            longitud=-3.7040,
+            precios={FuelType.GASOLEO_A: 1.400, FuelType.GASOLEO_PREMIUM: 1.500}
+        )
+    ]
+
+    finder = FuelStationFinder()
+    results = await finder.find_cheapest_in_snapshot(
+        snapshot=StationSnapshot.build(stations),
+        user_lat=40.4168,
+        user_lon=-3.7038,
+        radius_km=10,
+        fuel_type=FuelType.GASOLEO_A,
+        also_selling=[FuelType.GASOLEO_PREMIUM]
+    )
+
+    assert [s.id for s in results] == ["2"]
+
+@pytest.mark.asyncio
+async def test_find_page_in_snapshot_walks_all_stations_in_order(make_station):
+    """Test that following the keyset returns every station exactly once"""
+    snapshot = StationSnapshot.build([
+        make_station(
+            str(i),
+            latitud=40.4168 + (i * 0.001),
+            precios={FuelType.GASOLINA_95_E5: 1.300 + (i % 3) * 0.01}
+        )
+        for i in range(7)
+    ])
+
+    finder = FuelStationFinder()
+    seen = []
+    after = None
+    while True:
+        page, after = await finder.find_page_in_snapshot(
+            snapshot=snapshot,
+            user_lat=40.4168,
+            user_lon=-3.7038,
+            radius_km=10,
+            fuel_type=FuelType.GASOLINA_95_E5,
+            limit=3,
+            after=after
+        )
+        seen.extend(page)
+        if after is None:
+            break
+
+    assert sorted(s.id for s in seen) == [str(i) for i in range(7)]
+    prices = [s.precios[FuelType.GASOLINA_95_E5] for s in seen]
+    assert prices == sorted(prices)
+
+@pytest.mark.asyncio
+async def test_find_cheapest_by_radius_matches_separate_searches(make_station):
+    """Test that one ladder scan returns what separate searches per radius would"""
+    import random
+
+    rng = random.Random(3)
+    stations = [
+        make_station(
+            str(i),
+            latitud=40.4168 + rng.uniform(-0.3, 0.3),
+            longitud=-3.7038 + rng.uniform(-0.3, 0.3),
+            precios={FuelType.GASOLEO_A: round(rng.uniform(1.3, 1.6), 3)}
+        )
+        for i in range(200)
+    ]
+    snapshot = StationSnapshot.build(stations)
+    finder = FuelStationFinder()
+
+    ladder = await finder.find_cheapest_by_radius(
+        snapshot=snapshot,
+        user_lat=40.4168,
+        user_lon=-3.7038,
+        radii_km=[25, 5, 10, 0.5],
+        fuel_type=FuelType.GASOLEO_A,
+        limit=4
+    )
+
+    assert list(ladder) == [0.5, 5, 10, 25]
+    for radius, results in ladder.items():
+        expected = await finder.find_cheapest_in_snapshot(
+            snapshot=snapshot,
+            user_lat=40.4168,
+            user_lon=-3.7038,
+            radius_km=radius,
+            fuel_type=FuelType.GASOLEO_A,
+            limit=4
+        )
+        assert [s.id for s in results] == [s.id for s in expected]
+        assert [s._distance for s in results] == [s._distance for s in expected]
+
+@pytest.mark.asyncio
+async def test_brand_filters_apply_before_ranking(make_station):
+    """A cheaper station of another brand must not push the wanted brand out of the top 3"""
+    stations = [
+        make_station(
+            str(i),
+            rotulo="Cepsa" if i < 5 else "E.S. Repsol",
+            latitud=40.4168 + (i * 0.0001),
+            precios={FuelType.GASOLEO_A: 1.300 + (i * 0.01)}
+        )
+        for i in range(8)
+    ]
+    snapshot = StationSnapshot.build(stations)
+    finder = FuelStationFinder()
+
+    included = await finder.find_cheapest_in_snapshot(
+        snapshot, 40.4168, -3.7038, 10, FuelType.GASOLEO_A, brands=["repsol"]
+    )
+    excluded = await finder.find_cheapest_in_snapshot(
+        snapshot, 40.4168, -3.7038, 10, FuelType.GASOLEO_A, exclude_brands=["cepsa"]
+    )
+    both = await finder.find_cheapest_in_snapshot(
+        snapshot, 40.4168, -3.7038, 10, FuelType.GASOLEO_A,
+        brands=["repsol", "cepsa"], exclude_brands=["cepsa"]
+    )
+
+    assert [s.id for s in included] == ["5", "6", "7"]
+    assert [s.id for s in excluded] == ["5", "6", "7"]
+    assert [s.id for s in both] == ["5", "6", "7"]
+
+@pytest.mark.asyncio
+async def test_find_nearest_in_snapshot_orders_by_distance_at_any_range(make_station):
+    """The nearest stations are returned whatever the distance, nearest first"""
+    stations = [
+        make_station(
+            str(i),
+            rotulo="Repsol" if i % 2 else "Cepsa",
+            municipio="Soria",
+            provincia="Soria",
+            latitud=41.76 + i * 0.5,
+            longitud=-2.46,
+            precios={FuelType.GASOLEO_A: 1.5 - i * 0.01}
+        )
+        for i in range(6)
+    ]
+    snapshot = StationSnapshot.build(stations)
+    finder = FuelStationFinder()
+
+    nearest = await finder.find_nearest_in_snapshot(snapshot, 41.0, -2.46, FuelType.GASOLEO_A, limit=3)
+    repsol = await finder.find_nearest_in_snapshot(
+        snapshot, 41.0, -2.46, FuelType.GASOLEO_A, limit=3, brands=["repsol"]
+    )
+    close = await finder.find_nearest_in_snapshot(
+        snapshot, 41.0, -2.46, FuelType.GASOLEO_A, limit=3, max_distance_km=100
+    )
+
+    assert [s.id for s in nearest] == ["0", "1", "2"]
+    assert nearest[0]._distance > 80
+    assert [s.id for s in repsol] == ["1", "3", "5"]
+    assert [s.id for s in close] == ["0"]
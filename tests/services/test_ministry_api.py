@@ -1,3 +1,5 @@
+import json
+import httpx
 import pytest
 from unittest.mock import AsyncMock, Mock
 from src.services.ministry_api import MinistryAPIClient
@@ -66,3 +68,186 @@ async def test_get_all_stations_handles_decimal_separator():
 
     assert stations[0].latitud == 40.4168
     assert stations[0].longitud == -3.7038
+
+@pytest.mark.asyncio
+async def test_get_all_stations_uses_configured_url(monkeypatch):
+    """Test that MINISTRY_API_URL overrides the live endpoint"""
+    monkeypatch.setenv("MINISTRY_API_URL", "http://127.0.0.1:8100/")
+
+    mock_http_client = AsyncMock()
+    mock_response_obj = Mock()
+    mock_response_obj.json.return_value = {"ListaEESSPrecio": []}
+    mock_response_obj.raise_for_status = Mock()
+    mock_http_client.get.return_value = mock_response_obj
+
+    client = MinistryAPIClient(http_client=mock_http_client)
+    await client.get_all_stations()
+
+    mock_http_client.get.assert_called_once_with("http://127.0.0.1:8100/")
+
+@pytest.mark.asyncio
+async def test_get_all_stations_explicit_url_wins(monkeypatch):
+    monkeypatch.setenv("MINISTRY_API_URL", "http://127.0.0.1:8100/")
+
+    mock_http_client = AsyncMock()
+    mock_response_obj = Mock()
+    mock_response_obj.json.return_value = {"ListaEESSPrecio": []}
+    mock_response_obj.raise_for_status = Mock()
+    mock_http_client.get.return_value = mock_response_obj
+
+    client = MinistryAPIClient(http_client=mock_http_client, url="http://standin/")
+    await client.get_all_stations()
+
+    mock_http_client.get.assert_called_once_with("http://standin/")
+
+def province_item(station_id, provincia):
+    return {
+        "IDEESS": station_id,
+        "Rótulo": "Repsol",
+        "Dirección": "Calle Falsa 123",
+        "Municipio": provincia,
+        "Provincia": provincia,
+        "Latitud": "40,4168",
+        "Longitud (WGS84)": "-003,7038",
+        "Precio Gasoleo A": "1,349"
+    }
+
+@pytest.mark.asyncio
+async def test_get_stations_by_province_retries_only_failed_slices():
+    calls = []
+    failures = {"http://standin/FiltroProvincia/02": 1}
+
+    async def get(url):
+        calls.append(url)
+        response = Mock()
+        if failures.get(url):
+            failures[url] -= 1
+            response.raise_for_status = Mock(side_effect=Exception("500"))
+        else:
+            response.raise_for_status = Mock()
+        response.json.return_value = {"ListaEESSPrecio": [province_item(url[-2:], "P" + url[-2:])]}
+        return response
+
+    mock_http_client = AsyncMock()
+    mock_http_client.get.side_effect = get
+
+    client = MinistryAPIClient(http_client=mock_http_client, url="http://standin/")
+    slices, failed = await client.get_stations_by_province(
+        province_ids=["01", "02", "03"], concurrency=2, retry_delay=0
+    )
+
+    assert failed == []
+    assert {p: [s.id for s in stations] for p, stations in slices.items()} == {
+        "01": ["01"], "02": ["02"], "03": ["03"]
+    }
+    assert sorted(calls) == sorted([
+        "http://standin/FiltroProvincia/01",
+        "http://standin/FiltroProvincia/02",
+        "http://standin/FiltroProvincia/02",
+        "http://standin/FiltroProvincia/03",
+    ])
+
+@pytest.mark.asyncio
+async def test_get_stations_by_province_reports_slices_that_keep_failing():
+    mock_http_client = AsyncMock()
+    mock_http_client.get.side_effect = Exception("timeout")
+
+    client = MinistryAPIClient(http_client=mock_http_client, url="http://standin/")
+    slices, failed = await client.get_stations_by_province(
+        province_ids=["01", "02"], retries=1, retry_delay=0
+    )
+
+    assert slices == {}
+    assert failed == ["01", "02"]
+    assert mock_http_client.get.call_count == 4
+
+def conditional_server(documents, etag=None):
+    """httpx transport serving `documents` in turn, answering 304 to a matching If-None-Match"""
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if etag is not None and request.headers.get("if-none-match") == etag:
+            return httpx.Response(304)
+        headers = {"ETag": etag} if etag is not None else {}
+        body = documents[min(len(requests), len(documents)) - 1]
+        return httpx.Response(200, content=body, headers=headers)
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler)), requests
+
+def document(fecha, station_id="1"):
+    body = {"ListaEESSPrecio": [province_item(station_id, "Madrid")]}
+    if fecha is not None:
+        body = {"Fecha": fecha, **body}
+    return json.dumps(body).encode()
+
+@pytest.mark.asyncio
+async def test_conditional_fetch_sends_etag_and_skips_on_304():
+    http_client, requests = conditional_server([document("19/10/2026 10:00:00")], etag='"v1"')
+    client = MinistryAPIClient(http_client=http_client, url="http://standin/")
+
+    stations, version = await client.get_all_stations_if_changed()
+    unchanged, same = await client.get_all_stations_if_changed(version)
+
+    assert [s.id for s in stations] == ["1"]
+    assert unchanged is None and same == version
+    assert requests[1].headers["if-none-match"] == '"v1"'
+
+@pytest.mark.asyncio
+async def test_conditional_fetch_compares_fecha_before_parsing(monkeypatch):
+    http_client, _ = conditional_server([
+        document("19/10/2026 10:00:00"),
+        document("19/10/2026 10:00:00", station_id="2"),
+        document("19/10/2026 10:30:00", station_id="3"),
+    ])
+    client = MinistryAPIClient(http_client=http_client, url="http://standin/")
+
+    _, version = await client.get_all_stations_if_changed()
+    parse = Mock(side_effect=AssertionError("unchanged payload parsed"))
+    monkeypatch.setattr(client, "_parse_stations", parse)
+    unchanged, version = await client.get_all_stations_if_changed(version)
+    monkeypatch.undo()
+    changed, _ = await client.get_all_stations_if_changed(version)
+
+    assert unchanged is None
+    assert version.fecha == "19/10/2026 10:00:00" and version.digest is None
+    assert [s.id for s in changed] == ["3"]
+
+@pytest.mark.asyncio
+async def test_conditional_fetch_hashes_payloads_without_fecha():
+    http_client, _ = conditional_server([document(None), document(None), document(None, station_id="2")])
+    client = MinistryAPIClient(http_client=http_client, url="http://standin/")
+
+    _, first = await client.get_all_stations_if_changed()
+    unchanged, second = await client.get_all_stations_if_changed(first)
+    changed, _ = await client.get_all_stations_if_changed(second)
+
+    assert unchanged is None
+    assert first.digest == second.digest
+    assert [s.id for s in changed] == ["2"]
+
+@pytest.mark.asyncio
+async def test_get_stations_by_province_leaves_out_unchanged_slices():
+    def handler(request):
+        province_id = request.url.path[-2:]
+        handler.calls += 1
+        # Only province 02 is updated between the two rounds
+        fecha = "19/10/2026 10:30:00" if province_id == "02" and handler.calls > 2 else "19/10/2026 10:00:00"
+        body = {"Fecha": fecha, "ListaEESSPrecio": [province_item(province_id, "P" + province_id)]}
+        return httpx.Response(200, json=body)
+
+    handler.calls = 0
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    client = MinistryAPIClient(http_client=http_client, url="http://standin/")
+    versions = {}
+
+    first, _ = await client.get_stations_by_province(
+        province_ids=["01", "02"], concurrency=1, versions=versions
+    )
+    second, failed = await client.get_stations_by_province(
+        province_ids=["01", "02"], concurrency=1, versions=versions
+    )
+
+    assert sorted(first) == ["01", "02"]
+    assert list(second) == ["02"] and failed == []
+    assert versions["02"].fecha == "19/10/2026 10:30:00"
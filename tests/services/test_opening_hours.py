@@ -0,0 +1,71 @@
+from datetime import datetime, timezone
+from src.models import FuelType
+from src.services.finder import FuelStationFinder
+from src.services.opening_hours import ALWAYS_OPEN, OpeningHours, parse_horario, week_slot
+from src.services.snapshot import StationSnapshot
+
+# 2026-10-19 is a Monday
+MONDAY = datetime(2026, 10, 19)
+
+def is_open(horario, moment):
+    return bool(parse_horario(horario) & (1 << week_slot(moment)))
+
+def test_parse_horario_weekday_and_weekend_ranges():
+    horario = "L-V: 06:00-22:00; S-D: 08:00-21:00"
+
+    assert is_open(horario, MONDAY.replace(hour=6))
+    assert not is_open(horario, MONDAY.replace(hour=22))
+    assert not is_open(horario, MONDAY.replace(day=24, hour=7, minute=45))  # Saturday
+    assert is_open(horario, MONDAY.replace(day=25, hour=20, minute=45))  # Sunday
+
+def test_parse_horario_split_shift_and_midnight_wrap():
+    assert not is_open("L-D: 07:00-14:00 y 16:00-21:00", MONDAY.replace(hour=15))
+    assert is_open("L-D: 07:00-14:00 y 16:00-21:00", MONDAY.replace(hour=16))
+    assert is_open("L-D: 22:00-06:00", MONDAY.replace(hour=2))
+    assert is_open("D: 22:00-06:00", MONDAY.replace(hour=2))  # Sunday night into Monday
+    assert not is_open("L-D: 22:00-06:00", MONDAY.replace(hour=12))
+
+def test_parse_horario_24h_and_unparseable():
+    assert parse_horario("L-D: 24H") == ALWAYS_OPEN
+    assert parse_horario("L-D: 00:00-24:00") == ALWAYS_OPEN
+    assert parse_horario("") is None
+    assert parse_horario("Consultar en estación") is None
+
+def test_opening_hours_treats_unparsed_as_open_and_uses_canary_time(make_station):
+    snapshot = StationSnapshot.build([
+        make_station("1", horario="L-D: 08:00-20:00"),
+        make_station(
+            "2", horario="L-D: 08:00-20:00", provincia="SANTA CRUZ DE TENERIFE",
+            latitud=28.4636, longitud=-16.2518
+        ),
+        make_station("3", horario=""),
+        # The feed's own spelling of Las Palmas
+        make_station(
+            "4", horario="L-D: 08:00-20:00", provincia="PALMAS (LAS)", latitud=28.1235, longitud=-15.4363
+        ),
+    ])
+    hours = snapshot.opening_hours
+    # 19:30 in Madrid (CEST, UTC+2) is 18:30 in the Canary Islands
+    bits = OpeningHours.slot_bits(datetime(2026, 10, 19, 17, 30, tzinfo=timezone.utc))
+    late = OpeningHours.slot_bits(datetime(2026, 10, 19, 18, 30, tzinfo=timezone.utc))
+
+    assert [hours.is_open(i, bits) for i in range(4)] == [True, True, True, True]
+    assert [hours.is_open(i, late) for i in range(4)] == [False, True, True, True]
+    assert hours.unparsed == 1
+
+async def test_find_cheapest_in_snapshot_skips_closed_stations(make_station):
+    snapshot = StationSnapshot.build([
+        make_station("day", horario="L-D: 07:00-22:00", precios={FuelType.GASOLEO_A: 1.30}),
+        make_station("night", horario="L-D: 24H", precios={FuelType.GASOLEO_A: 1.45}),
+    ])
+    finder = FuelStationFinder()
+
+    at_night = await finder.find_cheapest_in_snapshot(
+        snapshot, 40.4168, -3.7038, 5, FuelType.GASOLEO_A, open_at=MONDAY.replace(hour=2)
+    )
+    at_noon = await finder.find_cheapest_in_snapshot(
+        snapshot, 40.4168, -3.7038, 5, FuelType.GASOLEO_A, open_at=MONDAY.replace(hour=12)
+    )
+
+    assert [s.id for s in at_night] == ["night"]
+    assert [s.id for s in at_noon] == ["day", "night"]
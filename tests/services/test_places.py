@@ -0,0 +1,53 @@
+import pytest
+from src.services.snapshot import StationSnapshot
+
+@pytest.fixture
+def places(make_station):
+    return StationSnapshot.build([
+        make_station("1", municipio="Alcobendas", provincia="MADRID", latitud=40.54, longitud=-3.64),
+        make_station("2", municipio="Alcobendas", provincia="MADRID", latitud=40.52, longitud=-3.62),
+        make_station("3", municipio="Alcalá de Henares", provincia="MADRID", latitud=40.48, longitud=-3.36),
+        make_station("4", municipio="Madrid", provincia="MADRID", latitud=40.41, longitud=-3.70),
+        make_station("5", municipio="Villanueva", provincia="TOLEDO", latitud=39.9, longitud=-4.0),
+        make_station("6", municipio="Villanueva", provincia="CÓRDOBA", latitud=38.3, longitud=-4.6),
+    ]).places
+
+def test_search_is_accent_and_case_insensitive(places):
+    assert [p.name for p in places.search("ALCA")] == ["Alcalá de Henares"]
+    assert [p.name for p in places.search("alco")] == ["Alcobendas"]
+
+def test_search_matches_word_prefixes_after_name_prefixes(places):
+    assert [p.name for p in places.search("henares")] == ["Alcalá de Henares"]
+
+def test_search_ranks_exact_municipio_first(places):
+    results = places.search("madrid")
+
+    assert [(p.name, p.kind) for p in results] == [("Madrid", "municipio"), ("MADRID", "provincia")]
+
+def test_place_centroid_and_station_count(places):
+    alcobendas = places.resolve("alcobendas")
+
+    assert alcobendas.stations == 2
+    assert alcobendas.latitude == pytest.approx(40.53)
+    assert alcobendas.longitude == pytest.approx(-3.63)
+
+def test_resolve_ambiguous_name_needs_label(places):
+    assert places.resolve("Villanueva") is None
+    assert places.resolve("Villanueva (Cordoba)").latitude == 38.3
+    assert places.resolve("Madrid (provincia)").kind == "provincia"
+    assert places.resolve("Atlantis") is None
+
+def test_labels_with_parenthesised_names_round_trip(make_station):
+    places = StationSnapshot.build([
+        make_station("1", municipio="San Bartolomé", provincia="ALICANTE", latitud=38.0, longitud=-0.8),
+        make_station("2", municipio="San Bartolomé", provincia="PALMAS (LAS)", latitud=28.9, longitud=-13.6),
+        make_station(
+            "3", municipio="Palmas de Gran Canaria (Las)", provincia="PALMAS (LAS)", latitud=28.1, longitud=-15.4
+        ),
+    ]).places
+
+    for place in places.places:
+        assert places.resolve(place.label) is place
+    assert places.resolve("San Bartolomé (PALMAS (LAS))").latitude == 28.9
+    assert places.resolve("Palmas de Gran Canaria (Las) (Palmas (Las))").stations == 1
+    assert places.resolve("San Bartolomé (Tenerife)") is None
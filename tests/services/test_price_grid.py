@@ -0,0 +1,95 @@
+import json
+import struct
+import zlib
+import pytest
+from src.models import FuelType
+from src.services.extracts import tile_for
+from src.services.price_grid import (
+    GRID_BITS, GRID_SIZE, TILE_PIXELS, PriceTileCache, morton, render_json, render_png, unmorton
+)
+from src.services.snapshot import StationSnapshot
+
+@pytest.fixture
+def make_grid_snapshot(make_station):
+    # Two stations a few metres apart in Madrid, one in Sevilla, one without Gasoleo A
+    def make(generation=1, price_shift=0.0):
+        return StationSnapshot.build([
+            make_station(
+                id, municipio=municipio, provincia=municipio, latitud=lat, longitud=lon, precios=precios
+            )
+            for id, municipio, lat, lon, precios in [
+                ("mad1", "Madrid", 40.41680, -3.70380, {FuelType.GASOLEO_A: 1.50 + price_shift}),
+                ("mad2", "Madrid", 40.41681, -3.70381, {FuelType.GASOLEO_A: 1.40 + price_shift}),
+                ("sev", "Sevilla", 37.38920, -5.98450, {FuelType.GASOLEO_A: 1.30 + price_shift}),
+                ("gas", "Madrid", 40.41680, -3.70380, {FuelType.GASOLINA_95_E5: 1.60}),
+            ]
+        ], generation=generation)
+    return make
+
+def test_morton_round_trip():
+    for x, y in [(0, 0), (1, 0), (0, 1), (12345, 67890), (2 ** 18 - 1, 2 ** 18 - 3)]:
+        assert unmorton(morton(x, y)) == (x, y)
+
+def test_cells_keep_cheapest_station_at_every_zoom(make_grid_snapshot):
+    snapshot = make_grid_snapshot()
+    grid = snapshot.price_grid(FuelType.GASOLEO_A)
+
+    x, y = tile_for(40.4168, -3.7038, 12)
+    assert [(round(price, 3), snapshot.text(index, "id")) for *_, price, index in grid.cells(12, x, y)] == [
+        (1.4, "mad2")
+    ]
+
+    # Madrid and Sevilla share the single tile at zoom 0; each is its own cell
+    cells = list(grid.cells(0, 0, 0))
+    assert sorted(snapshot.text(index, "id") for *_, index in cells) == ["mad2", "sev"]
+    cell_x, cell_y = tile_for(37.3892, -5.9845, GRID_BITS)
+    assert (cell_x, cell_y) in {(col, row) for col, row, *_ in cells}
+    assert all(0 <= col < GRID_SIZE and 0 <= row < GRID_SIZE for col, row, *_ in cells)
+
+    # Far from any station
+    assert list(grid.cells(12, 0, 0)) == []
+
+def test_render_png_and_json(make_grid_snapshot):
+    snapshot = make_grid_snapshot()
+    grid = snapshot.price_grid(FuelType.GASOLEO_A)
+    x, y = tile_for(40.4168, -3.7038, 8)
+
+    png = render_png(grid, 8, x, y)
+    assert png.startswith(b"\x89PNG\r\n\x1a\n")
+    width, height = struct.unpack(">II", png[16:24])
+    assert (width, height) == (TILE_PIXELS, TILE_PIXELS)
+    idat_length = struct.unpack(">I", png[33:37])[0]
+    raw = zlib.decompress(png[41:41 + idat_length])
+    assert len(raw) == TILE_PIXELS * (TILE_PIXELS * 4 + 1)
+    # One opaque CELL_PIXELS square for the single cell, transparent elsewhere
+    alphas = [raw[row * (TILE_PIXELS * 4 + 1) + 1 + col * 4 + 3] for row in range(TILE_PIXELS) for col in range(TILE_PIXELS)]
+    assert sum(1 for alpha in alphas if alpha) == (TILE_PIXELS // GRID_SIZE) ** 2
+
+    tile = json.loads(render_json(grid, snapshot, 8, x, y))
+    assert [(cell["id"], cell["precio"]) for cell in tile["cells"]] == [("mad2", 1.4)]
+    assert tile["fuel_type"] == "Gasoleo A"
+
+def test_tile_cache_etag_depends_on_content_only(make_grid_snapshot):
+    cache = PriceTileCache()
+    x, y = tile_for(40.4168, -3.7038, 6)
+
+    _, first = cache.tile(make_grid_snapshot(1), FuelType.GASOLEO_A, 6, x, y, "json")
+    _, same = cache.tile(make_grid_snapshot(2), FuelType.GASOLEO_A, 6, x, y, "json")
+    _, changed = cache.tile(make_grid_snapshot(3, price_shift=0.01), FuelType.GASOLEO_A, 6, x, y, "json")
+
+    assert first == same
+    assert changed != first
+
+def test_tile_cache_only_stores_tiles_of_the_current_generation(make_grid_snapshot):
+    cache = PriceTileCache()
+    old, new = make_grid_snapshot(1), make_grid_snapshot(2, price_shift=0.01)
+    x, y = tile_for(40.4168, -3.7038, 6)
+
+    assert cache.cached(old, FuelType.GASOLEO_A, 6, x, y, "png") is None
+    entry = cache.tile(old, FuelType.GASOLEO_A, 6, x, y, "png")
+    assert cache.cached(old, FuelType.GASOLEO_A, 6, x, y, "png") is entry
+
+    # A render of the old snapshot finishing after the new one was seen is not cached
+    cache.cached(new, FuelType.GASOLEO_A, 6, x, y, "json")
+    cache.tile(old, FuelType.GASOLEO_A, 6, x, y, "json")
+    assert cache.cached(new, FuelType.GASOLEO_A, 6, x, y, "json") is None
@@ -0,0 +1,24 @@
+import pytest
+from src.models import FuelType
+from src.services.snapshot import StationSnapshot
+
+@pytest.fixture
+def ranking(make_station):
+    return StationSnapshot.build([
+        make_station("1", precios={FuelType.GASOLEO_A: 1.30}),
+        make_station("2", precios={FuelType.GASOLEO_A: 1.40}),
+        make_station("3", precios={FuelType.GASOLEO_A: 1.50, FuelType.GASOLINA_95_E5: 1.6}),
+        make_station("4", provincia="MÁLAGA", precios={FuelType.GASOLEO_A: 1.20}),
+        make_station("5", provincia="MÁLAGA", precios={}),
+    ]).price_ranking
+
+def test_cheaper_than_national_and_provincial(ranking):
+    assert ranking.cheaper_than(FuelType.GASOLEO_A, 1.30) == 50.0
+    assert ranking.cheaper_than(FuelType.GASOLEO_A, 1.30, "Madrid") == 200 / 3
+    assert ranking.cheaper_than(FuelType.GASOLEO_A, 1.20, "malaga") == 0.0
+    assert ranking.cheaper_than(FuelType.GASOLEO_A, 1.10) == 100.0
+
+def test_cheaper_than_is_none_without_prices(ranking):
+    assert ranking.cheaper_than(FuelType.HIDROGENO, 5.0) is None
+    assert ranking.cheaper_than(FuelType.GASOLINA_95_E5, 1.6, "Málaga") is None
+    assert ranking.cheaper_than(FuelType.GASOLEO_A, 1.3, "Cuenca") is None
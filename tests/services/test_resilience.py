@@ -0,0 +1,41 @@
+from src.services.resilience import CircuitBreaker
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_breaker_opens_after_threshold_and_half_opens_after_delay():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, base_delay=10, clock=clock)
+
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    clock.now = 10
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+
+def test_breaker_backoff_doubles_up_to_max_delay():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, base_delay=10, max_delay=30, clock=clock)
+
+    breaker.record_failure()
+    assert breaker.retry_in == 10
+    breaker.record_failure()
+    assert breaker.retry_in == 20
+    breaker.record_failure()
+    assert breaker.retry_in == 30
+
+def test_breaker_closes_on_success():
+    breaker = CircuitBreaker(failure_threshold=1, clock=FakeClock())
+    breaker.record_failure()
+    breaker.record_success()
+
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
@@ -0,0 +1,101 @@
+import pytest
+from src.models import FuelType
+from src.services.shared_snapshot import (
+    SharedSnapshotReader,
+    publish_snapshot,
+    read_generation,
+    touch_snapshot,
+)
+from src.services.snapshot import SnapshotUnavailableError
+
+@pytest.fixture
+def stations(make_station):
+    return [
+        make_station(
+            "1234",
+            municipio="Alcalá de Henares",
+            precios={FuelType.GASOLINA_95_E5: 1.459, FuelType.GASOLEO_A: 1.349},
+            horario="L-D: 24H"
+        ),
+        make_station(
+            "5678",
+            rotulo="Cepsa",
+            direccion="Avenida 1",
+            municipio="Barcelona",
+            provincia="Barcelona",
+            latitud=41.3851,
+            longitud=2.1734,
+            precios={FuelType.GASOLEO_A: 1.299}
+        ),
+    ]
+
+def test_published_snapshot_round_trips(tmp_path, stations):
+    path = str(tmp_path / "stations.snap")
+    publish_snapshot(path, stations)
+
+    snapshot = SharedSnapshotReader(path).current()
+
+    assert snapshot.generation == 1
+    assert len(snapshot) == 2
+    assert snapshot.longitudes[1] == 2.1734
+    assert snapshot.prices[FuelType.GASOLEO_A][1] == 1.299
+    assert snapshot.station(0) == stations[0]
+    assert [s.id for s in snapshot.stations] == ["1234", "5678"]
+    assert snapshot.text(0, "horario") == "L-D: 24H"
+
+def test_fuel_index_survives_round_trip(tmp_path, stations):
+    path = str(tmp_path / "stations.snap")
+    built = publish_snapshot(path, stations)
+
+    snapshot = SharedSnapshotReader(path).current()
+
+    assert list(snapshot.fuel_masks) == list(built.fuel_masks)
+    assert list(snapshot.stations_by_fuel[FuelType.GASOLEO_A]) == [0, 1]
+    assert list(snapshot.stations_selling([FuelType.GASOLEO_A, FuelType.GASOLINA_95_E5])) == [0]
+
+def test_columns_are_views_into_the_mapping(tmp_path, stations):
+    path = str(tmp_path / "stations.snap")
+    publish_snapshot(path, stations)
+
+    snapshot = SharedSnapshotReader(path).current()
+
+    assert isinstance(snapshot.latitudes, memoryview)
+    assert snapshot.latitudes.readonly
+
+def test_reader_picks_up_new_generation(tmp_path, stations):
+    path = str(tmp_path / "stations.snap")
+    publish_snapshot(path, stations)
+    reader = SharedSnapshotReader(path, check_interval=0)
+    old = reader.current()
+
+    publish_snapshot(path, stations[:1])
+    new = reader.current()
+
+    assert read_generation(path) == 2
+    assert new.generation == 2
+    assert len(new) == 1
+    # The previous generation stays readable for requests still using it
+    assert old.station(1).id == "5678"
+
+def test_touched_snapshot_keeps_mapping_and_generation(tmp_path, stations):
+    path = str(tmp_path / "stations.snap")
+    publish_snapshot(path, stations)
+    reader = SharedSnapshotReader(path, check_interval=0)
+    before = reader.current()
+    fetched_at = before.fetched_at
+
+    assert touch_snapshot(path, fetched_at=fetched_at + 600)
+    after = reader.current()
+
+    assert after is before
+    assert after.generation == 1
+    assert after.fetched_at == fetched_at + 600
+    assert read_generation(path) == 1
+    assert not touch_snapshot(str(tmp_path / "missing.snap"))
+
+def test_reader_without_published_snapshot_raises(tmp_path):
+    reader = SharedSnapshotReader(str(tmp_path / "missing.snap"))
+
+    with pytest.raises(SnapshotUnavailableError):
+        reader.current()
+    assert read_generation(str(tmp_path / "missing.snap")) == 0
@@ -0,0 +1,202 @@
+import math
+import pytest
+from unittest.mock import AsyncMock
+from src.models import FuelType
+from src.services.ministry_api import PayloadVersion
+from src.services.resilience import CircuitBreaker
+from src.services.snapshot import SnapshotStore, SnapshotUnavailableError, StationSnapshot, fuel_mask
+
+def test_build_creates_price_columns_with_nan_for_missing_fuel(make_station):
+    stations = [
+        make_station("1", precios={FuelType.GASOLINA_95_E5: 1.5}),
+        make_station("2", precios={FuelType.GASOLEO_A: 1.4}, latitud=41.0),
+    ]
+
+    snapshot = StationSnapshot.build(stations, generation=3)
+
+    assert len(snapshot) == 2
+    assert snapshot.generation == 3
+    assert list(snapshot.latitudes) == [40.4168, 41.0]
+    assert snapshot.prices[FuelType.GASOLINA_95_E5][0] == 1.5
+    assert math.isnan(snapshot.prices[FuelType.GASOLINA_95_E5][1])
+    assert snapshot.station(1).id == "2"
+
+@pytest.mark.asyncio
+async def test_store_reuses_fresh_snapshot(make_station):
+    client = AsyncMock()
+    client.get_all_stations_if_changed.return_value = (
+        [make_station("1", precios={FuelType.GASOLEO_A: 1.4})], PayloadVersion(fecha="1")
+    )
+    store = SnapshotStore(client_factory=lambda: client, max_age=600)
+
+    first = await store.get()
+    second = await store.get()
+
+    assert first is second
+    assert first.generation == 1
+    client.get_all_stations_if_changed.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_store_refreshes_expired_snapshot():
+    client = AsyncMock()
+    client.get_all_stations_if_changed.return_value = ([], PayloadVersion(fecha="1"))
+    store = SnapshotStore(client_factory=lambda: client, max_age=0)
+
+    await store.get()
+    stale = await store.get()
+    await store._refresh_task
+    snapshot = await store.get()
+
+    assert stale.generation == 1
+    assert snapshot.generation == 2
+    assert client.get_all_stations_if_changed.call_count >= 2
+
+async def test_store_serves_stale_snapshot_when_refresh_fails(make_station):
+    client = AsyncMock()
+    client.get_all_stations_if_changed.side_effect = [
+        ([make_station("1", precios={FuelType.GASOLEO_A: 1.4})], PayloadVersion(fecha="1")), Exception("down")
+    ]
+    store = SnapshotStore(client_factory=lambda: client, max_age=0)
+
+    first = await store.get()
+    await store.get()
+    await store._refresh_task
+    snapshot = await store.get()
+
+    assert snapshot is first
+    assert store.breaker.failures == 1
+
+async def test_cold_store_fails_fast_when_circuit_is_open():
+    client = AsyncMock()
+    client.get_all_stations_if_changed.side_effect = Exception("down")
+    store = SnapshotStore(client_factory=lambda: client, breaker=CircuitBreaker(failure_threshold=1))
+
+    with pytest.raises(SnapshotUnavailableError):
+        await store.get()
+    with pytest.raises(SnapshotUnavailableError, match="retrying"):
+        await store.get()
+
+    assert client.get_all_stations_if_changed.call_count == 1
+
+async def test_unchanged_payload_keeps_snapshot_and_generation(make_station):
+    version = PayloadVersion(fecha="19/10/2026 10:00:00")
+    client = AsyncMock()
+    client.get_all_stations_if_changed.side_effect = [
+        ([make_station("1", precios={FuelType.GASOLEO_A: 1.4})], version),
+        (None, version),
+    ]
+    store = SnapshotStore(client_factory=lambda: client)
+
+    first = await store.refresh()
+    first.fetched_at -= 1000
+    second = await store.refresh()
+
+    assert second is first
+    assert second.generation == 1
+    assert second.age < 1000
+    assert client.get_all_stations_if_changed.call_args_list[1].args == (version,)
+    assert (store.refreshes_processed, store.refreshes_skipped) == (1, 1)
+
+async def test_province_refresh_skips_when_no_slice_changed(make_station):
+    client = AsyncMock()
+    client.get_stations_by_province.side_effect = [
+        ({"01": [make_station("a", precios={FuelType.GASOLEO_A: 1.4})]}, []),
+        ({}, []),
+    ]
+    store = SnapshotStore(client_factory=lambda: client, refresh_mode="province")
+
+    first = await store.refresh()
+    second = await store.refresh()
+
+    assert second is first
+    assert store.refreshes_skipped == 1
+
+@pytest.mark.parametrize("second_round", [({}, ["01", "02"]), ({}, ["02"])])
+async def test_province_refresh_with_failures_and_no_changes_is_not_skipped(second_round, make_station):
+    client = AsyncMock()
+    client.get_stations_by_province.side_effect = [
+        ({"01": [make_station("a", precios={FuelType.GASOLEO_A: 1.4})],
+          "02": [make_station("b", precios={FuelType.GASOLEO_A: 1.5})]}, []),
+        second_round,
+    ]
+    store = SnapshotStore(client_factory=lambda: client, refresh_mode="province")
+
+    snapshot = await store.refresh()
+    snapshot.fetched_at -= 1000
+    with pytest.raises(RuntimeError):
+        await store.refresh()
+
+    assert snapshot.age >= 1000
+    assert store.refreshes_skipped == 0
+    assert store.breaker.failures == 1
+
+def test_build_indexes_fuel_availability(make_station):
+    stations = [
+        make_station("1", precios={FuelType.GASOLEO_A: 1.4, FuelType.GASOLEO_PREMIUM: 1.5}),
+        make_station("2", precios={FuelType.GASOLEO_A: 1.3}),
+        make_station("3", precios={FuelType.GASOLINA_95_E5: 1.6}),
+    ]
+
+    snapshot = StationSnapshot.build(stations)
+
+    assert snapshot.fuel_masks[0] == fuel_mask([FuelType.GASOLEO_A, FuelType.GASOLEO_PREMIUM])
+    assert list(snapshot.stations_by_fuel[FuelType.GASOLEO_A]) == [0, 1]
+    assert list(snapshot.stations_by_fuel[FuelType.HIDROGENO]) == []
+
+def test_stations_selling_requires_every_fuel(make_station):
+    stations = [
+        make_station("1", precios={FuelType.GASOLEO_A: 1.4, FuelType.GASOLEO_PREMIUM: 1.5}),
+        make_station("2", precios={FuelType.GASOLEO_A: 1.3}),
+        make_station("3", precios={FuelType.GASOLEO_PREMIUM: 1.6}),
+    ]
+    snapshot = StationSnapshot.build(stations)
+
+    assert list(snapshot.stations_selling([FuelType.GASOLEO_A])) == [0, 1]
+    assert list(snapshot.stations_selling([FuelType.GASOLEO_A, FuelType.GASOLEO_PREMIUM])) == [0]
+    assert list(snapshot.stations_selling([])) == [0, 1, 2]
+
+def test_stations_of_brand_matches_whole_words_of_rotulo(make_station):
+    snapshot = StationSnapshot.build([
+        make_station(str(i), rotulo=rotulo)
+        for i, rotulo in enumerate(["REPSOL", "E.S. Repsol Butarque", "Repsolito", "Cepsa"])
+    ])
+
+    assert snapshot.stations_of_brand("repsol") == {0, 1}
+    assert snapshot.stations_of_brand("Repsol Butarque") == {1}
+    assert snapshot.stations_of_brand("shell") == frozenset()
+    assert snapshot.stations_of_brand(" REPSOL ") is snapshot.stations_of_brand("repsol")
+
+def test_brand_matches_cache_is_bounded(monkeypatch, make_station):
+    monkeypatch.setattr("src.services.snapshot.BRAND_CACHE_SIZE", 2)
+    snapshot = StationSnapshot.build([make_station("1", precios={FuelType.GASOLEO_A: 1.4})])
+
+    repsol = snapshot.stations_of_brand("repsol")
+    for brand in ("random-1", "random-2", "random-3"):
+        snapshot.stations_of_brand(brand)
+
+    assert list(snapshot._brand_matches) == ["random 2", "random 3"]
+    assert snapshot.stations_of_brand("repsol") == repsol
+
+async def test_province_refresh_keeps_previous_slice_of_failed_province(make_station):
+    client = AsyncMock()
+    client.get_stations_by_province.side_effect = [
+        ({"01": [make_station("a", precios={FuelType.GASOLEO_A: 1.4})],
+          "02": [make_station("b", precios={FuelType.GASOLEO_A: 1.5})]}, []),
+        ({"01": [make_station("a", precios={FuelType.GASOLEO_A: 1.3})]}, ["02"]),
+    ]
+    store = SnapshotStore(client_factory=lambda: client, refresh_mode="province")
+
+    await store.refresh()
+    snapshot = await store.refresh()
+
+    assert [snapshot.station(i).id for i in range(len(snapshot))] == ["a", "b"]
+    assert snapshot.prices[FuelType.GASOLEO_A][0] == 1.3
+    assert store.breaker.failures == 1
+
+async def test_province_refresh_fails_when_no_slice_is_available():
+    client = AsyncMock()
+    client.get_stations_by_province.return_value = ({}, ["01", "02"])
+    store = SnapshotStore(client_factory=lambda: client, refresh_mode="province")
+
+    with pytest.raises(SnapshotUnavailableError):
+        await store.get()
@@ -0,0 +1,40 @@
+import random
+from array import array
+from itertools import islice
+from src.services.geo import calculate_distance
+from src.services.spatial import GridIndex
+
+def make_points(count, seed=5):
+    rng = random.Random(seed)
+    latitudes = array("d", (rng.uniform(36.0, 43.5) for _ in range(count)))
+    longitudes = array("d", (rng.uniform(-9.2, 3.2) for _ in range(count)))
+    return latitudes, longitudes
+
+def test_nearest_matches_brute_force_inside_and_outside_the_grid():
+    latitudes, longitudes = make_points(2000)
+    indices = range(0, 2000, 3)
+    grid = GridIndex.build(latitudes, longitudes, indices)
+
+    for lat, lon in [(40.4168, -3.7038), (28.1, -15.4), (48.8, 2.35), (36.0, -9.2)]:
+        expected = sorted(
+            (calculate_distance(lat, lon, latitudes[i], longitudes[i]), i) for i in indices
+        )[:10]
+        assert list(islice(grid.nearest(lat, lon, latitudes, longitudes), 10)) == expected
+
+def test_nearest_applies_filter_and_max_distance():
+    latitudes, longitudes = make_points(500)
+    grid = GridIndex.build(latitudes, longitudes, range(500))
+
+    found = list(grid.nearest(40.4, -3.7, latitudes, longitudes, accept=lambda i: i % 2 == 0, max_distance_km=150))
+
+    assert found
+    assert all(index % 2 == 0 and distance <= 150 for distance, index in found)
+    assert [d for d, _ in found] == sorted(d for d, _ in found)
+    assert len(found) == sum(
+        1 for i in range(0, 500, 2) if calculate_distance(40.4, -3.7, latitudes[i], longitudes[i]) <= 150
+    )
+
+def test_empty_grid_yields_nothing():
+    grid = GridIndex.build(array("d"), array("d"), [])
+
+    assert list(grid.nearest(40.4, -3.7, array("d"), array("d"))) == []
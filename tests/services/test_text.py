@@ -0,0 +1,6 @@
+from src.services.text import normalize_name
+
+def test_normalize_name_ignores_accents_case_and_spacing():
+    assert normalize_name("Málaga") == "malaga"
+    assert normalize_name("  A CORUÑA ") == "a coruna"
+    assert normalize_name("Valencia /  València") == "valencia / valencia"
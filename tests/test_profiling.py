@@ -0,0 +1,23 @@
+from src.profiling import parse_importtime, import_time_by_package
+
+IMPORTTIME_OUTPUT = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   httpx._types
+import time:      2000 |       2120 | httpx
+import time:       500 |        500 |     fastapi.routing
+import time:      1500 |       2000 |   fastapi
+Traceback lines are ignored
+"""
+
+def test_parse_importtime_skips_header_and_noise():
+    rows = parse_importtime(IMPORTTIME_OUTPUT)
+
+    assert rows[0] == ("httpx._types", 120, 120)
+    assert rows[1] == ("httpx", 2000, 2120)
+    assert len(rows) == 4
+
+def test_import_time_by_package_sums_self_time():
+    totals = import_time_by_package(parse_importtime(IMPORTTIME_OUTPUT))
+
+    assert totals["httpx"] == 2.12
+    assert totals["fastapi"] == 2.0
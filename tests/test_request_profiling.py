@@ -0,0 +1,53 @@
+import time
+from src.request_profiling import SlowQueryRecorder, stage
+
+def test_no_trigger_records_nothing():
+    recorder = SlowQueryRecorder()
+
+    with recorder.capture("search") as trace:
+        with stage("scan"):
+            pass
+
+    assert trace is None
+    assert recorder.recent() == []
+
+def test_forced_capture_profiles_and_times_stages():
+    recorder = SlowQueryRecorder()
+
+    with recorder.capture("search", {"radius": 5}, force=True) as trace:
+        with stage("scan"):
+            sum(range(1000))
+
+    traces = recorder.recent()
+    assert traces[0]["trigger"] == "header"
+    assert traces[0]["params"] == {"radius": 5}
+    assert [s["stage"] for s in traces[0]["stages"]] == ["scan"]
+    assert "function calls" in trace.profile
+
+def test_threshold_keeps_only_slow_requests():
+    recorder = SlowQueryRecorder(slow_ms=5)
+
+    with recorder.capture("fast"):
+        pass
+    with recorder.capture("slow") as trace:
+        time.sleep(0.01)
+
+    assert [t["name"] for t in recorder.recent()] == ["slow"]
+    assert trace.profile is None  # Threshold tracing never runs cProfile
+
+def test_sampling_uses_random_func():
+    recorder = SlowQueryRecorder(sample_rate=0.5, random_func=lambda: 0.1)
+
+    with recorder.capture("sampled"):
+        pass
+
+    assert recorder.recent()[0]["trigger"] == "sample"
+
+def test_ring_buffer_keeps_last_traces():
+    recorder = SlowQueryRecorder(capacity=2)
+
+    for name in ["a", "b", "c"]:
+        with recorder.capture(name, force=True):
+            pass
+
+    assert [t["name"] for t in recorder.recent()] == ["c", "b"]